@@ -1,32 +1,199 @@
 # Single-File Flask App for Diabetes Prediction with Login, History, Clear, and Chart (Blue Diabetes Theme)
 # Run this in your Python environment: python testModel.py
 # Access at http://localhost:5000 in your browser (ALWAYS starts at Login)
+# Production: python serve.py --workers 4 (uvicorn, multiple workers, graceful shutdown)
 # Default Login: Any username with password '1234'
 # Ensure 'diabetes_rf_model.pkl' is in the same folder
 
-from flask import Flask, request, jsonify, render_template_string, session, redirect, url_for
-import joblib
+import time
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, session, redirect, url_for, Response, stream_with_context, g, abort
 import numpy as np
-import pandas as pd
-from sklearn.impute import SimpleImputer
 from datetime import datetime
-import webbrowser
+import io
+import itertools
+import logging
+import functools
+import uuid
+import os
+from concurrent.futures import ThreadPoolExecutor
+from scoring import ScoringPipeline, MODEL_PATH, feature_names, features_to_impute, format_result, format_contributions
+from preprocess import records_from_payload, sweep_from_payload
+from prediction_cache import PredictionCache
+from model_registry import ModelRegistry, resolve_model_path
+from microbatch import MicroBatcher
+from history_store import create_history_store
+from metrics import MetricsRegistry, StageTimer, NULL_TIMER, snapshot, process_memory
+from bulk_io import detect_format, text_stream, iter_chunks, format_rows, format_header
+from static_assets import StaticAssets, CompressedContent
+from admission import AdmissionController
+from analytics import PredictionAnalytics
+from drift import DriftMonitor, load_profile
+from binary_io import binary_format, read_matrix, write_results, MIMETYPES
+
+startup_timings = {'imports': time.perf_counter() - STARTUP_STARTED}
+logger = logging.getLogger('DPS')
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)  # /static is served from memory below
 app.secret_key = 'super_secret_key'  # Required for sessions
 
-# Load the trained model
-model = joblib.load('DiabetesPredictionModel.pkl')
+# Inference engine: 'sklearn' calls model.predict_proba, 'compiled' uses the flat-array forest.
+# The compiled forest is faster up to a few hundred rows (about 70x at one row) but slower
+# from roughly 800 rows on (1.1x at 1k, 3.6x at 10k), so with 'compiled' batches above
+# DPS_COMPILED_MAX_ROWS (default 500) are still scored by sklearn; see scoring.py.
+INFERENCE_ENGINE = os.environ.get('DPS_INFERENCE_ENGINE', 'sklearn')
+
+# Prediction cache: max entries (0 disables) and optional TTL in seconds (0 = no expiry)
+CACHE_SIZE = int(os.environ.get('DPS_CACHE_SIZE', 4096))
+CACHE_TTL = float(os.environ.get('DPS_CACHE_TTL', 0))
+
+# Opt-in micro-batching: concurrent /predict rows arriving within the window are scored together
+MICROBATCH = os.environ.get('DPS_MICROBATCH', '0') == '1'
+MICROBATCH_WAIT_MS = float(os.environ.get('DPS_MICROBATCH_WAIT_MS', 2))
+MICROBATCH_MAX_SIZE = int(os.environ.get('DPS_MICROBATCH_MAX_SIZE', 64))
+
+# Prediction history lives server-side ('memory' or 'sqlite'); the session only holds an ID
+HISTORY_BACKEND = os.environ.get('DPS_HISTORY_BACKEND', 'memory')
+HISTORY_DB = os.environ.get('DPS_HISTORY_DB', 'history.db')
+HISTORY_LIMIT = int(os.environ.get('DPS_HISTORY_LIMIT', 100))
+
+# Cold start: memory-map model arrays so forked workers share pages, and optionally
+# score a dummy row before accepting traffic
+MODEL_MMAP = os.environ.get('DPS_MODEL_MMAP', '1') == '1'
+PREWARM = os.environ.get('DPS_PREWARM', '0') == '1'
+
+# Hot reload: admin endpoints need this token in X-Admin-Token (unset disables them);
+# DPS_MODEL_WATCH=1 reloads automatically when the model file changes
+ADMIN_TOKEN = os.environ.get('DPS_ADMIN_TOKEN')
+MODEL_WATCH = os.environ.get('DPS_MODEL_WATCH', '0') == '1'
+MODEL_WATCH_INTERVAL = float(os.environ.get('DPS_MODEL_WATCH_INTERVAL', 5))
+RELOAD_MIN_AGREEMENT = float(os.environ.get('DPS_RELOAD_MIN_AGREEMENT', 0))
+# /admin/reload only loads model files from this directory (default: the model's own)
+MODEL_DIR = os.environ.get('DPS_MODEL_DIR', os.path.dirname(os.path.abspath(MODEL_PATH)))
+
+# CPU-bound scoring runs on a bounded pool of this many threads (0 = in the request thread);
+# serve.py defaults it to the core count so request threads only wait on I/O
+INFERENCE_THREADS = int(os.environ.get('DPS_INFERENCE_THREADS', 0))
+
+# Admission control for /predict: concurrent requests (0 = unlimited), how many may wait
+# and for how long, and a per-session token bucket (requests/s, 0 = off; burst size)
+MAX_IN_FLIGHT = int(os.environ.get('DPS_MAX_IN_FLIGHT', 0))
+MAX_QUEUE = int(os.environ.get('DPS_MAX_QUEUE', 0))
+QUEUE_TIMEOUT_MS = float(os.environ.get('DPS_QUEUE_TIMEOUT_MS', 100))
+RATE_LIMIT = float(os.environ.get('DPS_RATE_LIMIT', 0))
+RATE_BURST = int(os.environ.get('DPS_RATE_BURST', 10))
+
+# Adaptive /predict (opt-in per request with ?mode=adaptive, or for every request with
+# DPS_ADAPTIVE=1): stop evaluating trees once the label agrees with the full forest at this
+# confidence, checking after every batch of trees. Only the label carries that guarantee: the
+# probability is the mean over the trees evaluated, a bounded estimate of the model's
+# probability rather than the probability itself, so such responses are marked
+# "probability_estimate": true next to "trees_used".
+ADAPTIVE = os.environ.get('DPS_ADAPTIVE', '0') == '1'
+ADAPTIVE_CONFIDENCE = float(os.environ.get('DPS_ADAPTIVE_CONFIDENCE', 0.99))
+ADAPTIVE_TREE_BATCH = int(os.environ.get('DPS_ADAPTIVE_TREE_BATCH', 10))
+
+# Population analytics on /analytics: every scored row updates per-window aggregates;
+# this many recent windows of this width are kept, older ones only count in the totals
+ANALYTICS_ENABLED = os.environ.get('DPS_ANALYTICS', '1') == '1'
+ANALYTICS_WINDOW_SECONDS = float(os.environ.get('DPS_ANALYTICS_WINDOW_SECONDS', 3600))
+ANALYTICS_WINDOWS = int(os.environ.get('DPS_ANALYTICS_WINDOWS', 24))
+
+# Input drift: the last DPS_DRIFT_WINDOW scored vectors are compared every
+# DPS_DRIFT_INTERVAL seconds against a reference profile built with drift.py
+# (DPS_DRIFT=0 or DPS_DRIFT_WINDOW=0 disables the monitor)
+DRIFT_WINDOW = int(os.environ.get('DPS_DRIFT_WINDOW', 5000))
+DRIFT_ENABLED = os.environ.get('DPS_DRIFT', '1') == '1' and DRIFT_WINDOW > 0
+DRIFT_PROFILE = os.environ.get('DPS_DRIFT_PROFILE', os.path.splitext(MODEL_PATH)[0] + '.profile.json')
+DRIFT_INTERVAL = float(os.environ.get('DPS_DRIFT_INTERVAL', 60))
+DRIFT_MIN_ROWS = int(os.environ.get('DPS_DRIFT_MIN_ROWS', 200))
+
+# Request and per-stage latency metrics on /metrics; DPS_METRICS=0 removes all instrumentation
+METRICS_ENABLED = os.environ.get('DPS_METRICS', '1') == '1'
+
+# Load the trained model, imputer and (optionally) compiled forest. DPS_MODEL_PATH may point
+# at an artifact from train_model.py, which brings its own imputer statistics and training record.
+pipeline = ScoringPipeline.load(MODEL_PATH, engine=INFERENCE_ENGINE, mmap=MODEL_MMAP, timings=startup_timings)
+if PREWARM:
+    warm_started = time.perf_counter()
+    pipeline.warm_up()
+    startup_timings['first_inference'] = time.perf_counter() - warm_started
+startup_timings['total'] = time.perf_counter() - STARTUP_STARTED
+
+def log_startup_timings():
+    logger.info('Startup timings (ms): %s',
+                ', '.join(f'{phase}={seconds * 1000:.1f}' for phase, seconds in startup_timings.items()))
+
+log_startup_timings()
+
+# Identical patient vectors (retries, reloads) are answered from memory
+prediction_cache = PredictionCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL, model_path=MODEL_PATH)
+
+# Active model version; reloads swap it atomically and keep the previous one for rollback
+model_registry = ModelRegistry(lambda path: ScoringPipeline.load(path, engine=INFERENCE_ENGINE, mmap=MODEL_MMAP),
+                               min_agreement=RELOAD_MIN_AGREEMENT)
+model_registry.install(pipeline, MODEL_PATH)
+model_registry.listeners.append(lambda version: prediction_cache.invalidate())
+if MODEL_WATCH:
+    model_registry.watch(MODEL_PATH, MODEL_WATCH_INTERVAL)
+
+# Largest number of records accepted by a single /predict_batch call
+MAX_BATCH_SIZE = int(os.environ.get('DPS_MAX_BATCH_SIZE', 10000))
+
+# /what_if: at most this many swept features and grid points per request, and the range
+# (min, max) swept for a feature named without one
+WHAT_IF_MAX_FEATURES = 2
+WHAT_IF_STEPS = 50
+WHAT_IF_RANGES = {'Pregnancies': (0, 17), 'Glucose': (40, 250), 'BloodPressure': (30, 130),
+                  'SkinThickness': (5, 100), 'Insulin': (10, 850), 'BMI': (15, 70),
+                  'DiabetesPedigreeFunction': (0.05, 2.5), 'Age': (21, 90)}
+
+# Rows parsed and scored together by /predict_stream
+STREAM_CHUNK_ROWS = int(os.environ.get('DPS_STREAM_CHUNK_ROWS', 2048))
+
+# Per-user capped history store
+history_store = create_history_store(HISTORY_BACKEND, limit=HISTORY_LIMIT, path=HISTORY_DB)
+
+# Sheds excess /predict load with a fast 429/503 (None when no limit is configured)
+admission = AdmissionController(MAX_IN_FLIGHT, MAX_QUEUE, QUEUE_TIMEOUT_MS / 1000, RATE_LIMIT, RATE_BURST) \
+    if MAX_IN_FLIGHT > 0 or RATE_LIMIT > 0 else None
+
+# Streaming aggregates over everything scored (None when disabled)
+analytics = PredictionAnalytics(feature_names, ANALYTICS_WINDOW_SECONDS, ANALYTICS_WINDOWS) \
+    if ANALYTICS_ENABLED else None
 
-# Imputer
-features_to_impute = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
-imputer = SimpleImputer(strategy='median')
-dummy_df = pd.DataFrame(np.zeros((1, len(features_to_impute))), columns=features_to_impute)
-imputer.fit(dummy_df)
+# Sliding window of scored vectors checked for drift off the request path (None when disabled)
+drift_monitor = None
+if DRIFT_ENABLED:
+    drift_profile = None
+    if os.path.exists(DRIFT_PROFILE):
+        drift_profile = load_profile(DRIFT_PROFILE)
+    else:
+        logger.warning('No drift profile at %s; only zero-rate checks will run', DRIFT_PROFILE)
+    drift_monitor = DriftMonitor(feature_names, drift_profile, window_size=DRIFT_WINDOW, min_rows=DRIFT_MIN_ROWS,
+                                 zero_columns=features_to_impute)
+    drift_monitor.start(DRIFT_INTERVAL)
+
+def observe_predictions(input_data, outcomes, probabilities):
+    # Every scored batch of imputed rows feeds the analytics and the drift window
+    if analytics is not None:
+        analytics.observe(input_data, outcomes, probabilities)
+    if drift_monitor is not None:
+        drift_monitor.observe(input_data)
 
-feature_names = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+# Metrics registry (None when disabled)
+metrics = MetricsRegistry() if METRICS_ENABLED else None
+if metrics is not None:
+    requests_total = metrics.counter('requests_total', 'HTTP requests by endpoint, method and status',
+                                     ['endpoint', 'method', 'status'])
+    request_errors = metrics.counter('request_errors_total', 'HTTP responses with status >= 400', ['endpoint'])
+    request_latency = metrics.histogram('request_duration_seconds', 'Time to build the response', ['endpoint'])
+    requests_in_flight = metrics.gauge('requests_in_flight', 'Requests currently being handled')
+    predict_stages = metrics.histogram('predict_stage_seconds', 'Latency of each /predict stage', ['stage'])
 
-# Overall dataset stats (hardcoded from Pima dataset: 500 no diabetes, 268 yes)
+# Overall dataset stats (hardcoded from Pima dataset: 500 no diabetes, 268 yes);
+# the dashboard falls back to these until /analytics has seen predictions
 OVERALL_STATS = {'no_diabetes': 500, 'diabetes': 268}
 
 # Login Template (Blue Diabetes Theme)
@@ -37,117 +204,7 @@ LOGIN_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Diabetes Risk Prediction System - Login</title>
-    <style>
-        body { 
-            margin: 0; 
-            padding: 0; 
-            font-family: Arial, sans-serif; 
-            background: linear-gradient(to right, #2196F3, #1976D2); 
-            display: flex; 
-            height: 100vh; 
-            align-items: center; 
-            justify-content: center; 
-            position: relative; 
-            overflow: hidden;
-        }
-        body::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            background: radial-gradient(circle at 20% 80%, rgba(255,255,255,0.1) 0%, transparent 50%),
-                        radial-gradient(circle at 80% 20%, rgba(255,255,255,0.1) 0%, transparent 50%),
-                        radial-gradient(circle at 40% 40%, rgba(255,255,255,0.05) 0%, transparent 50%);
-            animation: float 20s ease-in-out infinite;
-        }
-        @keyframes float {
-            0%, 100% { transform: translateY(0px) rotate(0deg); }
-            50% { transform: translateY(-20px) rotate(180deg); }
-        }
-        .login-container {
-            display: flex;
-            width: 100%;
-            max-width: 1200px;
-            height: 80vh;
-            background: rgba(255,255,255,0.1);
-            border-radius: 20px;
-            backdrop-filter: blur(10px);
-            box-shadow: 0 8px 32px rgba(0,0,0,0.3);
-        }
-        .left-side {
-            flex: 1;
-            background: linear-gradient(to bottom, #2196F3, #0D47A1);
-            border-radius: 20px 0 0 20px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            position: relative;
-            overflow: hidden;
-        }
-        .left-side::before {
-            content: '🩸';  /* Blood drop emoji as placeholder for cells */
-            font-size: 200px;
-            opacity: 0.3;
-            animation: pulse 2s infinite;
-        }
-        @keyframes pulse {
-            0%, 100% { transform: scale(1); }
-            50% { transform: scale(1.05); }
-        }
-        .right-side {
-            flex: 1;
-            background: white;
-            border-radius: 0 20px 20px 0;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 40px;
-        }
-        .login-form {
-            width: 100%;
-            max-width: 300px;
-        }
-        .login-title {
-            text-align: center;
-            color: #2196F3;
-            font-size: 24px;
-            margin-bottom: 30px;
-            font-weight: bold;
-        }
-        .form-group {
-            margin-bottom: 20px;
-        }
-        label {
-            display: block;
-            margin-bottom: 5px;
-            color: #555;
-            font-weight: bold;
-        }
-        input[type="text"], input[type="password"] {
-            width: 100%;
-            padding: 12px;
-            border: 1px solid #ddd;
-            border-radius: 5px;
-            font-size: 16px;
-            box-sizing: border-box;
-        }
-        button {
-            width: 100%;
-            padding: 12px;
-            background: #2196F3;
-            color: white;
-            border: none;
-            border-radius: 5px;
-            font-size: 16px;
-            cursor: pointer;
-            transition: background 0.3s;
-        }
-        button:hover {
-            background: #1976D2;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/login.css') }}">
 </head>
 <body>
     <div class="login-container">
@@ -179,189 +236,9 @@ PREDICTION_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Diabetes Risk Prediction</title>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <link href="https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --primary-color: #2196F3;
-            --secondary-color: #6c757d;
-            --success-color: #28a745;
-            --danger-color: #dc3545;
-            --light-bg: #f8f9fa;
-            --white: #ffffff;
-            --shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }
-        body { 
-            font-family: 'Roboto', sans-serif; 
-            background: linear-gradient(135deg, #2196F3 0%, #0D47A1 100%); 
-            min-height: 100vh;
-            color: #333;
-            margin: 0;
-            padding: 20px;
-        }
-        .main-container {
-            max-width: 1200px;
-            margin: 0 auto;
-            display: grid;
-            grid-template-columns: 1fr 300px;
-            gap: 20px;
-        }
-        .form-container {
-            background: var(--white);
-            padding: 40px;
-            border-radius: 15px;
-            box-shadow: var(--shadow);
-        }
-        .sidebar {
-            background: var(--white);
-            padding: 20px;
-            border-radius: 15px;
-            box-shadow: var(--shadow);
-            height: fit-content;
-        }
-        h1 { 
-            color: var(--primary-color); 
-            text-align: center; 
-            margin-bottom: 10px;
-            font-weight: 700;
-            font-size: 2em;
-        }
-        p { 
-            text-align: center; 
-            color: var(--secondary-color);
-            margin-bottom: 30px;
-            font-weight: 300;
-        }
-        form { 
-            display: grid; 
-            gap: 15px; 
-            background: var(--light-bg); 
-            padding: 30px; 
-            border-radius: 10px; 
-            box-shadow: inset 0 2px 4px rgba(0,0,0,0.05);
-        }
-        label { 
-            font-weight: 400; 
-            color: #555;
-            display: block;
-            margin-bottom: 5px;
-        }
-        input { 
-            padding: 12px; 
-            font-size: 16px; 
-            border: 2px solid #e9ecef; 
-            border-radius: 8px; 
-            transition: border-color 0.3s, box-shadow 0.3s;
-            width: 100%;
-            box-sizing: border-box;
-        }
-        input:focus {
-            outline: none;
-            border-color: var(--primary-color);
-            box-shadow: 0 0 0 3px rgba(33, 150, 243, 0.1);
-        }
-        .button-group {
-            display: flex;
-            gap: 10px;
-        }
-        button { 
-            background: var(--primary-color); 
-            color: var(--white); 
-            border: none; 
-            cursor: pointer; 
-            padding: 12px 24px; 
-            font-size: 16px; 
-            border-radius: 8px; 
-            transition: background 0.3s, transform 0.2s;
-            font-weight: 500;
-        }
-        button:hover { 
-            background: #1976D2; 
-            transform: translateY(-2px);
-        }
-        button[type="reset"] {
-            background: var(--secondary-color);
-        }
-        button[type="reset"]:hover {
-            background: #545b62;
-        }
-        #result { 
-            margin-top: 30px; 
-            padding: 20px; 
-            border-radius: 10px; 
-            display: none; 
-            animation: fadeIn 0.5s ease-in;
-            text-align: center;
-            font-weight: 500;
-        }
-        #result.success {
-            background: #d4edda; 
-            border: 2px solid var(--success-color);
-            color: var(--success-color);
-        }
-        #result.high-risk { 
-            background: #f8d7da; 
-            border: 2px solid var(--danger-color);
-            color: var(--danger-color);
-        }
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        .logout {
-            text-align: right;
-            margin-bottom: 20px;
-        }
-        .logout a {
-            color: var(--primary-color);
-            text-decoration: none;
-            font-weight: 500;
-        }
-        .logout a:hover {
-            text-decoration: underline;
-        }
-        .history-section {
-            margin-bottom: 20px;
-        }
-        .history-title {
-            color: var(--primary-color);
-            font-size: 1.2em;
-            margin-bottom: 10px;
-        }
-        .clear-btn {
-            background: #dc3545;
-            width: 100%;
-            margin-bottom: 15px;
-        }
-        .clear-btn:hover {
-            background: #c82333;
-        }
-        .history-list {
-            list-style: none;
-            padding: 0;
-            max-height: 300px;
-            overflow-y: auto;
-        }
-        .history-item {
-            background: var(--light-bg);
-            padding: 10px;
-            margin-bottom: 5px;
-            border-radius: 5px;
-            font-size: 0.9em;
-        }
-        .history-item.high { color: var(--danger-color); }
-        .history-item.low { color: var(--success-color); }
-        #chart-container {
-            position: relative;
-            height: 200px;
-            margin-top: 20px;
-        }
-        .no-history {
-            text-align: center;
-            color: var(--secondary-color);
-            font-style: italic;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/dashboard.css') }}">
+    <script src="{{ asset_url('js/chart.js') }}" defer></script>
+    <script src="{{ asset_url('js/dashboard.js') }}" defer></script>
 </head>
 <body>
     <div class="main-container">
@@ -394,6 +271,10 @@ PREDICTION_TEMPLATE = """
                 <label for="age">Age (years):</label>
                 <input type="number" id="age" name="Age" required min="0">
                 
+                <label class="explain-toggle" for="explainToggle">
+                    <input type="checkbox" id="explainToggle"> Why? Show the main factors behind the prediction
+                </label>
+                
                 <div class="button-group">
                     <button type="submit">🔮 Predict Risk</button>
                     <button type="reset">🔄 Reset</button>
@@ -404,7 +285,7 @@ PREDICTION_TEMPLATE = """
         <div class="sidebar">
             <div class="history-section">
                 <h3 class="history-title">📋 Prediction History</h3>
-                <button class="clear-btn" onclick="clearHistory()">🗑️ Clear History</button>
+                <button id="clearHistory" class="clear-btn">🗑️ Clear History</button>
                 <ul id="historyList" class="history-list"></ul>
                 <div id="noHistory" class="no-history">No predictions yet. Make one to see history!</div>
             </div>
@@ -414,145 +295,135 @@ PREDICTION_TEMPLATE = """
                     <canvas id="riskChart"></canvas>
                 </div>
             </div>
+            <div class="chart-section">
+                <h3 class="history-title">📈 What-if Risk Curve</h3>
+                <div class="what-if-controls">
+                    <select id="whatIfFeature">
+                        <option value="Glucose">Glucose</option>
+                        <option value="BMI">BMI</option>
+                        <option value="Age">Age</option>
+                    </select>
+                    <button id="whatIfButton" type="button">Show Curve</button>
+                </div>
+                <div id="what-if-container">
+                    <canvas id="whatIfChart"></canvas>
+                </div>
+            </div>
         </div>
     </div>
 
-    <script>
-        let history = [];
-        let chart;
-
-        // Initialize chart with overall stats
-        function initChart() {
-            const ctx = document.getElementById('riskChart').getContext('2d');
-            chart = new Chart(ctx, {
-                type: 'pie',
-                data: {
-                    labels: ['No Diabetes', 'Diabetes'],
-                    datasets: [{
-                        data: [65, 35],  // Overall %
-                        backgroundColor: ['#28a745', '#dc3545']
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: { position: 'bottom' },
-                        title: { display: true, text: 'Overall Dataset (65% No / 35% Yes)' }
-                    }
-                }
-            });
-        }
-
-        // Update chart from history
-        function updateChart() {
-            const noDiabetes = history.filter(h => h.outcome === 0).length;
-            const diabetes = history.filter(h => h.outcome === 1).length;
-            const total = history.length;
-            if (total === 0) {
-                chart.data.datasets[0].data = [65, 35];
-                chart.options.plugins.title.text = 'Overall Dataset (65% No / 35% Yes)';
-            } else {
-                const noPct = (noDiabetes / total * 100).toFixed(1);
-                const yesPct = (diabetes / total * 100).toFixed(1);
-                chart.data.datasets[0].data = [noPct, yesPct];
-                chart.options.plugins.title.text = `Your History (${noPct}% No / ${yesPct}% Yes)`;
-            }
-            chart.update();
-        }
-
-        // Update history list
-        function updateHistoryList() {
-            const list = document.getElementById('historyList');
-            const noHistoryDiv = document.getElementById('noHistory');
-            list.innerHTML = '';
-            if (history.length === 0) {
-                noHistoryDiv.style.display = 'block';
-                return;
-            }
-            noHistoryDiv.style.display = 'none';
-            history.forEach((item, index) => {
-                const li = document.createElement('li');
-                li.className = `history-item ${item.outcome === 1 ? 'high' : 'low'}`;
-                li.innerHTML = `<strong>${new Date(item.timestamp).toLocaleString()}</strong><br>
-                                Outcome: ${item.outcome === 1 ? 'Diabetes Positive' : 'No Diabetes'}<br>
-                                Probability: ${item.probability}`;
-                list.appendChild(li);
-            });
-        }
-
-        // Clear history
-        function clearHistory() {
-            fetch('/clear_history', { method: 'POST' })
-                .then(response => response.json())
-                .then(() => {
-                    history = [];
-                    updateHistoryList();
-                    updateChart();
-                });
-        }
-
-        // Load initial history
-        fetch('/history')
-            .then(response => response.json())
-            .then(data => {
-                history = data;
-                updateHistoryList();
-                updateChart();
-            });
-
-        // Form submit
-        const form = document.getElementById('predictForm');
-        const resultDiv = document.getElementById('result');
-        form.addEventListener('submit', async (e) => {
-            e.preventDefault();
-            const formData = new FormData(form);
-            try {
-                const response = await fetch('/predict', { method: 'POST', body: formData });
-                const result = await response.json();
-                resultDiv.className = result.outcome === 1 ? 'high-risk' : 'success';
-                resultDiv.innerHTML = `
-                    <h2>Prediction: ${result.risk} Risk</h2>
-                    <p>Outcome: ${result.outcome ? 'Diabetes Positive' : 'No Diabetes'}</p>
-                    <p>Probability of Diabetes: ${result.probability}</p>
-                `;
-                resultDiv.style.display = 'block';
-
-                // Add to history
-                result.timestamp = Date.now();
-                history.unshift(result);
-                updateHistoryList();
-                updateChart();
-            } catch (error) {
-                resultDiv.innerHTML = '<p style="color: red;">Error: ' + error.message + '</p>';
-                resultDiv.style.display = 'block';
-            }
-        });
-
-        form.addEventListener('reset', (e) => {
-            resultDiv.style.display = 'none';
-        });
-
-        // Init
-        initChart();
-    </script>
-    <footer style="position: absolute; bottom: 10px; width: 100%; text-align: center; color: white; font-weight: bold;">
+    <footer class="footer">
     © 2025 By Wana Abel
 </footer>
 </body>
 </html>
 """
 
+# Both pages are static: render them once and serve precompressed bytes with ETags.
+# CSS/JS (including the charting library) are self-hosted under fingerprinted URLs.
+static_assets = StaticAssets(os.path.join(app.root_path, 'static'))
+LOGIN_PAGE = CompressedContent(app.jinja_env.from_string(LOGIN_TEMPLATE).render(asset_url=static_assets.url),
+                               'text/html')
+PREDICTION_PAGE = CompressedContent(app.jinja_env.from_string(PREDICTION_TEMPLATE).render(asset_url=static_assets.url),
+                                    'text/html')
+
+def predict_proba_matrix(input_data):
+    # Class probabilities for an imputed (N, 8) feature matrix from the active model
+    return model_registry.current.pipeline.predict_proba(input_data)
+
+# Coalesces concurrent single-row requests into one model call
+micro_batcher = MicroBatcher(predict_proba_matrix, max_batch_size=MICROBATCH_MAX_SIZE,
+                             max_wait=MICROBATCH_WAIT_MS / 1000) if MICROBATCH else None
+
+inference_pool = ThreadPoolExecutor(INFERENCE_THREADS, thread_name_prefix='inference') if INFERENCE_THREADS > 0 else None
+
+def run_inference(fn, *args, **kwargs):
+    # Call a scoring function on the inference pool and wait for it (inline without a pool)
+    if inference_pool is None:
+        return fn(*args, **kwargs)
+    return inference_pool.submit(fn, *args, **kwargs).result()
+
+def shutdown():
+    # Graceful shutdown: finish queued scoring work, then stop the background workers
+    if micro_batcher is not None:
+        micro_batcher.shutdown()
+    if inference_pool is not None:
+        inference_pool.shutdown(wait=True)
+    if drift_monitor is not None:
+        drift_monitor.stop()
+
+def score_row(input_data, active):
+    # Probabilities for one imputed row from the given model version,
+    # through the micro-batcher when enabled
+    if micro_batcher is not None:
+        return micro_batcher.predict_proba_row(input_data, active.pipeline.predict_proba)
+    return run_inference(active.pipeline.predict_proba, input_data)[0]
+
+def predict_proba_row(input_data, active, timer=NULL_TIMER):
+    # Probabilities for one imputed row, answered from the prediction cache when possible
+    if not prediction_cache.enabled:
+        probabilities = score_row(input_data, active)
+        timer.mark('inference')
+        return probabilities
+    key = prediction_cache.key(input_data, active.version.encode())
+    probabilities = prediction_cache.get(key)
+    timer.mark('cache_lookup')
+    if probabilities is None:
+        probabilities = score_row(input_data, active)
+        prediction_cache.put(key, probabilities)
+        timer.mark('inference')
+    return probabilities
+
+def adaptive_requested():
+    mode = request.args.get('mode')
+    return mode == 'adaptive' or (ADAPTIVE and mode != 'full')
+
+def explain_requested():
+    # ?explain=1 adds the bias and per-feature contributions to each result (full forest)
+    return request.args.get('explain', '0') not in ('0', 'false', '')
+
+def stage_timer():
+    return StageTimer(predict_stages) if metrics is not None else NULL_TIMER
+
+def admin_authorized():
+    return ADMIN_TOKEN is not None and request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+def history_id():
+    # Sessions created before server-side history get an ID on first use
+    return session.setdefault('history_id', uuid.uuid4().hex)
+
+def admission_controlled(view):
+    # Run the view only if admission control lets the request in; shed it otherwise
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if admission is None or 'logged_in' not in session:
+            return view(*args, **kwargs)
+        rejection = admission.acquire(history_id())
+        if rejection is not None:
+            return jsonify({'error': rejection.message()}), rejection.status, {'Retry-After': str(rejection.retry_after)}
+        try:
+            return view(*args, **kwargs)
+        finally:
+            admission.release()
+    return wrapper
+
 @app.route('/')
 def home():
     # ALWAYS start with login page
-    return render_template_string(LOGIN_TEMPLATE)
+    return LOGIN_PAGE.respond(request)
 
 @app.route('/dashboard')
 def dashboard():
     if 'logged_in' not in session:
         return redirect(url_for('home'))
-    return render_template_string(PREDICTION_TEMPLATE)
+    return PREDICTION_PAGE.respond(request, 'private, no-cache')
+
+@app.route('/static/<path:filename>')
+def static_file(filename):
+    response = static_assets.respond(request, filename)
+    if response is None:
+        abort(404)
+    return response
 
 @app.route('/login', methods=['POST'])
 def login():
@@ -560,8 +431,8 @@ def login():
     password = request.form['password']
     if password == '1234':
         session['logged_in'] = True
-        if 'history' not in session:
-            session['history'] = []
+        session.pop('history', None)  # Drop histories left in old cookies
+        session.setdefault('history_id', uuid.uuid4().hex)
         return redirect(url_for('dashboard'))
     else:
         return 'Invalid password! <a href="/">Try again</a>', 401
@@ -569,49 +440,336 @@ def login():
 @app.route('/logout')
 def logout():
     session.pop('logged_in', None)
-    session.pop('history', None)
+    if 'history_id' in session:
+        history_store.drop(session.pop('history_id'))
     return redirect(url_for('home'))
 
 @app.route('/history')
 def get_history():
     if 'logged_in' not in session:
         return jsonify([])
-    return jsonify(session['history'])
+    # Newest first; pass the last entry's id as ?before= to fetch the next page
+    limit = request.args.get('limit', type=int)
+    before = request.args.get('before', type=int)
+    if limit is not None and limit < 0:
+        return jsonify({'error': 'limit must not be negative'}), 400
+    return jsonify(history_store.page(history_id(), limit=limit, before=before))
 
 @app.route('/clear_history', methods=['POST'])
 def clear_history():
     if 'logged_in' not in session:
         return jsonify({'error': 'Not logged in'}), 401
-    session['history'] = []
+    history_store.clear(history_id())
     return jsonify({'status': 'cleared'})
 
 @app.route('/predict', methods=['POST'])
+@admission_controlled
 def predict():
     if 'logged_in' not in session:
         return redirect(url_for('home'))
+    # One model version serves the whole request, even if a reload swaps it meanwhile
+    active = model_registry.current
+    timer = stage_timer()
     try:
-        data = request.form.to_dict()
-        input_data = np.array([[float(data.get(name, 0)) for name in feature_names]])
-        input_df = pd.DataFrame(input_data, columns=feature_names)
-        input_df[features_to_impute] = imputer.transform(input_df[features_to_impute])
-        prediction = model.predict(input_df)[0]
-        probability = model.predict_proba(input_df)[0][1] if hasattr(model, 'predict_proba') else None
-        result = {
-            'outcome': int(prediction),
-            'risk': 'High' if prediction == 1 else 'Low',
-            'probability': f"{probability:.2%}" if probability is not None else 'N/A'
-        }
+        input_data = active.pipeline.preprocessor.parse_record(request.form)
+        timer.mark('preprocess')
+        explanation = None
+        if explain_requested():
+            # Contributions come with their probabilities from one traversal
+            probabilities, bias, contributions = run_inference(active.pipeline.explain, input_data)
+            probabilities = probabilities[0]
+            explanation, trees_used = format_contributions(bias, contributions[0]), None
+            timer.mark('inference')
+        elif adaptive_requested():
+            # The probability is a partial-forest estimate: labelled as such in the response
+            # and never put into the prediction cache
+            probabilities, trees_used = run_inference(active.pipeline.predict_proba_adaptive, input_data,
+                                                      ADAPTIVE_CONFIDENCE, ADAPTIVE_TREE_BATCH)
+            probabilities = probabilities[0]
+            timer.mark('inference')
+        else:
+            probabilities, trees_used = predict_proba_row(input_data, active, timer), None
+        prediction = active.pipeline.classes_[np.argmax(probabilities)]
+        probability = probabilities[1]
+        result = format_result(prediction, probability)
+        result['model_version'] = active.version
+        if trees_used is not None:
+            result['trees_used'] = int(trees_used[0])
+            result['probability_estimate'] = True
+        if explanation is not None:
+            result.update(explanation)
+        observe_predictions(input_data, [prediction], [probability])
         # Append to history
         result['timestamp'] = datetime.now().isoformat()
-        session['history'].insert(0, result)  # Prepend for newest first
-        session.modified = True
-        return jsonify(result)
+        history_store.append(history_id(), result)
+        timer.mark('history')
+        response = jsonify(result)
+        timer.mark('serialize')
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    try:
+        records = records_from_payload(request.get_json(force=True), feature_names)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    if len(records) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch too large (max {MAX_BATCH_SIZE} records)'}), 413
+
+    active = model_registry.current
+    results = run_inference(active.pipeline.score_records, records, explain=explain_requested(),
+                            observe=observe_predictions)
+    n_errors = sum('error' in result for result in results)
+    return jsonify({'count': len(records), 'errors': n_errors, 'model_version': active.version,
+                    'results': results})
+
+@app.route('/predict_binary', methods=['POST'])
+def predict_binary():
+    # Score a .npy float matrix (feature_names column order) or an Arrow IPC stream and
+    # answer with [outcome, probability] rows in the same format
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    fmt = binary_format(request.mimetype) or request.args.get('format')
+    if fmt not in MIMETYPES:
+        return jsonify({'error': 'Send application/x-npy or application/vnd.apache.arrow.stream'}), 415
+    try:
+        matrix = read_matrix(request.get_data(cache=False), fmt, feature_names)
+    except ImportError as e:
+        return jsonify({'error': str(e)}), 415
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(matrix) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch too large (max {MAX_BATCH_SIZE} records)'}), 413
+
+    active = model_registry.current
+    outcomes, probabilities, errors = run_inference(active.pipeline.score_matrix, matrix, observe=observe_predictions)
+    return Response(write_results(outcomes, probabilities, fmt), mimetype=MIMETYPES[fmt],
+                    headers={'X-Model-Version': active.version, 'X-Rejected-Rows': str(len(errors))})
+
+@app.route('/what_if', methods=['POST'])
+def what_if():
+    # Risk curve (one feature) or surface (two) for one patient as the swept features vary:
+    # {"patient": {...}, "features": ["Glucose"] or [{"name": "BMI", "min": 20, "max": 50, "steps": 31}]}
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    payload = request.get_json(force=True, silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('patient', {}), dict):
+        return jsonify({'error': 'Expected {"patient": {...}, "features": [...]}'}), 400
+    active = model_registry.current
+    try:
+        columns, axes = sweep_from_payload(payload.get('features'), feature_names, WHAT_IF_RANGES, WHAT_IF_STEPS,
+                                           MAX_BATCH_SIZE)
+        row = active.pipeline.preprocessor.parse_record(payload.get('patient', {})).copy()
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    if len(columns) > WHAT_IF_MAX_FEATURES:
+        return jsonify({'error': f'At most {WHAT_IF_MAX_FEATURES} features can be swept together'}), 400
+
+    probabilities = run_inference(active.pipeline.sweep, row, columns, axes)
+    return jsonify({
+        'model_version': active.version,
+        'features': [feature_names[column] for column in columns],
+        'axes': [values.tolist() for values in axes],
+        'patient': dict(zip(feature_names, row[0].tolist())),
+        # Nested [axis 0][axis 1] for a surface; rounded to keep the payload small
+        'probability': np.round(probabilities, 4).tolist(),
+    })
+
+@app.route('/analytics')
+def analytics_summary():
+    # Population aggregates: all-time totals plus the most recent ?windows=N time windows
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    if analytics is None:
+        return jsonify({'error': 'Analytics are disabled'}), 404
+    summary = analytics.snapshot(windows=request.args.get('windows', type=int))
+    summary['dataset'] = OVERALL_STATS
+    return jsonify(summary)
+
+@app.route('/drift')
+def drift_status():
+    # Last drift check (per-feature PSI/KS, zero rates, active alerts) and recent alert events
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    if drift_monitor is None:
+        return jsonify({'error': 'Drift monitoring is disabled'}), 404
+    return jsonify(drift_monitor.status())
+
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(prediction_cache.stats())
+
+@app.route('/batch_stats')
+def batch_stats():
+    if micro_batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **micro_batcher.stats()})
+
+@app.route('/admission_stats')
+def admission_stats():
+    if admission is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **admission.stats()})
+
+@app.route('/predict_stream', methods=['POST'])
+def predict_stream():
+    # Score an uploaded CSV or NDJSON file (multipart 'file' or raw body) chunk by chunk
+    # and stream results back in the same format
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    upload = request.files.get('file')
+    if upload is not None:
+        # Detach the spooled upload: Flask closes request files when the view returns,
+        # before the streamed response is consumed
+        fmt, source = detect_format(upload.mimetype, upload.filename), upload.stream
+        upload.stream = io.BytesIO()
+    else:
+        fmt, source = detect_format(request.mimetype), request.stream
+    fmt = request.args.get('format', fmt)
+    stream = text_stream(source)
+    try:
+        chunks = iter_chunks(stream, fmt, feature_names, STREAM_CHUNK_ROWS)
+        # Read the first chunk up front so a bad header fails before streaming starts
+        first = next(chunks, None)
     except Exception as e:
+        stream.close()
+        return jsonify({'error': str(e)}), 400
+
+    active = model_registry.current
+
+    def generate():
+        yield format_header(fmt)
+        try:
+            for start, records, parse_errors in itertools.chain([first] if first else [], chunks):
+                yield format_rows(run_inference(active.pipeline.score_records, records, start, parse_errors,
+                                                observe=observe_predictions), fmt)
+        except Exception as e:
+            yield format_rows([{'index': None, 'error': f'Stream aborted: {e}'}], fmt)
+        finally:
+            if upload is not None:
+                stream.close()
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'X-Model-Version': active.version})
+
+@app.route('/admin/model')
+def admin_model():
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(model_registry.status())
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    # Load a new model file in the background; poll /admin/model for the outcome
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    path = (request.get_json(silent=True) or {}).get('path') or MODEL_PATH
+    try:
+        path = resolve_model_path(str(path), MODEL_DIR)
+    except ValueError as e:
         return jsonify({'error': str(e)}), 400
+    if not os.path.isfile(path):
+        return jsonify({'error': f'Model file not found: {path}'}), 400
+    if not model_registry.reload_async(path):
+        return jsonify({'error': 'A reload is already in progress'}), 409
+    return jsonify({'status': 'loading', 'path': path}), 202
+
+@app.route('/admin/rollback', methods=['POST'])
+def admin_rollback():
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    try:
+        model_registry.rollback()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(model_registry.status())
+
+def collect_runtime_metrics():
+    # Gauges and counters read from the cache, micro-batcher and model registry at scrape time
+    cache = prediction_cache.stats()
+    collected = [
+        snapshot('gauge', 'dps_prediction_cache_entries', 'Entries in the prediction cache', cache['size']),
+        snapshot('counter', 'dps_prediction_cache_events_total', 'Prediction cache hits, misses and removals',
+                 {(event,): cache[event] for event in ('hits', 'misses', 'evictions', 'expirations', 'invalidations')},
+                 ['event']),
+        snapshot('gauge', 'dps_startup_seconds', 'Duration of each startup phase',
+                 {(phase,): seconds for phase, seconds in startup_timings.items()}, ['phase']),
+    ]
+    active = model_registry.current
+    collected.append(snapshot('gauge', 'dps_model_info', 'Active model version',
+                              {(active.version, active.pipeline.engine): 1}, ['version', 'engine']))
+    memory = process_memory()
+    if memory is not None:
+        collected.append(snapshot('gauge', 'dps_process_memory_bytes', 'Resident and shared memory of this worker',
+                                  {('resident',): memory[0], ('shared',): memory[1]}, ['kind']))
+    if admission is not None:
+        admitted = admission.stats()
+        collected += [
+            snapshot('gauge', 'dps_admission_in_flight', 'Admitted /predict requests running', admitted['in_flight']),
+            snapshot('gauge', 'dps_admission_queue_depth', 'Requests waiting for a /predict slot', admitted['queue_depth']),
+            snapshot('counter', 'dps_admission_admitted_total', 'Requests admitted to /predict', admitted['admitted']),
+            snapshot('counter', 'dps_admission_queued_total', 'Requests that had to wait for a slot', admitted['queued']),
+            snapshot('counter', 'dps_admission_shed_total', 'Requests rejected by admission control',
+                     {(reason,): count for reason, count in admitted['shed'].items()}, ['reason']),
+        ]
+    report = drift_monitor.report if drift_monitor is not None else None
+    if report is not None:
+        collected += [
+            snapshot('gauge', 'dps_drift_psi', 'Population Stability Index of each feature at the last drift check',
+                     {(name,): stats['psi'] for name, stats in report['features'].items() if 'psi' in stats},
+                     ['feature']),
+            snapshot('gauge', 'dps_drift_alerts', 'Drift alerts raised at the last check', len(report['alerts'])),
+        ]
+    if micro_batcher is not None:
+        batcher = micro_batcher.stats()
+        collected += [
+            snapshot('gauge', 'dps_microbatch_queue_depth', 'Rows waiting for the micro-batcher', batcher['queue_depth']),
+            snapshot('counter', 'dps_microbatch_batches_total', 'Batches scored by the micro-batcher', batcher['batches']),
+            snapshot('counter', 'dps_microbatch_rows_total', 'Rows scored by the micro-batcher', batcher['rows']),
+        ]
+    return collected
+
+def metrics_before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_in_flight = True
+    requests_in_flight.inc()
+
+def metrics_after_request(response):
+    endpoint = request.endpoint or 'unknown'
+    request_latency.observe(time.perf_counter() - g.metrics_started, endpoint)
+    requests_total.inc(endpoint, request.method, str(response.status_code))
+    if response.status_code >= 400:
+        request_errors.inc(endpoint)
+    return response
+
+def metrics_teardown_request(error=None):
+    # Decrement once per increment: teardown also runs for contexts that never reached
+    # before_request (test request contexts) and again when a streamed response's
+    # generator closes the context it re-entered
+    if g.pop('metrics_in_flight', False):
+        requests_in_flight.dec()
+
+if metrics is not None:
+    metrics.add_collector(collect_runtime_metrics)
+    app.before_request(metrics_before_request)
+    app.after_request(metrics_after_request)
+    app.teardown_request(metrics_teardown_request)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if metrics is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
-    import os
+    logging.basicConfig(level=logging.INFO)
+    log_startup_timings()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
 
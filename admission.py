@@ -0,0 +1,130 @@
+# Admission control for the Diabetes Prediction app
+# Caps concurrent /predict work, queues a bounded number of requests in FIFO order
+# for at most a deadline, and rate-limits each session with a token bucket.
+# Requests beyond that are rejected immediately (429 for a session over its rate,
+# 503 when the service is saturated) with a Retry-After hint, so the requests that
+# are admitted keep a flat latency instead of everyone queueing behind inference.
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class Rejection:
+    def __init__(self, status, reason, retry_after):
+        self.status = status            # 429 or 503
+        self.reason = reason            # 'rate_limited', 'queue_full' or 'queue_timeout'
+        self.retry_after = retry_after  # whole seconds
+
+    def message(self):
+        if self.reason == 'rate_limited':
+            return 'Too many requests for this session'
+        return 'Server is busy, please retry'
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=0, max_queue=0, queue_timeout=0.1, rate=0.0, burst=10,
+                 max_sessions=10000, clock=time.monotonic):
+        self.max_in_flight = max_in_flight  # 0 = no concurrency limit
+        self.max_queue = max_queue          # requests allowed to wait for a slot
+        self.queue_timeout = queue_timeout  # seconds a request may wait before it is shed
+        self.rate = rate                    # tokens per second per session, 0 = no rate limit
+        self.burst = burst                  # bucket capacity
+        self.max_sessions = max_sessions    # buckets kept, least recently used dropped first
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()       # session key -> TokenBucket
+        self._waiters = deque()             # threading.Event per queued request, oldest first
+        self.in_flight = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = {'rate_limited': 0, 'queue_full': 0, 'queue_timeout': 0}
+        self.queue_wait_seconds = 0.0
+
+    def acquire(self, key):
+        # None when the request may run (call release() afterwards), else a Rejection
+        rejection = self._take_token(key) if self.rate > 0 else None
+        if rejection is not None:
+            return rejection
+        if self.max_in_flight <= 0:
+            with self._lock:
+                self.in_flight += 1
+                self.admitted += 1
+            return None
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.shed['queue_full'] += 1
+                return Rejection(503, 'queue_full', self._retry_after())
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+            self.queued += 1
+        started = time.perf_counter()
+        granted = waiter.wait(self.queue_timeout)
+        with self._lock:
+            self.queue_wait_seconds += time.perf_counter() - started
+            # release() may have handed over the slot just as the wait timed out
+            if granted or waiter.is_set():
+                self.admitted += 1
+                return None
+            self._waiters.remove(waiter)
+            self.shed['queue_timeout'] += 1
+            return Rejection(503, 'queue_timeout', self._retry_after())
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # Hand the slot straight to the oldest waiter; in_flight stays the same
+                self._waiters.popleft().set()
+            else:
+                self.in_flight -= 1
+
+    def _retry_after(self):
+        return max(1, math.ceil(self.queue_timeout))
+
+    def _take_token(self, key):
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.burst, now)
+                while len(self._buckets) > self.max_sessions:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return None
+            self.shed['rate_limited'] += 1
+            return Rejection(429, 'rate_limited', max(1, math.ceil((1 - bucket.tokens) / self.rate)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._waiters),
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'queue_timeout_ms': self.queue_timeout * 1000,
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'sessions': len(self._buckets),
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'shed': dict(self.shed),
+                'queue_wait_seconds': self.queue_wait_seconds,
+            }
@@ -0,0 +1,261 @@
+# Streaming prediction analytics for the Diabetes Prediction app
+# Every scored row updates constant-memory aggregates for the current time window:
+# outcome counts, a probability histogram, per-feature running mean/variance (Welford,
+# mergeable) and per-feature quantile sketches with bounded relative error. A fixed
+# number of recent windows is kept and older ones are folded into an all-time
+# aggregate, so memory stays flat however many predictions are served and readers
+# (the dashboard, drift checks) never rescan raw history.
+
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Equal-width probability-of-diabetes bins over [0, 1]
+PROBABILITY_BINS = 20
+
+# Quantiles reported for every feature
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Single rows are buffered and folded into the current window this many at a time
+PENDING_ROWS = 256
+
+# Sketch bucket indices are stored offset by this so the sign of a code is the value's sign
+_KEY_OFFSET = 1 << 20
+
+
+class QuantileSketch:
+    # Log-bucketed sketch (DDSketch) of each column of a matrix: every value falls in bucket
+    # ceil(log_gamma |x|), so any quantile is answered within `relative_accuracy` of a true
+    # value. Buckets beyond max_buckets are collapsed from the smallest magnitudes up.
+    def __init__(self, n_features, relative_accuracy=0.01, max_buckets=2048, zero_threshold=1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.zero_threshold = zero_threshold
+        self.stores = [{} for _ in range(n_features)]  # per feature: signed bucket code -> count
+
+    def codes(self, matrix):
+        # Signed bucket code of every value; 0 for |x| below zero_threshold
+        magnitude = np.abs(matrix)
+        keys = np.zeros(matrix.shape, dtype=np.int64)
+        nonzero = magnitude > self.zero_threshold
+        keys[nonzero] = np.ceil(np.log(magnitude[nonzero]) / self.log_gamma).astype(np.int64) + _KEY_OFFSET
+        return np.where(matrix < 0, -keys, keys)
+
+    def add(self, matrix, finite):
+        # Count the finite values of an (N, n_features) matrix
+        codes = self.codes(np.where(finite, matrix, 0.0))
+        for feature, store in enumerate(self.stores):
+            values, counts = np.unique(codes[finite[:, feature], feature], return_counts=True)
+            for code, count in zip(values.tolist(), counts.tolist()):
+                store[code] = store.get(code, 0) + count
+        for store in self.stores:
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+
+    def merge(self, other):
+        for store, other_store in zip(self.stores, other.stores):
+            for code, count in other_store.items():
+                store[code] = store.get(code, 0) + count
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+
+    def _collapse(self, store):
+        # Fold the smallest-magnitude buckets into the next bucket of the same sign (or zero)
+        ordered = sorted(store, key=abs)
+        excess = len(store) - self.max_buckets
+        kept = ordered[excess:]
+        for code in ordered[:excess]:
+            count = store.pop(code)
+            target = next((c for c in kept if c and (c > 0) == (code > 0)), 0)
+            store[target] = store.get(target, 0) + count
+
+    def value(self, code):
+        # Representative value of a bucket, within relative_accuracy of everything in it
+        if code == 0:
+            return 0.0
+        estimate = 2 * self.gamma ** (abs(code) - _KEY_OFFSET) / (self.gamma + 1)
+        return estimate if code > 0 else -estimate
+
+    def buckets(self, feature):
+        # [(value, count)] of one feature in increasing value order
+        return sorted((self.value(code), count) for code, count in self.stores[feature].items())
+
+    def quantiles(self, feature, qs):
+        buckets = self.buckets(feature)
+        total = sum(count for _, count in buckets)
+        if not total:
+            return [None] * len(qs)
+        cumulative = np.cumsum([count for _, count in buckets])
+        values = [value for value, _ in buckets]
+        return [values[int(np.searchsorted(cumulative, q * (total - 1), side='right'))] for q in qs]
+
+    def cdf(self, feature, points):
+        # Fraction of values <= each point (to the sketch's accuracy)
+        buckets = self.buckets(feature)
+        total = sum(count for _, count in buckets)
+        if not total:
+            return np.zeros(len(points))
+        values = np.array([value for value, _ in buckets])
+        cumulative = np.cumsum([count for _, count in buckets])
+        positions = np.searchsorted(values, points, side='right')
+        return np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0) / total
+
+
+class Aggregate:
+    # Everything known about the rows scored in one time span
+    def __init__(self, n_features, start=None, relative_accuracy=0.01):
+        self.start = start
+        self.end = start
+        self.count = 0
+        self.outcomes = {}
+        self.probability_histogram = np.zeros(PROBABILITY_BINS, dtype=np.int64)
+        self.feature_count = np.zeros(n_features, dtype=np.int64)  # finite values seen
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)                              # sum of squared deviations
+        self.min = np.full(n_features, np.inf)
+        self.max = np.full(n_features, -np.inf)
+        self.sketch = QuantileSketch(n_features, relative_accuracy)
+
+    def observe(self, matrix, outcomes, probabilities):
+        self.count += len(matrix)
+        for outcome in outcomes:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        probabilities = probabilities[np.isfinite(probabilities)]
+        bins = np.minimum((probabilities * PROBABILITY_BINS).astype(np.intp), PROBABILITY_BINS - 1)
+        self.probability_histogram += np.bincount(bins, minlength=PROBABILITY_BINS)
+
+        # Moments of the batch (NaNs skipped), then merged into the running ones
+        finite = np.isfinite(matrix)
+        count = finite.sum(axis=0)
+        mean = np.where(finite, matrix, 0.0).sum(axis=0) / np.maximum(count, 1)
+        m2 = (np.where(finite, matrix - mean, 0.0) ** 2).sum(axis=0)
+        self._merge_moments(count, mean, m2, np.where(finite, matrix, np.inf).min(axis=0),
+                            np.where(finite, matrix, -np.inf).max(axis=0))
+        self.sketch.add(matrix, finite)
+
+    def _merge_moments(self, count, mean, m2, minimum, maximum):
+        # Chan et al. parallel update of per-feature count/mean/M2
+        total = self.feature_count + count
+        safe_total = np.maximum(total, 1)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / safe_total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.feature_count * count / safe_total
+        self.feature_count = total
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+
+    def merge(self, other):
+        if other.start is not None:
+            self.start = other.start if self.start is None else min(self.start, other.start)
+            self.end = other.end if self.end is None else max(self.end, other.end)
+        self.count += other.count
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+        self.probability_histogram += other.probability_histogram
+        self._merge_moments(other.feature_count, other.mean, other.m2, other.min, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self, feature_names, quantiles=DEFAULT_QUANTILES):
+        features = {}
+        for index, name in enumerate(feature_names):
+            count = int(self.feature_count[index])
+            features[name] = {
+                'count': count,
+                'missing': self.count - count,
+                'mean': float(self.mean[index]) if count else None,
+                'std': math.sqrt(self.m2[index] / (count - 1)) if count > 1 else None,
+                'min': float(self.min[index]) if count else None,
+                'max': float(self.max[index]) if count else None,
+                'quantiles': {f'p{round(q * 100):02d}': value
+                              for q, value in zip(quantiles, self.sketch.quantiles(index, quantiles))},
+            }
+        return {
+            'start': self.start,
+            'end': self.end,
+            'count': self.count,
+            'outcomes': {str(outcome): count for outcome, count in sorted(self.outcomes.items())},
+            'probability_histogram': self.probability_histogram.tolist(),
+            'features': features,
+        }
+
+
+class PredictionAnalytics:
+    def __init__(self, feature_names, window_seconds=3600, max_windows=24, relative_accuracy=0.01,
+                 clock=time.time):
+        self.feature_names = list(feature_names)
+        self.window_seconds = window_seconds  # width of each time bucket
+        self.max_windows = max_windows        # recent windows kept; older ones are folded into `retired`
+        self.relative_accuracy = relative_accuracy
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows = deque()
+        self._retired = self._new_aggregate()
+        self._pending = []  # (row, outcome, probability) not yet added to the newest window
+
+    def _new_aggregate(self, start=None):
+        return Aggregate(len(self.feature_names), start, self.relative_accuracy)
+
+    def observe(self, matrix, outcomes, probabilities):
+        # Add scored rows: imputed (N, n_features) inputs, predicted classes and probability of
+        # diabetes. A single row is only buffered; whole batches are added at once.
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, len(self.feature_names))
+        if not len(matrix):
+            return
+        now = self.clock()
+        with self._lock:
+            window = self._window(now)
+            if len(matrix) == 1:
+                self._pending.append((matrix[0].tolist(), int(outcomes[0]), float(probabilities[0])))
+                if len(self._pending) >= PENDING_ROWS:
+                    self._flush()
+            else:
+                window.observe(matrix, [int(outcome) for outcome in outcomes], probabilities)
+            window.end = now
+
+    def _flush(self):
+        if self._pending:
+            rows, outcomes, probabilities = zip(*self._pending)
+            self._windows[-1].observe(np.array(rows), outcomes, probabilities)
+            self._pending = []
+
+    def _window(self, now):
+        start = math.floor(now / self.window_seconds) * self.window_seconds
+        if not self._windows or self._windows[-1].start != start:
+            self._flush()
+            self._windows.append(self._new_aggregate(start))
+            while len(self._windows) > self.max_windows:
+                self._retired.merge(self._windows.popleft())
+        return self._windows[-1]
+
+    def merged(self, since=None):
+        # One aggregate of every window that ended at or after `since` (all time when None)
+        with self._lock:
+            self._flush()
+            total = self._new_aggregate()
+            if since is None:
+                total.merge(self._retired)
+            for window in self._windows:
+                if since is None or window.end >= since:
+                    total.merge(window)
+            return total
+
+    def snapshot(self, windows=None, quantiles=DEFAULT_QUANTILES):
+        # JSON-ready all-time totals plus the most recent `windows` windows, newest first
+        total = self.merged()
+        with self._lock:
+            self._flush()
+            recent = list(self._windows)[::-1][:windows]
+            recent = [window.summary(self.feature_names, quantiles) for window in recent]
+        return {
+            'window_seconds': self.window_seconds,
+            'probability_bins': PROBABILITY_BINS,
+            'total': total.summary(self.feature_names, quantiles),
+            'windows': recent,
+        }
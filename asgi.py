@@ -0,0 +1,149 @@
+# ASGI entry point for the Diabetes Prediction app
+# Wraps the Flask app so an ASGI server (uvicorn, see serve.py) serves the same routes.
+# Request bodies are received and responses sent on the event loop, so slow clients
+# never hold a thread; Flask handlers run on a bounded pool of handler threads, which
+# hand CPU-bound scoring to DPS's inference pool. The lifespan shutdown event waits
+# for in-flight work before the worker exits.
+
+import asyncio
+import contextvars
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import DPS
+
+# Handler threads per worker process; they mostly wait on history I/O and the inference pool
+HANDLER_THREADS = int(os.environ.get('DPS_HANDLER_THREADS', 32))
+
+# Request bodies above this size are spooled to a temporary file
+SPOOL_MAX_BYTES = 1 << 20
+
+_DONE = object()
+
+
+def _unsupported_write(data):
+    # The legacy WSGI write() callable; Flask never uses it
+    raise NotImplementedError('WSGI write() is not supported')
+
+
+def build_environ(scope, body):
+    # WSGI environ for an ASGI HTTP scope; body is a file positioned at the start
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.input_terminated': True,  # the whole body is buffered, with or without Content-Length
+    }
+    for name, value in scope.get('headers', []):
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            environ[key] += ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        else:
+            environ[key] = value
+    return environ
+
+
+class AsgiAdapter:
+    def __init__(self, wsgi_app, threads=HANDLER_THREADS, on_shutdown=None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='handler')
+        self.on_shutdown = on_shutdown  # called once handlers have drained
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        if self.on_shutdown is not None:
+            self.on_shutdown()
+
+    async def handle_http(self, scope, receive, send):
+        # Buffer the whole body on the event loop before a handler thread is involved
+        body = tempfile.SpooledTemporaryFile(SPOOL_MAX_BYTES)
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return
+            body.write(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        body.seek(0)
+
+        # Every step of one request runs in the same context so Flask's context
+        # variables (and streamed responses) work across handler threads
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+
+        def call(fn, *args):
+            return loop.run_in_executor(self.executor, context.run, fn, *args)
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers]
+            return _unsupported_write
+
+        iterable = None
+        try:
+            iterable = await call(self.wsgi_app, build_environ(scope, body), start_response)
+            iterator = iter(iterable)
+            chunk = await call(next, iterator, _DONE)
+            await send({'type': 'http.response.start', 'status': started['status'],
+                        'headers': started['headers']})
+            while chunk is not _DONE:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await call(next, iterator, _DONE)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(iterable, 'close'):
+                await call(iterable.close)
+            body.close()
+
+
+app = AsgiAdapter(DPS.app, on_shutdown=DPS.shutdown)
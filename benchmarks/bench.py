@@ -0,0 +1,369 @@
+# Reproducible benchmark suite for the Diabetes Prediction serving path
+# Microbenchmarks cover request preprocessing, the imputer, predict_proba at batch
+# sizes 1-10k for each engine, adaptive early-exit scoring, feature contributions and
+# history growth; the end-to-end load generator drives the Flask app through the test
+# client and a real local server at a configurable concurrency. Results (p50/p95/p99 latency, throughput, peak RSS)
+# are written as JSON and can be compared against a stored baseline.
+#
+# Usage (from anywhere):
+#   python benchmarks/bench.py --output results.json
+#   python benchmarks/bench.py --save-baseline              # writes benchmarks/baseline.json
+#   python benchmarks/bench.py --baseline benchmarks/baseline.json --threshold 0.2
+#   python benchmarks/bench.py --only micro --quick
+#
+# Exits with status 1 when a benchmark's p50 is slower than the baseline by more
+# than the threshold, or when the compiled engine is slower than sklearn at 1k or 10k rows.
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+# The compiled engine must not be slower than sklearn at these batch sizes (it hands them to
+# sklearn, see scoring.COMPILED_MAX_ROWS); calls alternate between the engines so the
+# small tolerance only has to absorb timing noise, not drift in machine load
+ENGINE_CHECK_SIZES = (1000, 10000)
+ENGINE_CHECK_REPEATS = 15
+ENGINE_TOLERANCE = 0.1
+
+SAMPLE_FORM = {'Pregnancies': '6', 'Glucose': '148', 'BloodPressure': '72', 'SkinThickness': '35',
+               'Insulin': '0', 'BMI': '33.6', 'DiabetesPedigreeFunction': '0.627', 'Age': '50'}
+
+
+def summarize(latencies, wall=None):
+    # Latencies in seconds -> microsecond percentiles plus throughput in calls/s
+    latencies = np.asarray(latencies, dtype=np.float64) * 1e6
+    summary = {
+        'n': int(latencies.size),
+        'mean_us': float(latencies.mean()),
+        'p50_us': float(np.percentile(latencies, 50)),
+        'p95_us': float(np.percentile(latencies, 95)),
+        'p99_us': float(np.percentile(latencies, 99)),
+    }
+    total = wall if wall is not None else latencies.sum() / 1e6
+    summary['throughput_per_s'] = float(latencies.size / total) if total else 0.0
+    return summary
+
+
+def measure(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def compare_engines(sklearn, compiled, batch, repeat, warmup=3):
+    # Best time of each engine with the calls interleaved, so both see the same machine load;
+    # the minimum is the least noisy estimate of a deterministic computation
+    for _ in range(warmup):
+        sklearn(batch), compiled(batch)
+    latencies = {'sklearn': [], 'compiled': []}
+    for _ in range(repeat):
+        for name, fn in (('sklearn', sklearn), ('compiled', compiled)):
+            started = time.perf_counter()
+            fn(batch)
+            latencies[name].append(time.perf_counter() - started)
+    sklearn_best, compiled_best = (min(latencies[name]) * 1e6 for name in ('sklearn', 'compiled'))
+    return {'sklearn_best_us': sklearn_best, 'compiled_best_us': compiled_best, 'ratio': compiled_best / sklearn_best}
+
+
+def random_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 15, n), rng.uniform(40, 200, n), rng.uniform(30, 120, n), rng.uniform(0, 60, n),
+        rng.uniform(0, 500, n), rng.uniform(15, 60, n), rng.uniform(0.05, 2.5, n), rng.integers(21, 81, n),
+    ]).astype(np.float64)
+
+
+def repeats_for(batch_size, quick):
+    # Keep every benchmark to roughly the same wall time
+    base = 20 if quick else 100
+    return max(3, base // max(1, int(np.log10(batch_size)) * 2 or 1))
+
+
+def micro_benchmarks(quick=False):
+    from scoring import ScoringPipeline, build_imputer, feature_names, features_to_impute
+    from history_store import MemoryHistoryStore
+    results = {}
+    repeat = 200 if quick else 2000
+
+    pipelines = {engine: ScoringPipeline.load(engine=engine) for engine in ('sklearn', 'compiled')}
+    compiled = pipelines['compiled']
+    for thresholds in ('float32', 'int16'):
+        pipelines[f'compact_{thresholds}'] = ScoringPipeline(
+            compiled.preprocessor, compiled_forest=compiled.compiled_forest.compact(thresholds))
+    preprocessor = pipelines['sklearn'].preprocessor
+
+    # Request preprocessing: the original DataFrame + imputer path vs the compiled one
+    import pandas as pd
+    imputer = build_imputer()
+    frame_imputer = build_imputer().fit(pd.DataFrame(np.zeros((1, len(features_to_impute))),
+                                                     columns=features_to_impute))
+
+    def dataframe_preprocess():
+        input_data = np.array([[float(SAMPLE_FORM.get(name, 0)) for name in feature_names]])
+        input_df = pd.DataFrame(input_data, columns=feature_names)
+        input_df[features_to_impute] = frame_imputer.transform(input_df[features_to_impute])
+
+    results['preprocess/dataframe'] = measure(dataframe_preprocess, repeat)
+    results['preprocess/compiled'] = measure(lambda: preprocessor.parse_record(SAMPLE_FORM), repeat)
+
+    # Imputer on its own, one row and 10k rows
+    row = random_features(1)
+    columns = [feature_names.index(name) for name in features_to_impute]
+    results['imputer/simple_imputer/1'] = measure(lambda: imputer.transform(row[:, columns]), repeat)
+    results['imputer/compiled/1'] = measure(lambda: preprocessor.impute(row.copy()), repeat)
+    large = random_features(10000)
+    results['imputer/simple_imputer/10000'] = measure(lambda: imputer.transform(large[:, columns]), repeat // 20)
+    results['imputer/compiled/10000'] = measure(lambda: preprocessor.impute(large.copy()), repeat // 20)
+
+    # predict_proba across batch sizes for each engine
+    for engine, pipeline in pipelines.items():
+        for batch_size in BATCH_SIZES:
+            batch = random_features(batch_size, seed=batch_size)
+            results[f'predict_proba/{engine}/{batch_size}'] = measure(
+                lambda: pipeline.predict_proba(batch), repeats_for(batch_size, quick))
+
+    # Compiled vs sklearn on the batch sizes the compiled engine must not lose
+    for batch_size in ENGINE_CHECK_SIZES:
+        batch = random_features(batch_size, seed=batch_size)
+        results[f'engine_check/{batch_size}'] = compare_engines(
+            pipelines['sklearn'].predict_proba, compiled.predict_proba, batch, ENGINE_CHECK_REPEATS)
+
+    # Adaptive early exit vs full evaluation on the compiled forest: latency, trees used and
+    # how often the label differs from the full forest
+    forest = compiled.compiled_forest
+    for batch_size in (1, 1000):
+        batch = random_features(batch_size, seed=batch_size)
+        full_labels = np.argmax(forest.predict_proba(batch), axis=1)
+        results[f'adaptive/full/{batch_size}'] = measure(lambda: forest.predict_proba(batch),
+                                                         repeats_for(batch_size, quick))
+        for confidence in (0.95, 0.99, 0.999):
+            result = measure(lambda: forest.predict_proba_adaptive(batch, confidence), repeats_for(batch_size, quick))
+            probabilities, trees_used = forest.predict_proba_adaptive(batch, confidence)
+            result['mean_trees_used'] = float(trees_used.mean())
+            result['disagreement_rate'] = float(np.mean(np.argmax(probabilities, axis=1) != full_labels))
+            results[f'adaptive/{confidence}/{batch_size}'] = result
+
+    # Per-feature contributions vs plain predict_proba on the compiled forest
+    for batch_size in BATCH_SIZES:
+        batch = random_features(batch_size, seed=batch_size)
+        result = measure(lambda: forest.predict_contributions(batch), repeats_for(batch_size, quick))
+        result['overhead_vs_predict_proba'] = result['p50_us'] / results[f'predict_proba/compiled/{batch_size}']['p50_us']
+        results[f'contributions/{batch_size}'] = result
+
+    # History growth: a signed session cookie holding the whole list (the old approach)
+    # vs an append to the server-side store, at increasing history lengths
+    from flask import Flask
+    serializer = Flask(__name__, root_path=ROOT)
+    serializer.secret_key = 'benchmark'
+    signer = serializer.session_interface.get_signing_serializer(serializer)
+    entry = {'outcome': 1, 'risk': 'High', 'probability': '90.00%', 'timestamp': datetime.now().isoformat()}
+    for length in (10, 100, 1000):
+        history = [entry] * length
+        results[f'history/session_cookie/{length}'] = measure(lambda: signer.dumps({'history': history}),
+                                                               repeat // 10)
+        store = MemoryHistoryStore(limit=length)
+        for _ in range(length):
+            store.append('user', entry)
+        results[f'history/store_append/{length}'] = measure(lambda: store.append('user', entry), repeat)
+        results[f'history/session_cookie/{length}']['cookie_bytes'] = len(signer.dumps({'history': history}))
+    return results
+
+
+def _login_form():
+    return {'username': 'bench', 'password': '1234'}
+
+
+def load_test_client(app, n_requests, concurrency):
+    # Each worker thread gets its own logged-in test client
+    latencies = []
+    lock = threading.Lock()
+    per_worker = max(1, n_requests // concurrency)
+
+    def worker():
+        client = app.test_client()
+        client.post('/login', data=_login_form())
+        local = []
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            response = client.post('/predict', data=SAMPLE_FORM)
+            local.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.data
+        with lock:
+            latencies.extend(local)
+
+    return _run_workers(worker, concurrency, latencies)
+
+
+def load_local_server(app, n_requests, concurrency):
+    # Real threaded werkzeug server on an ephemeral port, driven over HTTP
+    import http.cookiejar
+    import urllib.parse
+    import urllib.request
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    body = urllib.parse.urlencode(SAMPLE_FORM).encode()
+    latencies = []
+    lock = threading.Lock()
+    per_worker = max(1, n_requests // concurrency)
+
+    def worker():
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        opener.open(f'{base}/login', data=urllib.parse.urlencode(_login_form()).encode()).read()
+        local = []
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            opener.open(f'{base}/predict', data=body).read()
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    try:
+        return _run_workers(worker, concurrency, latencies)
+    finally:
+        server.shutdown()
+
+
+def _run_workers(worker, concurrency, latencies):
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, wall=time.perf_counter() - started)
+
+
+def e2e_benchmarks(n_requests, concurrency):
+    import logging
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    import DPS
+    # Disable the prediction cache so every request reaches the model
+    DPS.prediction_cache.maxsize = 0
+    tag = f'{DPS.INFERENCE_ENGINE}/c{concurrency}'
+    return {
+        f'e2e/test_client/{tag}': load_test_client(DPS.app, n_requests, concurrency),
+        f'e2e/local_server/{tag}': load_local_server(DPS.app, n_requests, concurrency),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def compare(results, baseline, threshold):
+    # Returns (name, baseline p50, current p50, ratio) for every benchmark slower than allowed
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('p50_us'):
+            continue
+        ratio = current['p50_us'] / previous['p50_us']
+        if ratio > 1 + threshold:
+            regressions.append((name, previous['p50_us'], current['p50_us'], ratio))
+    return regressions
+
+
+def engine_regressions(results):
+    # Returns (batch size, sklearn time, compiled time) wherever compiled scoring is slower
+    slower = []
+    for batch_size in ENGINE_CHECK_SIZES:
+        check = results.get(f'engine_check/{batch_size}')
+        if check and check['ratio'] > 1 + ENGINE_TOLERANCE:
+            slower.append((batch_size, check['sklearn_best_us'], check['compiled_best_us']))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the diabetes prediction serving path.')
+    parser.add_argument('--only', choices=['micro', 'e2e'], help='Run one group only')
+    parser.add_argument('--quick', action='store_true', help='Fewer repetitions')
+    parser.add_argument('--engine', choices=['sklearn', 'compiled'], default='sklearn',
+                        help='Inference engine for the end-to-end runs')
+    parser.add_argument('--requests', type=int, default=500, help='End-to-end requests per run')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent end-to-end clients')
+    parser.add_argument('--output', help='Write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='Compare against this results JSON')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help='Also store results as a baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed p50 slowdown vs baseline (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    # The app loads its model relative to the repository root
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    os.environ['DPS_INFERENCE_ENGINE'] = args.engine
+    os.environ.setdefault('DPS_METRICS', '0')
+    warnings.filterwarnings('ignore')
+
+    results = {}
+    if args.only in (None, 'micro'):
+        results.update(micro_benchmarks(args.quick))
+    if args.only in (None, 'e2e'):
+        n_requests = args.requests // 5 if args.quick else args.requests
+        results.update(e2e_benchmarks(n_requests, args.concurrency))
+
+    import sklearn
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args),
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text + '\n')
+
+    slower = engine_regressions(results)
+    for batch_size, sklearn_best, compiled_best in slower:
+        print(f'SLOWER engine_check/{batch_size}: compiled {compiled_best:.1f}us vs sklearn {sklearn_best:.1f}us',
+              file=sys.stderr)
+    if slower:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f'REGRESSION {name}: p50 {before:.1f}us -> {after:.1f}us ({ratio:.2f}x)', file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'No regressions beyond {args.threshold:.0%} against {args.baseline}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# Binary columnar payloads for machine-to-machine scoring in the Diabetes Prediction app
+# Reads a raw .npy float matrix (columns in feature_names order) or an Arrow IPC
+# stream (columns matched by name) straight into a float64 model input, checking
+# the schema once per payload, and writes [outcome, probability] back in the same
+# format. pyarrow (7.0 or newer) is optional; without it only .npy is accepted.
+
+import io
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+NPY_MIMETYPES = ('application/x-npy', 'application/npy')
+ARROW_MIMETYPES = ('application/vnd.apache.arrow.stream', 'application/x-arrow-stream')
+MIMETYPES = {'npy': NPY_MIMETYPES[0], 'arrow': ARROW_MIMETYPES[0]}
+
+RESULT_COLUMNS = ('outcome', 'probability')
+
+
+def binary_format(content_type):
+    # 'npy', 'arrow' or None for a request MIME type
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in NPY_MIMETYPES:
+        return 'npy'
+    if content_type in ARROW_MIMETYPES:
+        return 'arrow'
+    return None
+
+
+def read_matrix(body, fmt, feature_names):
+    # (N, n_features) float64 matrix; the only copy is the cast into the model's dtype
+    if fmt == 'npy':
+        return read_npy(body, len(feature_names))
+    if fmt == 'arrow':
+        return read_arrow(body, feature_names)
+    raise ValueError(f'Unsupported binary format: {fmt}')
+
+
+def read_npy(body, n_features):
+    stream = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(stream)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else \
+            np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(stream)
+    except ValueError as e:
+        raise ValueError(f'Invalid .npy payload: {e}')
+    if dtype.hasobject or dtype.kind not in 'fiub':
+        raise ValueError(f'.npy payload must be a numeric matrix, got dtype {dtype}')
+    if len(shape) != 2 or shape[1] != n_features:
+        raise ValueError(f'Expected an (N, {n_features}) matrix, got shape {shape}')
+    count = shape[0] * shape[1]
+    if len(body) - stream.tell() < count * dtype.itemsize:
+        raise ValueError('.npy payload is truncated')
+    data = np.frombuffer(body, dtype=dtype, count=count, offset=stream.tell())
+    data = data.reshape(shape, order='F' if fortran_order else 'C')
+    return np.array(data, dtype=np.float64, order='C')
+
+
+def read_arrow(body, feature_names):
+    if pa is None:
+        raise ImportError('Arrow payloads need pyarrow: pip install pyarrow')
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise ValueError(f'Invalid Arrow stream: {e}')
+    missing = [name for name in feature_names if name not in table.column_names]
+    if missing:
+        raise ValueError(f"Arrow schema is missing columns: {', '.join(missing)}")
+    matrix = np.empty((table.num_rows, len(feature_names)), dtype=np.float64)
+    for position, name in enumerate(feature_names):
+        column = table.column(name)
+        if not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            raise ValueError(f'Arrow column {name} must be numeric, got {column.type}')
+        # Copied chunk by chunk with Array APIs older pyarrow releases have too. Nulls are
+        # missing values: 0 like an empty CSV cell or absent JSON field, then imputed.
+        offset = 0
+        for chunk in column.cast(pa.float64()).chunks:
+            matrix[offset:offset + len(chunk), position] = np.asarray(chunk.fill_null(0.0))
+            offset += len(chunk)
+    return matrix
+
+
+def write_results(outcomes, probabilities, fmt):
+    # Serialize [outcome, probability] per row in the request's format; rejected rows are
+    # NaN in .npy output and null in Arrow output
+    if fmt == 'npy':
+        buffer = io.BytesIO()
+        np.save(buffer, np.column_stack([outcomes, probabilities]).astype(np.float64), allow_pickle=False)
+        return buffer.getvalue()
+    if fmt == 'arrow':
+        if pa is None:
+            raise ImportError('Arrow payloads need pyarrow: pip install pyarrow')
+        table = pa.table({name: pa.array(values, type=pa.float64(), from_pandas=True)
+                          for name, values in zip(RESULT_COLUMNS, (outcomes, probabilities))})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f'Unsupported binary format: {fmt}')
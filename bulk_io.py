@@ -0,0 +1,121 @@
+# Chunked readers and writers for bulk scoring in the Diabetes Prediction app
+# Parses CSV or NDJSON input a fixed number of rows at a time so memory stays
+# flat regardless of file size. Malformed rows come back as per-row errors
+# instead of aborting the whole stream.
+
+import csv
+import io
+import json
+
+CSV_FIELDS = ['index', 'outcome', 'risk', 'probability', 'error']
+
+
+def detect_format(content_type=None, filename=None, default='csv'):
+    # Pick 'csv' or 'ndjson' from an explicit MIME type or a file extension
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-seq'):
+        return 'ndjson'
+    filename = (filename or '').lower()
+    if filename.endswith('.csv'):
+        return 'csv'
+    if filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return default
+
+
+def text_stream(binary_stream, encoding='utf-8'):
+    return io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
+
+
+def csv_columns(header, feature_names):
+    # Map each feature to its position in the CSV header; extra columns are ignored
+    header = [name.strip() for name in header]
+    missing = [name for name in feature_names if name not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+    return [(name, header.index(name)) for name in feature_names]
+
+
+def csv_rows_to_records(rows, n_fields, columns):
+    # Turn raw CSV rows into records; empty cells are left out, so they default to 0 like
+    # a missing form or JSON field (and are then imputed in imputed columns)
+    records, errors = [], {}
+    for row in rows:
+        if len(row) != n_fields:
+            errors[len(records)] = f'Expected {n_fields} fields, got {len(row)}'
+            records.append(None)
+        else:
+            records.append({name: row[i] for name, i in columns if row[i].strip()})
+    return records, errors
+
+
+def iter_row_chunks(reader, chunk_rows=2048):
+    # Group raw CSV rows into lists of chunk_rows, skipping blank lines
+    rows = []
+    for row in reader:
+        if not row:
+            continue
+        rows.append(row)
+        if len(rows) == chunk_rows:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def iter_csv_chunks(stream, feature_names, chunk_rows=2048):
+    # Yield (start_index, records, errors) per chunk of a CSV with a header row
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = csv_columns(header, feature_names)
+    start = 0
+    for rows in iter_row_chunks(reader, chunk_rows):
+        records, errors = csv_rows_to_records(rows, len(header), columns)
+        yield start, records, errors
+        start += len(rows)
+
+
+def iter_ndjson_chunks(stream, chunk_rows=2048):
+    # Yield (start_index, records, errors) per chunk; blank lines are skipped
+    records, errors, start = [], {}, 0
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            errors[len(records)] = f'Malformed JSON: {e}'
+            records.append(None)
+        if len(records) == chunk_rows:
+            yield start, records, errors
+            start += len(records)
+            records, errors = [], {}
+    if records:
+        yield start, records, errors
+
+
+def iter_chunks(stream, fmt, feature_names, chunk_rows=2048):
+    if fmt == 'csv':
+        return iter_csv_chunks(stream, feature_names, chunk_rows)
+    if fmt == 'ndjson':
+        return iter_ndjson_chunks(stream, chunk_rows)
+    raise ValueError(f'Unsupported format: {fmt}')
+
+
+def format_rows(results, fmt):
+    # Serialize one chunk of result dicts as NDJSON lines or CSV rows
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(result) + '\n' for result in results)
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, CSV_FIELDS, extrasaction='ignore', lineterminator='\n').writerows(results)
+    return buffer.getvalue()
+
+
+def format_header(fmt):
+    if fmt == 'csv':
+        return ','.join(CSV_FIELDS) + '\n'
+    return ''
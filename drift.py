@@ -0,0 +1,247 @@
+# Input drift monitoring for the Diabetes Prediction app
+# Keeps the last `window_size` preprocessed feature vectors scored by the app in a
+# fixed ring buffer (O(window) memory; the request thread only copies a row in) and,
+# on a background thread, compares each feature against a stored reference profile:
+# the Population Stability Index over the reference's decile bins and the two-sample
+# Kolmogorov-Smirnov statistic against the reference sample. It also watches the
+# share of zeros in imputed columns, since the imputer only fills NaN and a 0 typed
+# for Glucose, BloodPressure, SkinThickness, Insulin or BMI reaches the model as is.
+#
+# Build a profile from the training data (CSV with a feature header or .npy matrix):
+#   python drift.py --reference pima.csv -o DiabetesPredictionModel.profile.json
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from model_registry import write_atomically
+
+# Reference sample size per feature kept in a profile (quantiles of the reference data)
+PROFILE_SAMPLE = 1000
+
+# PSI bins: deciles of the reference
+PROFILE_BINS = 10
+
+# Smallest bin share used in PSI, so empty bins do not produce infinities
+PSI_EPSILON = 1e-4
+
+
+def build_profile(matrix, feature_names, source=None):
+    # Reference profile of a preprocessed (N, n_features) matrix: PSI bin edges and shares,
+    # a quantile sample for KS, zero rate and moments per feature
+    matrix = np.asarray(matrix, dtype=np.float64)
+    features = {}
+    for index, name in enumerate(feature_names):
+        column = matrix[:, index]
+        column = column[np.isfinite(column)]
+        if not column.size:
+            raise ValueError(f'Reference has no values for {name}')
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, PROFILE_BINS + 1)[1:-1]))
+        features[name] = {
+            'edges': edges.tolist(),
+            'shares': (_bin_counts(column, edges) / column.size).tolist(),
+            'sample': np.quantile(column, np.linspace(0, 1, min(PROFILE_SAMPLE, column.size))).tolist(),
+            'zero_rate': float(np.mean(column == 0)),
+            'mean': float(column.mean()),
+            'std': float(column.std()),
+        }
+    return {
+        'feature_names': list(feature_names),
+        'created_at': datetime.now().isoformat(),
+        'source': source,
+        'rows': int(len(matrix)),
+        'features': features,
+    }
+
+
+def load_profile(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_profile(profile, path):
+    def write(staging):
+        with open(staging, 'w') as f:
+            json.dump(profile, f)
+
+    write_atomically(path, write)
+
+
+def _bin_counts(values, edges):
+    # Counts in (-inf, e0], (e0, e1], ..., (e_last, inf)
+    return np.bincount(np.searchsorted(edges, values, side='left'), minlength=len(edges) + 1)
+
+
+def population_stability_index(expected, actual):
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(sample, reference):
+    # Largest distance between the empirical CDFs of two sorted samples
+    points = np.concatenate([sample, reference])
+    sample_cdf = np.searchsorted(sample, points, side='right') / len(sample)
+    reference_cdf = np.searchsorted(reference, points, side='right') / len(reference)
+    return float(np.max(np.abs(sample_cdf - reference_cdf)))
+
+
+def ks_critical_value(n, m, alpha):
+    # Two-sample KS statistic above which the samples differ at significance alpha (asymptotic)
+    return math.sqrt(-math.log(alpha / 2) / 2) * math.sqrt((n + m) / (n * m))
+
+
+class DriftMonitor:
+    def __init__(self, feature_names, profile=None, window_size=5000, min_rows=200, psi_warning=0.1,
+                 psi_alert=0.25, ks_alpha=0.01, zero_columns=(), zero_rate_tolerance=0.05, history=100):
+        if profile is not None and profile['feature_names'] != list(feature_names):
+            raise ValueError('Drift profile feature order does not match feature_names')
+        if window_size < 1:
+            raise ValueError('Drift window_size must be at least 1')
+        self.feature_names = list(feature_names)
+        self.profile = profile
+        self.min_rows = min_rows                        # rows needed before statistics are computed
+        self.psi_warning = psi_warning                  # PSI of a noticeable shift
+        self.psi_alert = psi_alert                      # PSI of a significant shift
+        self.ks_alpha = ks_alpha                        # KS significance level
+        self.zero_columns = [self.feature_names.index(name) for name in zero_columns]
+        self.zero_rate_tolerance = zero_rate_tolerance  # allowed zero share above the reference's
+        self._lock = threading.Lock()
+        self._window = np.empty((window_size, len(self.feature_names)), dtype=np.float64)
+        self._next = 0      # ring position of the next row
+        self._rows = 0      # rows currently in the window
+        self.seen = 0       # rows observed since start
+        self.report = None  # result of the last check()
+        self.events = deque(maxlen=history)  # alerts raised or cleared, newest last
+        self._active = {}   # (feature, kind) -> alert currently raised
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def window_size(self):
+        return len(self._window)
+
+    def observe(self, matrix):
+        # Copy scored rows into the ring buffer, overwriting the oldest ones
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, len(self.feature_names))[-self.window_size:]
+        n = len(matrix)
+        with self._lock:
+            first = min(n, self.window_size - self._next)
+            self._window[self._next:self._next + first] = matrix[:first]
+            self._window[:n - first] = matrix[first:]
+            self._next = (self._next + n) % self.window_size
+            self._rows = min(self.window_size, self._rows + n)
+            self.seen += n
+
+    def window(self):
+        # Copy of the rows in the window (order does not matter to the statistics)
+        with self._lock:
+            return self._window[:self._rows].copy()
+
+    def check(self):
+        # Compute per-feature statistics over the current window and update the alerts
+        window = self.window()
+        features = {}
+        alerts = []
+        for index, name in enumerate(self.feature_names):
+            column = window[:, index]
+            column = np.sort(column[np.isfinite(column)])
+            stats = {'rows': int(column.size), 'mean': float(column.mean()) if column.size else None,
+                     'zero_rate': float(np.mean(column == 0)) if column.size else None}
+            reference = self.profile['features'][name] if self.profile is not None else None
+            if reference is not None and column.size >= self.min_rows:
+                shares = _bin_counts(column, np.asarray(reference['edges'])) / column.size
+                stats['psi'] = population_stability_index(reference['shares'], shares)
+                stats['ks'] = ks_statistic(column, np.asarray(reference['sample']))
+                stats['ks_critical'] = ks_critical_value(column.size, self.profile['rows'], self.ks_alpha)
+                stats['reference_mean'] = reference['mean']
+                ks_drift = stats['ks'] > stats['ks_critical']
+                if stats['psi'] >= self.psi_alert or (ks_drift and stats['psi'] >= self.psi_warning):
+                    stats['status'] = 'drift'
+                elif stats['psi'] >= self.psi_warning or ks_drift:
+                    stats['status'] = 'warning'
+                else:
+                    stats['status'] = 'ok'
+                if stats['status'] != 'ok':
+                    alerts.append({'feature': name, 'kind': 'distribution', 'severity': stats['status'],
+                                   'psi': stats['psi'], 'ks': stats['ks']})
+            if index in self.zero_columns and column.size >= self.min_rows:
+                allowed = (reference['zero_rate'] if reference is not None else 0.0) + self.zero_rate_tolerance
+                if stats['zero_rate'] > allowed:
+                    alerts.append({'feature': name, 'kind': 'unimputed_zeros', 'severity': 'warning',
+                                   'zero_rate': stats['zero_rate'], 'allowed': allowed})
+            features[name] = stats
+        now = datetime.now().isoformat()
+        self._record_events(alerts, now)
+        self.report = {
+            'checked_at': now,
+            'window_rows': int(len(window)),
+            'features': features,
+            'alerts': alerts,
+        }
+        return self.report
+
+    def _record_events(self, alerts, now):
+        current = {(alert['feature'], alert['kind']): alert for alert in alerts}
+        for key, alert in current.items():
+            if self._active.get(key, {}).get('severity') != alert['severity']:
+                self.events.append({'at': now, 'event': 'raised', **alert})
+        for key in self._active.keys() - current.keys():
+            self.events.append({'at': now, 'event': 'cleared', 'feature': key[0], 'kind': key[1]})
+        self._active = current
+
+    def start(self, interval=60.0):
+        # Run check() every `interval` seconds on a daemon thread
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='drift-monitor', daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def status(self):
+        profile = None
+        if self.profile is not None:
+            profile = {key: self.profile.get(key) for key in ('source', 'created_at', 'rows')}
+        return {
+            'profile': profile,
+            'window_size': self.window_size,
+            'seen': self.seen,
+            'last_check': self.report,
+            'events': list(self.events),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the reference profile used by the drift monitor.')
+    parser.add_argument('--reference', required=True, help='Training data: CSV with a feature header or .npy matrix')
+    parser.add_argument('-o', '--output', required=True, help='Profile JSON to write')
+    parser.add_argument('--model', help='Model whose preprocessor is applied first (default: the served model)')
+    args = parser.parse_args(argv)
+
+    from export_model import load_reference
+    from scoring import ScoringPipeline, MODEL_PATH, feature_names
+    # Profiled after the serving preprocessor, so it describes the vectors the model sees
+    preprocessor = ScoringPipeline.load(args.model or MODEL_PATH, engine='compiled').preprocessor
+    matrix = load_reference(args.reference, preprocessor)
+    save_profile(build_profile(matrix, feature_names, source=os.path.basename(args.reference)), args.output)
+    print(f'Wrote {args.output} from {len(matrix)} rows', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+# Compact model export for the Diabetes Prediction app
+# Converts the pickled RandomForest into a single memory-mappable forest file with
+# float32 thresholds or int16 threshold codes, 8/16-bit node indices and float32 leaf
+# probabilities, optionally dropping trees the ensemble can do without. The result
+# is checked against the original model on a reference dataset and only written
+# when it stays within the accuracy guardrail.
+#
+# Usage:
+#   python export_model.py -o DiabetesPredictionModel.dpsf
+#   python export_model.py -o model.dpsf --thresholds int16 --prune-tolerance 0.01 --reference pima.csv
+#   DPS_MODEL_PATH=DiabetesPredictionModel.dpsf python DPS.py
+#
+# Without --reference the check uses the registry holdout rows plus synthetic
+# patients drawn over the range the model splits on, rounded like real form input.
+# The verification report (JSON) goes to --report or stderr.
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bulk_io import csv_columns, csv_rows_to_records
+from forest_engine import CompiledForest
+from model_registry import DEFAULT_HOLDOUT, write_atomically
+from scoring import ScoringPipeline, MODEL_PATH, feature_names, file_sha256
+
+# Decimal places of each feature as entered on the form, for synthetic reference rows
+FEATURE_DECIMALS = {'Pregnancies': 0, 'Glucose': 0, 'BloodPressure': 0, 'SkinThickness': 0, 'Insulin': 0,
+                    'BMI': 1, 'DiabetesPedigreeFunction': 3, 'Age': 0}
+
+
+def load_reference(path, preprocessor):
+    # Imputed (N, 8) matrix from a CSV with a feature header or a raw .npy matrix
+    if path.endswith('.npy'):
+        matrix, _, _ = preprocessor.impute_rows(np.array(np.load(path), dtype=np.float64))
+        return matrix
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        records, _ = csv_rows_to_records(list(reader), len(header), csv_columns(header, feature_names))
+    matrix, _, _ = preprocessor.parse_records([record for record in records if record is not None])
+    return matrix
+
+
+def synthetic_reference(forest, preprocessor, n_rows=20000, seed=0):
+    # Holdout rows plus random patients spanning each feature's split range
+    rng = np.random.default_rng(seed)
+    threshold = np.asarray(forest.threshold, dtype=np.float64)
+    internal = ~forest.is_leaf
+    columns = []
+    for index, name in enumerate(feature_names):
+        used = threshold[internal & (forest.feature == index)]
+        low, high = (used.min(), used.max()) if used.size else (0.0, 1.0)
+        margin = (high - low) * 0.1 or 1.0
+        column = rng.uniform(max(0.0, low - margin), high + margin, n_rows)
+        columns.append(np.round(column, FEATURE_DECIMALS[name]))
+    rows = np.vstack([DEFAULT_HOLDOUT, np.column_stack(columns)])
+    matrix, _, _ = preprocessor.impute_rows(rows)
+    return matrix
+
+
+def compare(expected, actual, classes):
+    # Maximum/mean absolute probability deviation and label disagreement between two models
+    deviation = np.abs(np.asarray(actual, dtype=np.float64) - expected)
+    disagreements = int(np.count_nonzero(classes.take(np.argmax(expected, axis=1)) !=
+                                         classes.take(np.argmax(actual, axis=1))))
+    return {
+        'rows': int(len(expected)),
+        'max_probability_deviation': float(deviation.max()) if deviation.size else 0.0,
+        'mean_probability_deviation': float(deviation.mean()) if deviation.size else 0.0,
+        'disagreements': disagreements,
+        'disagreement_rate': disagreements / len(expected) if len(expected) else 0.0,
+    }
+
+
+def prune_trees(forest, X, expected, tolerance, max_disagreement_rate=0.0):
+    # Greedy backward elimination: repeatedly drop the tree whose removal keeps the averaged
+    # probabilities closest to `expected`, while the deviation stays within tolerance and
+    # labels disagree on at most max_disagreement_rate of the rows. Returns kept tree indices.
+    leaves = forest.apply(X)
+    per_tree = np.asarray(forest.leaf_proba, dtype=np.float64)[leaves]  # (trees, rows, classes)
+    expected_labels = np.argmax(expected, axis=1)
+    allowed = int(max_disagreement_rate * len(X))
+    kept = list(range(forest.n_trees))
+    total = per_tree.sum(axis=0)
+    while len(kept) > 1:
+        candidates = (total[np.newaxis] - per_tree[kept]) / (len(kept) - 1)
+        deviation = np.abs(candidates - expected).max(axis=(1, 2))
+        disagreements = (np.argmax(candidates, axis=2) != expected_labels).sum(axis=1)
+        deviation[disagreements > allowed] = np.inf
+        best = int(np.argmin(deviation))
+        if deviation[best] > tolerance:
+            break
+        total -= per_tree[kept[best]]
+        del kept[best]
+    return kept
+
+
+def rows_per_second(forest, X, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        forest.predict_proba(X)
+        best = min(best, time.perf_counter() - started)
+    return len(X) / best
+
+
+def export(model_path, output_path, thresholds='float32', leaf_dtype='float32', prune_tolerance=None,
+           reference_path=None, max_deviation=0.01, max_disagreement=0.0):
+    # Build, verify and (when within the guardrail) write a compact model; returns the report.
+    # The forest is compiled in memory, so no .compiled cache is left next to the source.
+    pipeline = ScoringPipeline.load(model_path, engine='compiled', mmap=False, cache=False)
+    original = pipeline.compiled_forest
+    preprocessor = pipeline.preprocessor
+    if reference_path:
+        X = load_reference(reference_path, preprocessor)
+    else:
+        X = synthetic_reference(original, preprocessor)
+    expected = original.predict_proba(X)
+
+    compact = original.compact(thresholds=thresholds, leaf_dtype=leaf_dtype)
+    if prune_tolerance is not None:
+        compact = compact.select_trees(prune_trees(compact, X, expected, prune_tolerance, max_disagreement))
+    verification = compare(expected, compact.predict_proba(X), original.classes_)
+    accepted = (verification['max_probability_deviation'] <= max_deviation and
+                verification['disagreement_rate'] <= max_disagreement)
+
+    report = {
+        'model': model_path,
+        'model_sha256': file_sha256(model_path),
+        'output': output_path,
+        'reference': reference_path or 'synthetic',
+        'thresholds': thresholds,
+        'leaf_dtype': leaf_dtype,
+        'prune_tolerance': prune_tolerance,
+        'trees': {'original': original.n_trees, 'exported': compact.n_trees},
+        'nodes': {'original': original.n_nodes, 'exported': compact.n_nodes},
+        'bytes': {'pickle': os.path.getsize(model_path), 'compiled_arrays': original.nbytes,
+                  'compact_arrays': compact.nbytes},
+        'rows_per_second': {'original': rows_per_second(original, X), 'exported': rows_per_second(compact, X)},
+        'verification': verification,
+        'guardrail': {'max_probability_deviation': max_deviation, 'max_disagreement_rate': max_disagreement,
+                      'accepted': accepted},
+    }
+    if accepted:
+        meta = {
+            'source_sha256': report['model_sha256'],
+            'exported_at': datetime.now().isoformat(),
+            'thresholds': thresholds,
+            'fill_values': preprocessor.fill_values.tolist(),
+            'fill_mask': preprocessor.fill_mask.tolist(),
+            'zero_mask': preprocessor.zero_mask.tolist(),
+            'metadata': pipeline.metadata,
+            'verification': verification,
+        }
+        def verify(staging):
+            reloaded, _ = CompiledForest.load_compact(staging)
+            if not np.array_equal(reloaded.predict_proba(X), compact.predict_proba(X)):
+                raise ValueError('Written model does not reproduce the verified predictions')
+
+        write_atomically(output_path, lambda staging: compact.save_compact(staging, meta), verify)
+        report['bytes']['file'] = os.path.getsize(output_path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the diabetes prediction model as a compact forest file.')
+    parser.add_argument('-o', '--output', required=True, help='Compact model file to write')
+    parser.add_argument('--model', default=MODEL_PATH, help='Pickled sklearn model')
+    parser.add_argument('--thresholds', choices=['float64', 'float32', 'int16'], default='float32',
+                        help='Threshold storage: float32 values or int16 rank codes (both exact)')
+    parser.add_argument('--leaf-dtype', choices=['float64', 'float32'], default='float32',
+                        help='Leaf probability storage')
+    parser.add_argument('--prune-tolerance', type=float,
+                        help='Drop trees while the max probability deviation stays below this')
+    parser.add_argument('--reference', help='Reference CSV (feature header) or .npy matrix for verification')
+    parser.add_argument('--max-deviation', type=float, default=0.01,
+                        help='Refuse the export above this max probability deviation')
+    parser.add_argument('--max-disagreement', type=float, default=0.0,
+                        help='Refuse the export above this share of changed predictions')
+    parser.add_argument('--report', help='Write the verification report JSON here (default: stderr)')
+    args = parser.parse_args(argv)
+
+    report = export(args.model, args.output, thresholds=args.thresholds, leaf_dtype=args.leaf_dtype,
+                    prune_tolerance=args.prune_tolerance, reference_path=args.reference,
+                    max_deviation=args.max_deviation, max_disagreement=args.max_disagreement)
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text, file=sys.stderr)
+    if not report['guardrail']['accepted']:
+        print(f'Export refused: outside the accuracy guardrail, {args.output} not written', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
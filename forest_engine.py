@@ -0,0 +1,446 @@
+# Compiled RandomForest inference engine for the Diabetes Prediction app
+# Flattens every tree of a fitted sklearn RandomForestClassifier into contiguous
+# NumPy arrays (feature, threshold, left/right child, leaf probabilities) and
+# scores single rows or whole batches with one vectorized traversal.
+# Probabilities are bit-for-bit identical to sklearn's predict_proba.
+# compact() narrows the arrays (float32 thresholds or int16 threshold codes, 8/16-bit
+# indices) and can drop trees; save_compact() writes that as a single memory-mappable file.
+# predict_proba_adaptive() stops evaluating trees per row once the label is settled;
+# predict_contributions() splits each probability into a bias plus per-feature terms.
+
+import json
+import math
+import os
+
+import numpy as np
+
+TREE_LEAF = -1
+
+# Arrays written by CompiledForest.save, one .npy file each so they can be memory-mapped
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'missing_left', 'leaf_proba', 'roots', 'classes_')
+
+# Extra arrays of a forest with int16 threshold codes
+QUANT_ARRAY_NAMES = ('quant_values', 'quant_offsets')
+
+# Rows traversed together; keeps the (tree, row) working set cache-sized for large batches
+CHUNK_ROWS = 1024
+
+# Adaptive scoring walks trees one by one in Python up to this many rows
+SCALAR_ROWS = 4
+
+# First bytes of a save_compact() file, followed by a uint64 header length and a JSON header
+COMPACT_MAGIC = b'DPSFOREST1\n'
+COMPACT_ALIGN = 64
+
+
+def is_compact_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(COMPACT_MAGIC)) == COMPACT_MAGIC
+    except OSError:
+        return False
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, missing_left, leaf_proba, roots, max_depth,
+                 classes, feature_names=None, quant_values=None, quant_offsets=None):
+        self.feature = feature            # (n_nodes,) split feature, 0 at leaves
+        self.threshold = threshold        # (n_nodes,) split threshold: float64, float32 or int16 codes
+        self.left = left                  # (n_nodes,) global index of left child, self at leaves
+        self.right = right                # (n_nodes,) global index of right child, self at leaves
+        self.missing_left = missing_left  # (n_nodes,) NaN goes left
+        self.leaf_proba = leaf_proba      # (n_nodes, n_classes) normalized class probabilities (float64/float32)
+        self.roots = roots                # (n_trees,) global index of each tree's root
+        self.max_depth = int(max_depth)
+        self.is_leaf = left == np.arange(len(left))
+        self.classes_ = classes
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        # Sorted distinct thresholds of every feature (concatenated, with offsets) when the
+        # thresholds are int16 codes
+        self.quant_values = quant_values
+        self.quant_offsets = quant_offsets
+        self._lists = None
+        self._path_contributions = None
+
+    @property
+    def quantized(self):
+        return self.quant_values is not None
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self._array_names())
+
+    def _array_names(self):
+        return ARRAY_NAMES + (QUANT_ARRAY_NAMES if self.quantized else ())
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        # Concatenate all trees into flat arrays with global node indices.
+        # Leaves point to themselves so a traversal step on a finished row is a no-op.
+        if not hasattr(forest, 'estimators_'):
+            raise ValueError('Model is not a fitted sklearn forest')
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError('Only single-output forests can be compiled')
+        features, thresholds, lefts, rights, missing, probas, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(offset, offset + n, dtype=np.intp)
+            is_leaf = tree.children_left == TREE_LEAF
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            missing.append(np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(n)), dtype=bool))
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(value / normalizer)
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            missing_left=np.ascontiguousarray(np.concatenate(missing)),
+            leaf_proba=np.ascontiguousarray(np.concatenate(probas)),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            feature_names=getattr(forest, 'feature_names_in_', None),
+        )
+
+    def save(self, directory, meta=None):
+        # Write every array as its own .npy plus forest.json with scalars and caller metadata
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, name + '.npy'), np.ascontiguousarray(getattr(self, name)))
+        info = {'max_depth': self.max_depth, 'feature_names': self.feature_names, 'meta': meta or {}}
+        with open(os.path.join(directory, 'forest.json'), 'w') as f:
+            json.dump(info, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        # Memory-mapped loading: forked workers share the same read-only pages.
+        # Returns (forest, meta) where meta is what was passed to save().
+        with open(os.path.join(directory, 'forest.json')) as f:
+            info = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode)
+                  for name in ARRAY_NAMES}
+        classes = np.asarray(arrays.pop('classes_'))
+        forest = cls(max_depth=info['max_depth'], classes=classes, feature_names=info['feature_names'],
+                     **arrays)
+        return forest, info['meta']
+
+    def tree_slices(self):
+        # (start, stop) node range of every tree; trees are stored one after another
+        bounds = list(np.asarray(self.roots, dtype=np.intp)) + [self.n_nodes]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def select_trees(self, trees):
+        # New forest made of the given trees (in that order), node indices renumbered
+        slices = self.tree_slices()
+        parts = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'missing_left', 'leaf_proba')}
+        roots = []
+        offset = 0
+        for tree in trees:
+            start, stop = slices[tree]
+            for name in ('feature', 'threshold', 'missing_left', 'leaf_proba'):
+                parts[name].append(np.asarray(getattr(self, name)[start:stop]))
+            for name in ('left', 'right'):
+                parts[name].append(np.asarray(getattr(self, name)[start:stop], dtype=np.intp) - start + offset)
+            roots.append(offset)
+            offset += stop - start
+        arrays = {name: np.concatenate(chunks).astype(getattr(self, name).dtype, copy=False)
+                  for name, chunks in parts.items()}
+        return CompiledForest(roots=np.asarray(roots, dtype=self.roots.dtype), max_depth=self.max_depth,
+                              classes=self.classes_, feature_names=self.feature_names,
+                              quant_values=self.quant_values, quant_offsets=self.quant_offsets, **arrays)
+
+    def compact(self, thresholds='float32', leaf_dtype='float32'):
+        # Narrow copy of a float64 forest. Both float32 thresholds (rounded down) and int16
+        # threshold codes keep every comparison with float32 inputs exact; only float32 leaf
+        # probabilities and dropped trees change the output.
+        if self.quantized:
+            raise ValueError('Forest is already quantized')
+        internal = ~self.is_leaf
+        threshold = np.asarray(self.threshold, dtype=np.float64)
+        quant_values = quant_offsets = None
+        if thresholds == 'float64':
+            compact_threshold = threshold.copy()
+        elif thresholds == 'float32':
+            compact_threshold = threshold.astype(np.float32)
+            rounded_up = compact_threshold > threshold
+            compact_threshold[rounded_up] = np.nextafter(compact_threshold[rounded_up], np.float32(-np.inf))
+        elif thresholds == 'int16':
+            # Each threshold becomes its rank among the feature's distinct split values and an
+            # input becomes the number of those values below it, so x <= t holds exactly when
+            # code(x) <= rank(t)
+            n_features = int(self.feature.max(initial=0)) + 1
+            if self.feature_names is not None:
+                n_features = max(n_features, len(self.feature_names))
+            tables = [np.unique(threshold[internal & (self.feature == feature)]) for feature in range(n_features)]
+            if max(len(table) for table in tables) > np.iinfo(np.int16).max:
+                raise ValueError('Too many distinct thresholds for int16 codes; use float32')
+            quant_values = np.concatenate(tables)
+            quant_offsets = np.concatenate([[0], np.cumsum([len(table) for table in tables])]).astype(np.int64)
+            ranks = np.zeros(self.n_nodes, dtype=np.int16)
+            for feature, table in enumerate(tables):
+                nodes = internal & (self.feature == feature)
+                ranks[nodes] = np.searchsorted(table, threshold[nodes])
+            compact_threshold = ranks
+        else:
+            raise ValueError(f'Unknown threshold format: {thresholds}')
+        index_dtype = np.int16 if self.n_nodes <= np.iinfo(np.int16).max else np.int32
+        return CompiledForest(
+            feature=np.asarray(self.feature, dtype=np.int8 if self.feature.max(initial=0) < 128 else np.int16),
+            threshold=compact_threshold,
+            left=np.asarray(self.left, dtype=index_dtype),
+            right=np.asarray(self.right, dtype=index_dtype),
+            missing_left=np.asarray(self.missing_left, dtype=bool),
+            leaf_proba=np.asarray(self.leaf_proba, dtype=leaf_dtype),
+            roots=np.asarray(self.roots, dtype=np.int32),
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            feature_names=self.feature_names,
+            quant_values=quant_values,
+            quant_offsets=quant_offsets,
+        )
+
+    def save_compact(self, path, meta=None):
+        # One file: magic, header length, JSON header, then each array at an aligned offset
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in self._array_names()}
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += -(-array.nbytes // COMPACT_ALIGN) * COMPACT_ALIGN
+        header = json.dumps({'arrays': layout, 'max_depth': self.max_depth, 'feature_names': self.feature_names,
+                             'meta': meta or {}}).encode()
+        data_start = -(-(len(COMPACT_MAGIC) + 8 + len(header)) // COMPACT_ALIGN) * COMPACT_ALIGN
+        with open(path, 'wb') as f:
+            f.write(COMPACT_MAGIC + len(header).to_bytes(8, 'little') + header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+
+    @classmethod
+    def load_compact(cls, path, mmap=True):
+        # Returns (forest, meta); arrays are read-only maps of the file when mmap=True
+        with open(path, 'rb') as f:
+            if f.read(len(COMPACT_MAGIC)) != COMPACT_MAGIC:
+                raise ValueError(f'{path} is not a compact forest file')
+            header_size = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_size))
+        data_start = -(-(len(COMPACT_MAGIC) + 8 + header_size) // COMPACT_ALIGN) * COMPACT_ALIGN
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+            if mmap and np.prod(shape):
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=data_start + spec['offset'], shape=shape)
+            else:
+                arrays[name] = np.fromfile(path, dtype=dtype, count=int(np.prod(shape)),
+                                           offset=data_start + spec['offset']).reshape(shape)
+        classes = np.asarray(arrays.pop('classes_'))
+        forest = cls(max_depth=header['max_depth'], classes=classes, feature_names=header['feature_names'],
+                     **arrays)
+        return forest, header['meta']
+
+    def _encode(self, X):
+        # float32 inputs, or their int16 codes for a quantized forest (NaN sorts past every threshold)
+        if not self.quantized:
+            return X
+        codes = np.empty(X.shape, dtype=np.int16)
+        for feature in range(X.shape[1]):
+            table = self.quant_values[self.quant_offsets[feature]:self.quant_offsets[feature + 1]]
+            codes[:, feature] = np.searchsorted(table, X[:, feature].astype(np.float64), side='left')
+        return codes
+
+    def apply(self, X, roots=None):
+        # Leaf index reached in every tree (or only the trees starting at `roots`) for every
+        # row, shape (n_trees, n_rows). sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        roots = self.roots if roots is None else roots
+        if X.shape[0] <= CHUNK_ROWS:
+            return self._apply_chunk(X, roots)
+        return np.concatenate([self._apply_chunk(X[start:start + CHUNK_ROWS], roots)
+                               for start in range(0, X.shape[0], CHUNK_ROWS)], axis=1)
+
+    def _apply_chunk(self, X, roots):
+        # Walk all (tree, row) pairs level by level, dropping pairs once they reach a leaf
+        n_rows, n_features = X.shape
+        values_flat = self._encode(X).ravel()
+        missing = np.isnan(X)
+        missing_flat = missing.ravel() if missing.any() else None
+        nodes = np.repeat(np.asarray(roots, dtype=np.intp), n_rows)
+        row_offsets = np.tile(np.arange(n_rows, dtype=np.intp) * n_features, len(roots))
+        active = np.arange(nodes.size, dtype=np.intp)
+        while active.size:
+            current = nodes[active]
+            positions = row_offsets[active] + self.feature[current]
+            go_left = values_flat[positions] <= self.threshold[current]
+            if missing_flat is not None:
+                go_left |= missing_flat[positions] & self.missing_left[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+        return nodes.reshape(len(roots), n_rows)
+
+    def predict_proba(self, X):
+        # Trees are accumulated in order then averaged, exactly like the forest does
+        leaves = self.apply(X)
+        proba = np.add.reduce(self.leaf_proba[leaves], axis=0, dtype=np.float64)
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def predict_proba_adaptive(self, X, confidence=0.99, tree_batch=10):
+        # Early-exit scoring for binary forests: trees are evaluated tree_batch at a time and a
+        # row stops once its running mean probability is on one side of 0.5 by more than the
+        # Hoeffding-Serfling bound for sampling trees without replacement, i.e. the full forest
+        # agrees with probability >= confidence. Rows whose label can no longer change whatever
+        # the remaining trees say stop regardless. Returns (probabilities averaged over the
+        # trees used, trees used per row); rows that use every tree match predict_proba exactly.
+        if len(self.classes_) != 2:
+            raise ValueError('Adaptive evaluation needs a binary classifier')
+        if not 0 < confidence <= 1:
+            raise ValueError('confidence must be in (0, 1]')
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        tree_batch = max(1, int(tree_batch))
+        log_inverse_risk = math.log(1.0 / (1.0 - confidence)) if confidence < 1 else math.inf
+        if X.shape[0] <= SCALAR_ROWS:
+            # A level-by-level walk costs about the same for 10 trees as for 100 on a single
+            # row, so small requests walk tree by tree instead
+            values, missing = self._encode(X).tolist(), np.isnan(X).tolist()
+            rows = [self._adaptive_row(values[row], missing[row], tree_batch, log_inverse_risk)
+                    for row in range(X.shape[0])]
+            return (np.array([totals for totals, _ in rows], dtype=np.float64).reshape(-1, 2),
+                    np.array([used for _, used in rows], dtype=np.intp))
+
+        n_trees = self.n_trees
+        total = np.zeros((len(X), 2), dtype=np.float64)
+        trees_used = np.zeros(len(X), dtype=np.intp)
+        pending = np.arange(len(X), dtype=np.intp)
+        for start in range(0, n_trees, tree_batch):
+            leaves = self.apply(X[pending], self.roots[start:start + tree_batch])
+            # Tree by tree, in forest order, so full evaluations sum exactly like predict_proba
+            running = total[pending]
+            for tree_leaves in leaves:
+                running += self.leaf_proba[tree_leaves]
+            total[pending] = running
+            used = start + len(leaves)
+            trees_used[pending] = used
+            if used == n_trees:
+                break
+            positive = running[:, 1]
+            # The forest predicts the first class on a 0.5 tie, as argmax does
+            settled = ((np.abs(positive / used - 0.5) > _serfling_bound(used, n_trees, log_inverse_risk)) |
+                       (positive > 0.5 * n_trees) | (positive + (n_trees - used) <= 0.5 * n_trees))
+            pending = pending[~settled]
+            if not pending.size:
+                break
+        return total / trees_used[:, np.newaxis], trees_used
+
+    def _adaptive_row(self, values, missing, tree_batch, log_inverse_risk):
+        # predict_proba_adaptive for one row as Python lists; same traversal and stopping rule
+        roots, feature, threshold, left, right, missing_left, is_leaf, leaf_proba = self._node_lists()
+        n_trees = self.n_trees
+        negative = positive = 0.0
+        used = 0
+        for root in roots:
+            node = root
+            while not is_leaf[node]:
+                column = feature[node]
+                if values[column] <= threshold[node] or (missing[column] and missing_left[node]):
+                    node = left[node]
+                else:
+                    node = right[node]
+            negative += leaf_proba[node][0]
+            positive += leaf_proba[node][1]
+            used += 1
+            if used % tree_batch == 0 and used < n_trees and (
+                    abs(positive / used - 0.5) > _serfling_bound(used, n_trees, log_inverse_risk) or
+                    positive > 0.5 * n_trees or positive + (n_trees - used) <= 0.5 * n_trees):
+                break
+        return (negative / used, positive / used), used
+
+    def _node_lists(self):
+        # Node arrays as Python lists for tree-by-tree walks, built on first use. They are a
+        # private copy (a few MB) rather than shared pages, so only adaptive scoring pays for them.
+        if self._lists is None:
+            self._lists = (self.roots.tolist(), self.feature.tolist(), self.threshold.tolist(), self.left.tolist(), self.right.tolist(),
+                           self.missing_left.tolist(), self.is_leaf.tolist(),
+                           np.asarray(self.leaf_proba, dtype=np.float64).tolist())
+        return self._lists
+
+    def path_contributions(self):
+        # (n_nodes, n_features) change in the positive-class probability attributed to each
+        # split feature along the path from the tree's root down to every node. Built on first
+        # use (a few MB) by walking all trees one level at a time.
+        if self._path_contributions is None:
+            n_features = len(self.feature_names) if self.feature_names is not None else \
+                int(self.feature.max(initial=0)) + 1
+            positive = np.asarray(self.leaf_proba[:, 1], dtype=np.float64)
+            table = np.zeros((self.n_nodes, n_features), dtype=np.float64)
+            frontier = np.asarray(self.roots, dtype=np.intp)
+            while frontier.size:
+                parents = frontier[~self.is_leaf[frontier]]
+                features = np.asarray(self.feature[parents], dtype=np.intp)
+                children = []
+                for side in (self.left, self.right):
+                    child = np.asarray(side[parents], dtype=np.intp)
+                    table[child] = table[parents]
+                    table[child, features] += positive[child] - positive[parents]
+                    children.append(child)
+                frontier = np.concatenate(children)
+            self._path_contributions = table
+        return self._path_contributions
+
+    def predict_contributions(self, X):
+        # predict_proba plus a decomposition of the positive-class probability of every row
+        # into the forest's bias (mean root probability) and one contribution per feature,
+        # averaged over the trees: bias + contributions.sum(axis=1) == proba[:, 1] up to rounding.
+        # Returns (proba, bias, contributions (n_rows, n_features)).
+        if len(self.classes_) != 2:
+            raise ValueError('Feature contributions need a binary classifier')
+        table = self.path_contributions()
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        proba = np.empty((len(X), 2), dtype=np.float64)
+        contributions = np.empty((len(X), table.shape[1]), dtype=np.float64)
+        # Chunked so the (trees, rows, features) gather stays cache-sized
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self._apply_chunk(X[start:start + CHUNK_ROWS], self.roots)
+            proba[start:start + CHUNK_ROWS] = np.add.reduce(self.leaf_proba[leaves], axis=0, dtype=np.float64)
+            contributions[start:start + CHUNK_ROWS] = np.add.reduce(table[leaves], axis=0)
+        proba /= self.n_trees
+        contributions /= self.n_trees
+        bias = float(np.mean(np.asarray(self.leaf_proba[self.roots, 1], dtype=np.float64)))
+        return proba, bias, contributions
+
+
+def _serfling_bound(used, n_trees, log_inverse_risk):
+    # Deviation of the mean of `used` trees drawn without replacement from n_trees that is
+    # exceeded with probability at most exp(-log_inverse_risk) (Hoeffding-Serfling)
+    return math.sqrt((1 - (used - 1) / n_trees) * log_inverse_risk / (2 * used))
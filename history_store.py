@@ -0,0 +1,150 @@
+# Server-side prediction history for the Diabetes Prediction app
+# Keeps a capped, newest-first history per user so the session cookie only
+# carries an ID. Two backends: an in-memory ring buffer per user and SQLite
+# (fixed ring of slots per user). Appends and clears are constant time.
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+
+class MemoryHistoryStore:
+    def __init__(self, limit=100, max_users=10000):
+        self.limit = int(limit)
+        self.max_users = int(max_users)
+        self._users = OrderedDict()  # user_id -> [last_id, deque of entries, newest first]
+        self._lock = threading.Lock()
+
+    def _user(self, user_id):
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = [0, deque(maxlen=self.limit)]
+            # Forget the least recently active user beyond max_users
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return user
+
+    def append(self, user_id, entry):
+        with self._lock:
+            user = self._user(user_id)
+            user[0] += 1
+            user[1].appendleft({**entry, 'id': user[0]})
+            return user[0]
+
+    def page(self, user_id, limit=None, before=None):
+        # Newest first; `before` is an entry id from a previous page
+        limit = self.limit if limit is None else limit
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return []
+            entries = []
+            for entry in user[1]:
+                if len(entries) >= limit:
+                    break
+                if before is None or entry['id'] < before:
+                    entries.append(entry)
+            return entries
+
+    def clear(self, user_id):
+        # Swap in an empty ring; ids keep increasing so old cursors stay valid
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is not None:
+                user[1] = deque(maxlen=self.limit)
+
+    def drop(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+class SqliteHistoryStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history_users (
+            user_id TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            cleared_id INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS history (
+            user_id TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            entry TEXT NOT NULL,
+            PRIMARY KEY (user_id, slot)
+        );
+        CREATE INDEX IF NOT EXISTS history_user_id ON history (user_id, id);
+    """
+
+    def __init__(self, path='history.db', limit=100):
+        self.path = path
+        self.limit = int(limit)
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        # One connection per thread; SQLite serializes writers itself
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def append(self, user_id, entry):
+        # Each user owns `limit` slots; entry n overwrites slot n % limit
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('INSERT OR IGNORE INTO history_users (user_id) VALUES (?)', (user_id,))
+            connection.execute('UPDATE history_users SET last_id = last_id + 1 WHERE user_id = ?', (user_id,))
+            (entry_id,) = connection.execute(
+                'SELECT last_id FROM history_users WHERE user_id = ?', (user_id,)).fetchone()
+            connection.execute('INSERT OR REPLACE INTO history (user_id, slot, id, entry) VALUES (?, ?, ?, ?)',
+                               (user_id, entry_id % self.limit, entry_id, json.dumps(entry)))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return entry_id
+
+    def page(self, user_id, limit=None, before=None):
+        # Newest first; `before` is an entry id from a previous page
+        limit = self.limit if limit is None else limit
+        row = self._connection().execute(
+            'SELECT last_id, cleared_id FROM history_users WHERE user_id = ?', (user_id,)).fetchone()
+        if row is None:
+            return []
+        last_id, cleared_id = row
+        upper = last_id + 1 if before is None else min(before, last_id + 1)
+        lower = max(cleared_id, last_id - self.limit)
+        rows = self._connection().execute(
+            'SELECT id, entry FROM history WHERE user_id = ? AND id > ? AND id < ? ORDER BY id DESC LIMIT ?',
+            (user_id, lower, upper, limit)).fetchall()
+        return [{**json.loads(entry), 'id': entry_id} for entry_id, entry in rows]
+
+    def clear(self, user_id):
+        # Move the watermark instead of deleting rows; the ring overwrites them later
+        self._connection().execute('UPDATE history_users SET cleared_id = last_id WHERE user_id = ?', (user_id,))
+
+    def drop(self, user_id):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM history WHERE user_id = ?', (user_id,))
+            connection.execute('DELETE FROM history_users WHERE user_id = ?', (user_id,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+
+def create_history_store(backend='memory', limit=100, path='history.db'):
+    if backend == 'memory':
+        return MemoryHistoryStore(limit=limit)
+    if backend == 'sqlite':
+        return SqliteHistoryStore(path=path, limit=limit)
+    raise ValueError(f'Unknown history backend: {backend}')
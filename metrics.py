@@ -0,0 +1,173 @@
+# Lightweight in-process metrics for the Diabetes Prediction app
+# Counters, gauges and fixed-bucket latency histograms rendered in the Prometheus
+# text exposition format. Observations are a bisect plus a locked increment, so
+# instrumentation is cheap enough to leave on; when disabled the app gets
+# NULL_TIMER, whose mark() does nothing, and no request hooks are installed.
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Latency buckets in seconds, from 50 µs to 5 s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(labelnames, labelvalues, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labelnames, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        samples = []
+        for key, series in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                samples.append((self.name + '_bucket', self.labelnames, key, cumulative,
+                                f'le="{_format_value(bound)}"'))
+            samples.append((self.name + '_sum', self.labelnames, key, series[-1]))
+            samples.append((self.name + '_count', self.labelnames, key, cumulative))
+        return samples
+
+
+def snapshot(kind, name, help, values, labelnames=()):
+    # One-off metric for collectors; values maps label-value tuples to numbers, or is a bare number
+    metric = (Counter if kind == 'counter' else Gauge)(name, help, labelnames)
+    metric._values = dict(values) if isinstance(values, dict) else {(): values}
+    return metric
+
+
+def process_memory():
+    # (resident, shared) bytes of this process; shared counts file-backed pages such as
+    # the memory-mapped model. None where /proc is unavailable.
+    try:
+        with open('/proc/self/statm') as f:
+            fields = f.read().split()
+    except OSError:
+        return None
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    return int(fields[1]) * page_size, int(fields[2]) * page_size
+
+
+class StageTimer:
+    # Times consecutive stages of one request: each mark() observes the time since the previous mark
+    __slots__ = ('histogram', 'last')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, stage)
+        self.last = now
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def mark(self, stage):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    def __init__(self, prefix='dps'):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(f'{self.prefix}_{name}', help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(f'{self.prefix}_{name}', help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(f'{self.prefix}_{name}', help, labelnames, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        # collector() -> iterable of Gauge/Counter-like objects built at scrape time
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            metrics.extend(collector())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for sample in metric.samples():
+                name, labelnames, labelvalues, value = sample[:4]
+                extra = sample[4] if len(sample) > 4 else ''
+                lines.append(f'{name}{_format_labels(labelnames, labelvalues, extra)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,118 @@
+# Micro-batching scheduler for the Diabetes Prediction app
+# Concurrent single-row requests are queued and a background thread stacks
+# whatever arrives within a short window (or up to a max batch size) into one
+# matrix, scores it with a single model call and hands each row's probabilities
+# back to its waiting request.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    def __init__(self, score_fn, max_batch_size=64, max_wait=0.002):
+        self.score_fn = score_fn  # (N, n_features) matrix -> (N, n_classes) probabilities
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.batches = 0
+        self.rows = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = {bound: 0 for bound in BATCH_SIZE_BUCKETS + (float('inf'),)}
+
+    def _ensure_worker(self):
+        # Started lazily so forked workers each get their own thread
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name='microbatcher', daemon=True)
+                    self._worker.start()
+
+    def submit(self, row, score_fn=None):
+        # Queue one imputed row and return a Future for its probabilities.
+        # Rows are only batched with rows for the same score_fn (default: the batcher's).
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((np.array(row, dtype=np.float64).reshape(-1), future, score_fn or self.score_fn))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def predict_proba_row(self, row, score_fn=None, timeout=None):
+        return self.submit(row, score_fn).result(timeout)
+
+    def _collect(self):
+        # Block for the first row, then gather more until the window closes or the batch is full.
+        # A None item is the shutdown sentinel and ends collection early.
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while batch[-1] is not None and len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = self._collect()
+            stopping = batch[-1] is None
+            self._score([item for item in batch if item is not None])
+
+    def _score(self, batch):
+        groups = {}
+        for row, future, score_fn in batch:
+            if future.set_running_or_notify_cancel():
+                groups.setdefault(score_fn, []).append((row, future))
+        for score_fn, group in groups.items():
+            try:
+                probabilities = score_fn(np.vstack([row for row, _ in group]))
+            except Exception as e:
+                for _, future in group:
+                    future.set_exception(e)
+                continue
+            for (_, future), row_probabilities in zip(group, probabilities):
+                future.set_result(row_probabilities)
+            self._record(len(group))
+
+    def _record(self, size):
+        with self._lock:
+            self.batches += 1
+            self.rows += size
+            for bound in self.batch_sizes:
+                if size <= bound:
+                    self.batch_sizes[bound] += 1
+                    break
+
+    def shutdown(self):
+        # Score what is already queued, then stop the worker
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+
+    def stats(self):
+        with self._lock:
+            histogram = {('+Inf' if bound == float('inf') else str(bound)): count
+                         for bound, count in self.batch_sizes.items()}
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batch_size_histogram': histogram,
+            }
@@ -0,0 +1,201 @@
+# Versioned model registry for the Diabetes Prediction app
+# Holds the active scoring pipeline plus the previous one for rollback. New model
+# files are loaded in the background, validated on a holdout vector set, warmed
+# up and then swapped in with a single reference assignment, so requests that
+# are already running keep the version they started with.
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from scoring import file_sha256
+
+# Reference patients (Pima-style rows plus all-zero and all-missing rows) used to
+# sanity-check a new model before it takes traffic
+DEFAULT_HOLDOUT = np.array([
+    [6, 148, 72, 35, 0, 33.6, 0.627, 50],
+    [1, 85, 66, 29, 0, 26.6, 0.351, 31],
+    [8, 183, 64, 0, 0, 23.3, 0.672, 32],
+    [1, 89, 66, 23, 94, 28.1, 0.167, 21],
+    [0, 137, 40, 35, 168, 43.1, 2.288, 33],
+    [5, 116, 74, 0, 0, 25.6, 0.201, 30],
+    [3, 78, 50, 32, 88, 31.0, 0.248, 26],
+    [10, 115, 0, 0, 0, 35.3, 0.134, 29],
+    [2, 197, 70, 45, 543, 30.5, 0.158, 53],
+    [8, 125, 96, 0, 0, 0.0, 0.232, 54],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [np.nan] * 8,
+], dtype=np.float64)
+
+
+class ModelVersion:
+    def __init__(self, pipeline, path, version):
+        self.pipeline = pipeline
+        self.path = path
+        self.version = version
+        self.loaded_at = datetime.now().isoformat()
+
+    def info(self):
+        info = {'version': self.version, 'path': self.path, 'engine': self.pipeline.engine,
+                'loaded_at': self.loaded_at}
+        if self.pipeline.metadata is not None:
+            # Training record of artifacts from train_model.py
+            info['training'] = self.pipeline.metadata
+        return info
+
+
+class ModelRegistry:
+    def __init__(self, loader, holdout=DEFAULT_HOLDOUT, min_agreement=0.0):
+        self.loader = loader              # path -> ScoringPipeline
+        self.holdout = np.asarray(holdout, dtype=np.float64)
+        self.min_agreement = min_agreement  # required share of holdout labels matching the current model
+        self.current = None               # ModelVersion; read without locking
+        self.previous = None
+        self.listeners = []               # called with the new ModelVersion after every swap
+        self.last_reload = None
+        self._swap_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def install(self, pipeline, path):
+        # Register the startup model without validation
+        self._swap(ModelVersion(pipeline, path, file_sha256(path)[:12]))
+        return self.current
+
+    def reload(self, path=None):
+        # Load, validate, warm up and swap in a model file; raises if it is rejected
+        path = path or self.current.path
+        with self._reload_lock:
+            started = time.perf_counter()
+            try:
+                version = file_sha256(path)[:12]
+                pipeline = self.loader(path)
+                self.validate(pipeline)
+                pipeline.warm_up()
+                candidate = ModelVersion(pipeline, path, version)
+                self._swap(candidate)
+            except Exception as e:
+                self.last_reload = {'status': 'failed', 'path': path, 'error': f'{type(e).__name__}: {e}',
+                                    'at': datetime.now().isoformat()}
+                raise
+            self.last_reload = {'status': 'ok', 'path': path, 'version': version,
+                                'seconds': time.perf_counter() - started, 'at': datetime.now().isoformat()}
+            return candidate
+
+    def reload_async(self, path=None):
+        # Reload on a background thread; returns False if a reload is already running
+        if self._reload_lock.locked():
+            return False
+        self.last_reload = {'status': 'loading', 'path': path or self.current.path,
+                            'at': datetime.now().isoformat()}
+        threading.Thread(target=self._reload_quietly, args=(path,), name='model-reload', daemon=True).start()
+        return True
+
+    def _reload_quietly(self, path):
+        try:
+            self.reload(path)
+        except Exception:
+            pass  # Recorded in last_reload
+
+    def validate(self, pipeline):
+        holdout = pipeline.preprocessor.impute(self.holdout.copy())
+        probabilities = np.asarray(pipeline.predict_proba(holdout))
+        if probabilities.shape != (len(holdout), 2):
+            raise ValueError(f'Unexpected probability shape {probabilities.shape}')
+        if not np.isfinite(probabilities).all() or (probabilities < 0).any() or (probabilities > 1).any():
+            raise ValueError('Model returned invalid probabilities on the holdout set')
+        if not np.allclose(probabilities.sum(axis=1), 1.0):
+            raise ValueError('Holdout probabilities do not sum to 1')
+        if list(pipeline.classes_) != [0, 1]:
+            raise ValueError(f'Unexpected classes {list(pipeline.classes_)}')
+        if self.min_agreement > 0 and self.current is not None:
+            current = self.current.pipeline
+            expected = current.predict(current.preprocessor.impute(self.holdout.copy()))[0]
+            agreement = float(np.mean(pipeline.classes_.take(np.argmax(probabilities, axis=1)) == expected))
+            if agreement < self.min_agreement:
+                raise ValueError(f'Holdout agreement {agreement:.2%} is below {self.min_agreement:.2%}')
+
+    def rollback(self):
+        # Swap the previous model back in; the current one becomes the previous
+        with self._swap_lock:
+            if self.previous is None:
+                raise ValueError('No previous model to roll back to')
+            self.current, self.previous = self.previous, self.current
+            current = self.current
+        self._notify(current)
+        return current
+
+    def _swap(self, candidate):
+        with self._swap_lock:
+            self.previous, self.current = self.current, candidate
+        self._notify(candidate)
+
+    def _notify(self, version):
+        for listener in self.listeners:
+            listener(version)
+
+    def watch(self, path, interval=5.0):
+        # Poll the model file and reload it in the background whenever it changes
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(path, interval), name='model-watch', daemon=True)
+        self._watcher.start()
+
+    def _watch(self, path, interval):
+        signature = _signature(path)
+        while True:
+            time.sleep(interval)
+            latest = _signature(path)
+            if latest is None or latest == signature:
+                continue
+            # Wait until the file stops changing so a half-written model is not loaded
+            time.sleep(interval)
+            if _signature(path) != latest:
+                continue
+            signature = latest
+            self._reload_quietly(path)
+
+    def status(self):
+        return {
+            'current': self.current.info() if self.current else None,
+            'previous': self.previous.info() if self.previous else None,
+            'last_reload': self.last_reload,
+        }
+
+
+def write_atomically(path, write, verify=None):
+    # Write a file under a private name next to `path`, optionally check it, then rename it
+    # over `path`, so a watched model path never sees a partial or unverified file.
+    # write(staging) creates it; verify(staging) raises to reject it, leaving `path` untouched.
+    staging = f'{path}.tmp-{os.getpid()}'
+    try:
+        write(staging)
+        if verify is not None:
+            verify(staging)
+        os.replace(staging, path)
+    except BaseException:
+        if os.path.exists(staging):
+            os.remove(staging)
+        raise
+
+
+def resolve_model_path(path, directory):
+    # Absolute path of a model file requested for reload; relative paths are taken from
+    # `directory`. Anything resolving outside it (after symlinks) is refused, since
+    # loading a model unpickles it.
+    directory = os.path.realpath(directory)
+    resolved = os.path.realpath(os.path.join(directory, path))
+    if os.path.commonpath([directory, resolved]) != directory:
+        raise ValueError(f'Model path must be inside {directory}')
+    return resolved
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,107 @@
+# In-process prediction cache for the Diabetes Prediction app
+# Bounded LRU keyed on the imputed feature vector, with optional TTL and
+# invalidation when the model file on disk changes. Stores the model's
+# probability row, so cached responses are byte-identical to uncached ones.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    def __init__(self, maxsize=4096, ttl=None, model_path=None, check_interval=1.0, clock=time.monotonic):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl if ttl else None
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, probabilities)
+        self._lock = threading.Lock()
+        self._model_signature = self._signature()
+        self._next_check = clock() + check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    @staticmethod
+    def key(row, namespace=b''):
+        # Adding 0.0 folds -0.0 into 0.0 so equal vectors share one entry.
+        # The namespace (e.g. the model version) keeps results of different models apart.
+        return namespace + (np.asarray(row, dtype=np.float64) + 0.0).tobytes()
+
+    def get(self, key):
+        self._check_model_file()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, probabilities = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return probabilities
+
+    def put(self, key, probabilities):
+        expires_at = self.clock() + self.ttl if self.ttl else None
+        probabilities = np.array(probabilities, copy=True)
+        probabilities.flags.writeable = False
+        with self._lock:
+            self._entries[key] = (expires_at, probabilities)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def _signature(self):
+        if self.model_path is None:
+            return None
+        try:
+            stat = os.stat(self.model_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _check_model_file(self):
+        # Stat the model file at most once per check_interval
+        if self.model_path is None or self.clock() < self._next_check:
+            return
+        self._next_check = self.clock() + self.check_interval
+        signature = self._signature()
+        if signature != self._model_signature:
+            self._model_signature = signature
+            self.invalidate()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            'size': size,
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
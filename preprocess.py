@@ -0,0 +1,175 @@
+# Compiled preprocessing stage for the Diabetes Prediction app
+# Turns the fitted SimpleImputer statistics and the feature_names ordering into a
+# fill-value vector plus mask, and parses form/JSON input straight into float64
+# feature vectors. Replaces the per-request DataFrame + imputer.transform round
+# trip without importing pandas.
+
+import threading
+
+import numpy as np
+
+
+class Preprocessor:
+    def __init__(self, feature_names, fill_values, fill_mask, zero_mask=None):
+        self.feature_names = list(feature_names)
+        self.fill_values = np.asarray(fill_values, dtype=np.float64)  # (n_features,) imputer statistics
+        self.fill_mask = np.asarray(fill_mask, dtype=bool)            # (n_features,) column is imputed
+        # (n_features,) a 0 in the column also counts as missing, as in Pima-style training data
+        self.zero_mask = np.zeros(len(self.feature_names), dtype=bool) if zero_mask is None else \
+            np.asarray(zero_mask, dtype=bool)
+        self._zeros_missing = bool((self.zero_mask & self.fill_mask).any())
+        self._local = threading.local()
+
+    @classmethod
+    def from_imputer(cls, imputer, feature_names, features_to_impute, zeros_missing=False):
+        # Only NaN-as-missing imputers reduce to a constant fill per column
+        missing = imputer.missing_values
+        if not (isinstance(missing, float) and np.isnan(missing)):
+            raise ValueError('Only imputers with missing_values=np.nan can be compiled')
+        return cls.from_statistics(feature_names, features_to_impute, imputer.statistics_, zeros_missing)
+
+    @classmethod
+    def from_statistics(cls, feature_names, features_to_impute, statistics, zeros_missing=False):
+        # Fill value per imputed feature; with zeros_missing a 0 in those columns is filled too
+        statistics = np.asarray(statistics, dtype=np.float64)
+        if len(statistics) != len(features_to_impute) or np.isnan(statistics).any():
+            raise ValueError('Imputer has empty features without statistics')
+        fill_values = np.zeros(len(feature_names))
+        fill_mask = np.zeros(len(feature_names), dtype=bool)
+        for name, value in zip(features_to_impute, statistics):
+            column = feature_names.index(name)
+            fill_values[column] = value
+            fill_mask[column] = True
+        return cls(feature_names, fill_values, fill_mask, fill_mask if zeros_missing else None)
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def _buffer(self):
+        # One preallocated (1, n_features) vector per thread, reused across requests
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = np.empty((1, self.n_features), dtype=np.float64)
+        return buffer
+
+    def parse_record(self, data):
+        # Parse a form or JSON mapping into the thread's buffer and impute it.
+        # Missing features default to 0 like the original form handling.
+        # The returned row is reused by the next call on this thread; copy it to keep it.
+        buffer = self._buffer()
+        row = buffer[0]
+        for column, name in enumerate(self.feature_names):
+            row[column] = float(data.get(name, 0))
+        self.impute(buffer)
+        return buffer
+
+    def parse_records(self, records):
+        # Validate records into one (N, n_features) matrix, imputed in a single pass.
+        # Bad rows are reported by index instead of being scored.
+        matrix = np.empty((len(records), self.n_features), dtype=np.float64)
+        valid_rows = []
+        errors = {}
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors[i] = 'Record must be an object'
+                continue
+            try:
+                matrix[len(valid_rows)] = [float(record.get(name, 0)) for name in self.feature_names]
+            except (TypeError, ValueError) as e:
+                errors[i] = f'Invalid value: {e}'
+                continue
+            valid_rows.append(i)
+        matrix, finite_rows, inf_errors = self.impute_rows(matrix[:len(valid_rows)])
+        errors.update({valid_rows[position]: error for position, error in inf_errors.items()})
+        return matrix, [valid_rows[position] for position in finite_rows], errors
+
+    def impute_rows(self, matrix):
+        # Impute a raw (N, n_features) matrix, dropping rows that contain infinity.
+        # Returns the imputed rows, their positions in `matrix` and errors by position.
+        finite = ~np.isinf(matrix).any(axis=1)
+        if finite.all():
+            return self.impute(matrix), list(range(len(matrix))), {}
+        errors = {int(position): 'Input contains infinity' for position in np.flatnonzero(~finite)}
+        return self.impute(matrix[finite]), np.flatnonzero(finite).tolist(), errors
+
+    def impute(self, matrix):
+        # Fill NaNs (and zeros in zero_mask columns) of imputed columns in place, as
+        # SimpleImputer.transform would
+        if np.isinf(matrix).any():
+            raise ValueError('Input contains infinity or a value too large for dtype(\'float64\').')
+        missing = np.isnan(matrix)
+        if self._zeros_missing:
+            missing |= (matrix == 0) & self.zero_mask
+        np.copyto(matrix, self.fill_values, where=missing & self.fill_mask)
+        return matrix
+
+
+def records_from_payload(payload, feature_names):
+    # Accept a JSON array of records, {"records": [...]}, or columnar arrays
+    # ({"Glucose": [...], ...} or {"columns": {...}}) and return a list of records
+    if isinstance(payload, list):
+        return payload
+    if not isinstance(payload, dict):
+        raise ValueError('Expected a JSON array of records or an object of columns')
+    if 'records' in payload:
+        if not isinstance(payload['records'], list):
+            raise ValueError("'records' must be a JSON array")
+        return payload['records']
+    columns = payload.get('columns', payload)
+    if not isinstance(columns, dict):
+        raise ValueError("'columns' must be an object of arrays")
+    unknown = [name for name in columns if name not in feature_names]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    lengths = {len(values) for values in columns.values() if isinstance(values, list)}
+    if len(lengths) != 1 or not all(isinstance(v, list) for v in columns.values()):
+        raise ValueError('Columns must be arrays of equal length')
+    n_rows = lengths.pop()
+    return [{name: values[i] for name, values in columns.items()} for i in range(n_rows)]
+
+
+def sweep_from_payload(features, feature_names, default_ranges, default_steps=50, max_points=None):
+    # Parse the swept features of a /what_if request into (columns, value grids).
+    # Each entry is a feature name (its default range), {"name", "min", "max", "steps"}
+    # or {"name", "values": [...]}. Grids of more than max_points are rejected before
+    # anything is allocated.
+    if isinstance(features, (str, dict)):
+        features = [features]
+    if not isinstance(features, list) or not features:
+        raise ValueError("'features' must name at least one feature")
+    columns, axes = [], []
+    points = 1
+    for spec in features:
+        if isinstance(spec, str):
+            spec = {'name': spec}
+        if not isinstance(spec, dict) or spec.get('name') not in feature_names:
+            raise ValueError(f"Unknown feature: {spec.get('name') if isinstance(spec, dict) else spec}")
+        name = spec['name']
+        if feature_names.index(name) in columns:
+            raise ValueError(f'Feature {name} is swept twice')
+        if 'values' in spec:
+            if not isinstance(spec['values'], list) or not spec['values']:
+                raise ValueError(f"'values' of {name} must be a non-empty array")
+            points *= len(spec['values'])
+            if max_points is not None and points > max_points:
+                raise ValueError(f'Sweep grid too large (max {max_points} points)')
+            values = np.array(spec['values'], dtype=np.float64)
+        else:
+            low, high = default_ranges.get(name, (None, None))
+            low, high = float(spec.get('min', low)), float(spec.get('max', high))
+            try:
+                steps = int(spec.get('steps', default_steps))
+            except OverflowError:
+                raise ValueError(f"'steps' of {name} must be a finite number")
+            if steps < 2 or not high > low:
+                raise ValueError(f'Sweep of {name} needs max > min and at least 2 steps')
+            points *= steps
+            if max_points is not None and points > max_points:
+                raise ValueError(f'Sweep grid too large (max {max_points} points)')
+            values = np.linspace(low, high, steps)
+        if not np.isfinite(values).all():
+            raise ValueError(f'Sweep values of {name} must be finite')
+        columns.append(feature_names.index(name))
+        axes.append(values)
+    return columns, axes
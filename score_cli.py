@@ -0,0 +1,150 @@
+# Offline batch scoring CLI for the Diabetes Prediction model
+# Scores large CSV or .npy files without Flask, using the same preprocessing and
+# model as the web app. Input is split into chunks and scored across a process
+# pool that loads the model once per worker.
+#
+# Usage:
+#   python score_cli.py patients.csv -o scores.csv
+#   python score_cli.py features.npy -o scores.npy --workers 8 --chunk-rows 50000
+#
+# CSV input needs a header with the feature_names columns (extra columns are ignored).
+# .npy input is a float (N, 8) matrix in feature_names order.
+# CSV output has the /predict_stream columns: index,outcome,risk,probability,error.
+# .npy output is a float64 (N, 2) matrix of [outcome, probability], NaN for rejected rows.
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bulk_io import csv_columns, csv_rows_to_records, iter_row_chunks, format_rows, format_header
+from scoring import ScoringPipeline, MODEL_PATH, feature_names, format_result
+
+# Set in each worker by _init_worker
+_pipeline = None
+
+
+def _init_worker(model_path, engine):
+    global _pipeline
+    _pipeline = ScoringPipeline.load(model_path, engine=engine)
+
+
+def _score_chunk(task):
+    # Score one chunk in a worker; returns (start, n_rows, CSV text or (n, 2) array)
+    source, start, payload, output_format = task
+    preprocessor = _pipeline.preprocessor
+    if source == 'csv':
+        rows, n_fields, columns = payload
+        records, parse_errors = csv_rows_to_records(rows, n_fields, columns)
+        matrix, valid_rows, errors = preprocessor.parse_records(records)
+        errors.update(parse_errors)
+        n_rows = len(records)
+    else:
+        path, stop = payload
+        raw = np.array(np.load(path, mmap_mode='r')[start:stop], dtype=np.float64)
+        matrix, valid_rows, errors = preprocessor.impute_rows(raw)
+        n_rows = len(raw)
+    outcomes = np.full(n_rows, np.nan)
+    probabilities = np.full(n_rows, np.nan)
+    if valid_rows:
+        outcomes[valid_rows], probabilities[valid_rows] = _pipeline.predict(matrix)
+    if output_format == 'npy':
+        return start, n_rows, np.column_stack([outcomes, probabilities])
+    results = [{'index': start + row, 'error': errors[row]} if row in errors
+               else {'index': start + row, **format_result(outcomes[row], probabilities[row])}
+               for row in range(n_rows)]
+    return start, n_rows, format_rows(results, 'csv')
+
+
+def iter_tasks(input_path, output_format, chunk_rows):
+    # Split the input into chunk tasks without loading it all into memory
+    if input_path.endswith('.npy'):
+        data = np.load(input_path, mmap_mode='r')
+        if data.ndim != 2 or data.shape[1] != len(feature_names):
+            raise ValueError(f'Expected an (N, {len(feature_names)}) matrix, got shape {data.shape}')
+        for start in range(0, data.shape[0], chunk_rows):
+            yield ('npy', start, (input_path, min(start + chunk_rows, data.shape[0])), output_format)
+        return
+    with open(input_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = csv_columns(header, feature_names)
+        start = 0
+        for rows in iter_row_chunks(reader, chunk_rows):
+            yield ('csv', start, (rows, len(header), columns), output_format)
+            start += len(rows)
+
+
+def run(input_path, output_path, workers=None, chunk_rows=50000, model_path=MODEL_PATH, engine='sklearn',
+        progress=sys.stderr):
+    output_format = 'npy' if output_path.endswith('.npy') else 'csv'
+    workers = workers or os.cpu_count() or 1
+    tasks = iter_tasks(input_path, output_format, chunk_rows)
+    pending = deque()
+    arrays = []
+    n_done = 0
+    started = time.perf_counter()
+    out = open(output_path, 'w', newline='') if output_format == 'csv' else None
+    try:
+        if out is not None:
+            out.write(format_header('csv'))
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path, engine)) as pool:
+            # Keep a bounded number of chunks in flight and write results in input order
+            for task in tasks:
+                pending.append(pool.submit(_score_chunk, task))
+                while len(pending) >= 2 * workers or (pending and pending[0].done()):
+                    n_done += _write(pending.popleft().result(), out, arrays)
+                    _report(progress, n_done, started)
+            while pending:
+                n_done += _write(pending.popleft().result(), out, arrays)
+                _report(progress, n_done, started)
+    finally:
+        if out is not None:
+            out.close()
+    if output_format == 'npy':
+        np.save(output_path, np.concatenate(arrays) if arrays else np.empty((0, 2)))
+    elapsed = time.perf_counter() - started
+    if progress is not None:
+        progress.write(f'\nScored {n_done} rows in {elapsed:.2f}s ({n_done / elapsed if elapsed else 0:.0f} rows/sec)\n')
+    return n_done
+
+
+def _write(result, out, arrays):
+    _, n_rows, payload = result
+    if out is not None:
+        out.write(payload)
+    else:
+        arrays.append(payload)
+    return n_rows
+
+
+def _report(progress, n_done, started):
+    if progress is not None:
+        elapsed = time.perf_counter() - started
+        progress.write(f'\r{n_done} rows scored ({n_done / elapsed if elapsed else 0:.0f} rows/sec)')
+        progress.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a CSV or .npy file with the diabetes prediction model.')
+    parser.add_argument('input', help='CSV with a feature header, or an (N, 8) .npy matrix')
+    parser.add_argument('-o', '--output', required=True, help='Output .csv or .npy path')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-rows', type=int, default=50000, help='Rows per chunk sent to a worker')
+    parser.add_argument('--model', default=MODEL_PATH, help='Model file')
+    parser.add_argument('--engine', choices=['sklearn', 'compiled'], default='sklearn', help='Inference engine')
+    parser.add_argument('--quiet', action='store_true', help='Do not report progress')
+    args = parser.parse_args(argv)
+    run(args.input, args.output, workers=args.workers, chunk_rows=args.chunk_rows, model_path=args.model,
+        engine=args.engine, progress=None if args.quiet else sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
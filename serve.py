@@ -0,0 +1,81 @@
+# Production entry point for the Diabetes Prediction app
+# Runs the ASGI app (asgi.py) under uvicorn with several worker processes. With the
+# compiled engine (the default here) the master compiles the forest once into a
+# memory-mapped cache of node arrays plus imputer statistics; every worker maps it
+# read-only, so the model costs one copy in the page cache however many workers run.
+# The compiled forest only beats sklearn on small batches, so a worker unpickles the model
+# the first time it scores more than DPS_COMPILED_MAX_ROWS rows (default 500) at once and
+# hands such batches to sklearn; single-row /predict traffic never loads it.
+# Each worker scores on a bounded inference pool sized to its share of the CPU cores.
+# SIGTERM or SIGINT stops accepting connections, lets in-flight requests finish (up to
+# --graceful-timeout seconds) and drains the pools before the workers exit.
+#
+# Workers share nothing but the model cache and the history database. With more than
+# one worker, prediction history defaults to the sqlite backend (DPS_HISTORY_BACKEND,
+# DPS_HISTORY_DB) and the per-process memory backend is refused, since a user's
+# /history would depend on which worker answers. Everything else is per worker:
+# the prediction cache, micro-batcher, admission limits, /analytics aggregates, the
+# drift window, /metrics counters and model reloads (/admin/reload reaches one worker;
+# DPS_MODEL_WATCH=1 lets each worker pick up a replaced model file).
+#
+#   pip install uvicorn
+#   python serve.py --workers 4 --port 5000
+#
+# `python DPS.py` still starts Flask's development server.
+
+import argparse
+import os
+import sys
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Serve the diabetes prediction app in production.')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('DPS_WORKERS', cores)),
+                        help='Worker processes (default: one per core)')
+    parser.add_argument('--engine', choices=['compiled', 'sklearn'],
+                        default=os.environ.get('DPS_INFERENCE_ENGINE', 'compiled'),
+                        help='compiled: workers share one memory-mapped forest for batches up to '
+                             'DPS_COMPILED_MAX_ROWS rows; sklearn: each worker unpickles the model')
+    parser.add_argument('--inference-threads', type=int,
+                        help='Scoring threads per worker (default: cores / workers, at least 1)')
+    parser.add_argument('--handler-threads', type=int, help='Request handler threads per worker (default: 32)')
+    parser.add_argument('--graceful-timeout', type=float, default=30,
+                        help='Seconds to wait for in-flight requests on shutdown')
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        print('serve.py needs uvicorn: pip install uvicorn', file=sys.stderr)
+        return 1
+
+    # Workers inherit these; flags win over the environment, which wins over the defaults
+    if args.workers > 1:
+        backend = os.environ.setdefault('DPS_HISTORY_BACKEND', 'sqlite')
+        if backend == 'memory':
+            print('DPS_HISTORY_BACKEND=memory keeps a separate history per worker; '
+                  'use sqlite or --workers 1', file=sys.stderr)
+            return 1
+    os.environ['DPS_INFERENCE_ENGINE'] = args.engine
+    if args.engine == 'compiled':
+        from scoring import MODEL_PATH, prepare_shared_model
+        print(f'Shared model: {prepare_shared_model(MODEL_PATH)}', file=sys.stderr)
+        os.environ['DPS_MODEL_MMAP'] = '1'
+    if args.inference_threads:
+        os.environ['DPS_INFERENCE_THREADS'] = str(args.inference_threads)
+    else:
+        os.environ.setdefault('DPS_INFERENCE_THREADS', str(max(1, cores // max(1, args.workers))))
+    if args.handler_threads:
+        os.environ['DPS_HANDLER_THREADS'] = str(args.handler_threads)
+
+    uvicorn.run('asgi:app', host=args.host, port=args.port, workers=args.workers, lifespan='on',
+                timeout_graceful_shutdown=args.graceful_timeout, log_level=args.log_level)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+/*
+ * Chart renderer for the dashboard (our own code, not a copy of Chart.js).
+ * It mirrors the small part of the Chart.js API the dashboard calls, so pages
+ * can use new Chart(ctx, {type, data, options}), chart.data, chart.options and
+ * chart.update(). Supports 'pie' and 'line' charts with a title and a legend;
+ * line charts honour options.scales.y.min/max and a tick callback.
+ * To use the real library, serve the Chart.js UMD build (with its MIT license
+ * header) from static/vendor/ and point the dashboard's script tag at it.
+ */
+(function (global) {
+    'use strict';
+
+    const FONT = "12px 'Roboto', system-ui, -apple-system, 'Segoe UI', Arial, sans-serif";
+    const TITLE_FONT = "bold 12px 'Roboto', system-ui, -apple-system, 'Segoe UI', Arial, sans-serif";
+    const TEXT_COLOR = '#666';
+
+    class Chart {
+        constructor(ctx, config) {
+            this.ctx = ctx.getContext ? ctx.getContext('2d') : ctx;
+            this.canvas = this.ctx.canvas;
+            this.config = config;
+            this.type = config.type;
+            this.data = config.data;
+            this.options = config.options || {};
+            if (this.options.responsive !== false) {
+                this._onResize = () => this.update();
+                global.addEventListener('resize', this._onResize);
+            }
+            this.update();
+        }
+
+        update() {
+            this._resize();
+            const ctx = this.ctx;
+            ctx.clearRect(0, 0, this.width, this.height);
+            let area = {left: 0, top: 0, right: this.width, bottom: this.height};
+            area = this._drawTitle(area);
+            area = this._drawLegend(area);
+            if (this.type === 'pie') {
+                this._drawPie(area);
+            } else if (this.type === 'line') {
+                this._drawLine(area);
+            }
+        }
+
+        destroy() {
+            if (this._onResize) {
+                global.removeEventListener('resize', this._onResize);
+            }
+            this.ctx.clearRect(0, 0, this.canvas.width, this.canvas.height);
+        }
+
+        _resize() {
+            // Fill the parent element (maintainAspectRatio: false) at device resolution
+            const parent = this.canvas.parentNode;
+            const ratio = global.devicePixelRatio || 1;
+            this.width = (parent && parent.clientWidth) || this.canvas.width;
+            this.height = (parent && this.options.maintainAspectRatio === false && parent.clientHeight) ||
+                this.width / 2;
+            this.canvas.style.width = this.width + 'px';
+            this.canvas.style.height = this.height + 'px';
+            this.canvas.width = Math.round(this.width * ratio);
+            this.canvas.height = Math.round(this.height * ratio);
+            this.ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+        }
+
+        _plugin(name) {
+            return (this.options.plugins && this.options.plugins[name]) || {};
+        }
+
+        _drawTitle(area) {
+            const title = this._plugin('title');
+            if (!title.display || !title.text) {
+                return area;
+            }
+            const ctx = this.ctx;
+            ctx.font = TITLE_FONT;
+            ctx.fillStyle = TEXT_COLOR;
+            ctx.textAlign = 'center';
+            ctx.textBaseline = 'top';
+            ctx.fillText(title.text, (area.left + area.right) / 2, area.top + 4);
+            return Object.assign({}, area, {top: area.top + 24});
+        }
+
+        _drawLegend(area) {
+            const legend = this._plugin('legend');
+            if (legend.display === false) {
+                return area;
+            }
+            const ctx = this.ctx;
+            const line = this.type === 'line';
+            const colors = line ? this.data.datasets.map(dataset => dataset.borderColor || '#36a2eb') : this._colors();
+            const labels = line ? this.data.datasets.map(dataset => dataset.label || '') : this.data.labels || [];
+            ctx.font = FONT;
+            const widths = labels.map(label => 18 + ctx.measureText(label).width);
+            const total = widths.reduce((sum, width) => sum + width, 0) + 10 * (labels.length - 1);
+            const y = legend.position === 'top' ? area.top + 4 : area.bottom - 16;
+            let x = (area.left + area.right - total) / 2;
+            ctx.textAlign = 'left';
+            ctx.textBaseline = 'top';
+            labels.forEach((label, index) => {
+                ctx.fillStyle = colors[index % colors.length];
+                ctx.fillRect(x, y + 1, 12, 12);
+                ctx.fillStyle = TEXT_COLOR;
+                ctx.fillText(label, x + 18, y + 1);
+                x += widths[index] + 10;
+            });
+            return legend.position === 'top' ?
+                Object.assign({}, area, {top: area.top + 24}) :
+                Object.assign({}, area, {bottom: area.bottom - 24});
+        }
+
+        _colors() {
+            const dataset = this.data.datasets[0] || {};
+            const colors = dataset.backgroundColor || ['#36a2eb', '#ff6384', '#ff9f40', '#ffcd56', '#4bc0c0'];
+            return Array.isArray(colors) ? colors : [colors];
+        }
+
+        _drawPie(area) {
+            const ctx = this.ctx;
+            const values = (this.data.datasets[0] || {data: []}).data.map(Number);
+            const total = values.reduce((sum, value) => sum + (value > 0 ? value : 0), 0);
+            const colors = this._colors();
+            const x = (area.left + area.right) / 2;
+            const y = (area.top + area.bottom) / 2;
+            const radius = Math.max(0, Math.min(area.right - area.left, area.bottom - area.top) / 2 - 4);
+            if (!total || !radius) {
+                return;
+            }
+            let angle = -Math.PI / 2;
+            values.forEach((value, index) => {
+                if (!(value > 0)) {
+                    return;
+                }
+                const sweep = value / total * 2 * Math.PI;
+                ctx.beginPath();
+                ctx.moveTo(x, y);
+                ctx.arc(x, y, radius, angle, angle + sweep);
+                ctx.closePath();
+                ctx.fillStyle = colors[index % colors.length];
+                ctx.fill();
+                ctx.strokeStyle = '#fff';
+                ctx.lineWidth = 2;
+                ctx.stroke();
+                angle += sweep;
+            });
+        }
+
+        _drawLine(area) {
+            // Category x axis (data.labels) and a linear y axis shared by every dataset
+            const ctx = this.ctx;
+            const labels = this.data.labels || [];
+            const datasets = this.data.datasets || [];
+            const scaleY = (this.options.scales && this.options.scales.y) || {};
+            const values = [].concat(...datasets.map(dataset => dataset.data.map(Number)));
+            const min = scaleY.min !== undefined ? scaleY.min : Math.min(...values);
+            const max = scaleY.max !== undefined ? scaleY.max : Math.max(...values);
+            const tick = (scaleY.ticks && scaleY.ticks.callback) || (value => value);
+            const plot = {left: area.left + 40, top: area.top + 6, right: area.right - 10, bottom: area.bottom - 20};
+            if (!labels.length || plot.right <= plot.left || plot.bottom <= plot.top || !(max > min)) {
+                return;
+            }
+            const x = index => plot.left + (labels.length > 1 ? index / (labels.length - 1) : 0.5) *
+                (plot.right - plot.left);
+            const y = value => plot.bottom - (value - min) / (max - min) * (plot.bottom - plot.top);
+
+            ctx.font = FONT;
+            ctx.fillStyle = TEXT_COLOR;
+            ctx.strokeStyle = '#e9ecef';
+            ctx.lineWidth = 1;
+            ctx.textAlign = 'right';
+            ctx.textBaseline = 'middle';
+            for (let step = 0; step <= 4; step++) {
+                const value = min + (max - min) * step / 4;
+                ctx.beginPath();
+                ctx.moveTo(plot.left, y(value));
+                ctx.lineTo(plot.right, y(value));
+                ctx.stroke();
+                ctx.fillText(tick(value), plot.left - 6, y(value));
+            }
+            ctx.textAlign = 'center';
+            ctx.textBaseline = 'top';
+            const every = Math.max(1, Math.ceil(labels.length / 6));
+            labels.forEach((label, index) => {
+                if (index % every === 0 || index === labels.length - 1) {
+                    ctx.fillText(label, x(index), plot.bottom + 4);
+                }
+            });
+
+            datasets.forEach(dataset => {
+                ctx.beginPath();
+                dataset.data.forEach((value, index) => {
+                    const point = [x(index), y(Number(value))];
+                    if (index === 0) {
+                        ctx.moveTo(...point);
+                    } else {
+                        ctx.lineTo(...point);
+                    }
+                });
+                ctx.strokeStyle = dataset.borderColor || '#36a2eb';
+                ctx.lineWidth = dataset.borderWidth || 2;
+                ctx.stroke();
+            });
+        }
+    }
+
+    global.Chart = Chart;
+})(window);
@@ -0,0 +1,200 @@
+let history = [];
+let chart;
+// Shown while the user has no history: every prediction served (from /analytics),
+// or the Pima dataset until there are any
+let overall = { data: [65, 35], title: 'Overall Dataset (65% No / 35% Yes)' };
+
+// Initialize chart with overall stats
+function initChart() {
+    const ctx = document.getElementById('riskChart').getContext('2d');
+    chart = new Chart(ctx, {
+        type: 'pie',
+        data: {
+            labels: ['No Diabetes', 'Diabetes'],
+            datasets: [{
+                data: overall.data,
+                backgroundColor: ['#28a745', '#dc3545']
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: { position: 'bottom' },
+                title: { display: true, text: overall.title }
+            }
+        }
+    });
+}
+
+// Update chart from history
+function updateChart() {
+    const noDiabetes = history.filter(h => h.outcome === 0).length;
+    const diabetes = history.filter(h => h.outcome === 1).length;
+    const total = history.length;
+    if (total === 0) {
+        chart.data.datasets[0].data = overall.data;
+        chart.options.plugins.title.text = overall.title;
+    } else {
+        const noPct = (noDiabetes / total * 100).toFixed(1);
+        const yesPct = (diabetes / total * 100).toFixed(1);
+        chart.data.datasets[0].data = [noPct, yesPct];
+        chart.options.plugins.title.text = `Your History (${noPct}% No / ${yesPct}% Yes)`;
+    }
+    chart.update();
+}
+
+// Update history list
+function updateHistoryList() {
+    const list = document.getElementById('historyList');
+    const noHistoryDiv = document.getElementById('noHistory');
+    list.innerHTML = '';
+    if (history.length === 0) {
+        noHistoryDiv.style.display = 'block';
+        return;
+    }
+    noHistoryDiv.style.display = 'none';
+    history.forEach((item, index) => {
+        const li = document.createElement('li');
+        li.className = `history-item ${item.outcome === 1 ? 'high' : 'low'}`;
+        li.innerHTML = `<strong>${new Date(item.timestamp).toLocaleString()}</strong><br>
+                        Outcome: ${item.outcome === 1 ? 'Diabetes Positive' : 'No Diabetes'}<br>
+                        Probability: ${item.probability}`;
+        list.appendChild(li);
+    });
+}
+
+// Clear history
+function clearHistory() {
+    fetch('/clear_history', { method: 'POST' })
+        .then(response => response.json())
+        .then(() => {
+            history = [];
+            updateHistoryList();
+            updateChart();
+        });
+}
+
+// Population outcome split across all users
+fetch('/analytics?windows=0')
+    .then(response => response.json())
+    .then(stats => {
+        const total = stats.total.count;
+        if (!total) {
+            return;
+        }
+        const yesPct = ((stats.total.outcomes['1'] || 0) / total * 100).toFixed(1);
+        const noPct = (100 - yesPct).toFixed(1);
+        overall = { data: [noPct, yesPct], title: `All Predictions (${noPct}% No / ${yesPct}% Yes)` };
+        updateChart();
+    })
+    .catch(() => {});
+
+// Load initial history
+fetch('/history')
+    .then(response => response.json())
+    .then(data => {
+        history = data;
+        updateHistoryList();
+        updateChart();
+    });
+
+// Form submit
+const form = document.getElementById('predictForm');
+const resultDiv = document.getElementById('result');
+form.addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const formData = new FormData(form);
+    try {
+        // Explanations are opt-in: they bypass the prediction cache, micro-batching and adaptive scoring
+        const explain = document.getElementById('explainToggle').checked;
+        const response = await fetch(explain ? '/predict?explain=1' : '/predict', { method: 'POST', body: formData });
+        const result = await response.json().catch(() => ({}));
+        if (!response.ok) {
+            // Rejected (400) or shed under load (429/503): nothing to record in the history
+            const retryAfter = response.headers.get('Retry-After');
+            resultDiv.className = '';
+            resultDiv.innerHTML = '<p style="color: red;">Error: ' + (result.error || response.statusText) +
+                (retryAfter ? ` (retry in ${retryAfter} s)` : '') + '</p>';
+            resultDiv.style.display = 'block';
+            return;
+        }
+        // The three features that moved this patient's probability the most
+        const factors = Object.entries(result.contributions || {})
+            .sort((a, b) => Math.abs(b[1]) - Math.abs(a[1]))
+            .slice(0, 3)
+            .map(([name, value]) => `${name} ${value > 0 ? '+' : ''}${(value * 100).toFixed(1)}%`);
+        resultDiv.className = result.outcome === 1 ? 'high-risk' : 'success';
+        resultDiv.innerHTML = `
+            <h2>Prediction: ${result.risk} Risk</h2>
+            <p>Outcome: ${result.outcome ? 'Diabetes Positive' : 'No Diabetes'}</p>
+            <p>Probability of Diabetes: ${result.probability}</p>
+            ${factors.length ? `<p>Main factors: ${factors.join(', ')}</p>` : ''}
+        `;
+        resultDiv.style.display = 'block';
+
+        // Add to history
+        result.timestamp = Date.now();
+        history.unshift(result);
+        updateHistoryList();
+        updateChart();
+    } catch (error) {
+        resultDiv.innerHTML = '<p style="color: red;">Error: ' + error.message + '</p>';
+        resultDiv.style.display = 'block';
+    }
+});
+
+form.addEventListener('reset', (e) => {
+    resultDiv.style.display = 'none';
+});
+
+document.getElementById('clearHistory').addEventListener('click', clearHistory);
+
+// What-if curve: risk as one feature varies, other features as currently entered
+let whatIfChart;
+async function showWhatIf() {
+    const feature = document.getElementById('whatIfFeature').value;
+    const patient = Object.fromEntries([...new FormData(form)].filter(([, value]) => value !== ''));
+    const response = await fetch('/what_if', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ patient: patient, features: [feature] })
+    });
+    const curve = await response.json();
+    if (!response.ok) {
+        resultDiv.innerHTML = '<p style="color: red;">Error: ' + curve.error + '</p>';
+        resultDiv.style.display = 'block';
+        return;
+    }
+    const labels = curve.axes[0].map(value => Number(value.toFixed(feature === 'BMI' ? 1 : 0)));
+    const data = curve.probability.map(probability => (probability * 100).toFixed(1));
+    const title = `Risk vs ${feature} (other values as entered)`;
+    if (whatIfChart) {
+        whatIfChart.data.labels = labels;
+        whatIfChart.data.datasets[0].data = data;
+        whatIfChart.options.plugins.title.text = title;
+        whatIfChart.update();
+        return;
+    }
+    whatIfChart = new Chart(document.getElementById('whatIfChart').getContext('2d'), {
+        type: 'line',
+        data: {
+            labels: labels,
+            datasets: [{ label: 'Probability of Diabetes', data: data, borderColor: '#dc3545', borderWidth: 2 }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: { y: { min: 0, max: 100, ticks: { callback: value => value + '%' } } },
+            plugins: {
+                legend: { display: false },
+                title: { display: true, text: title }
+            }
+        }
+    });
+}
+
+document.getElementById('whatIfButton').addEventListener('click', showWhatIf);
+
+// Init
+initChart();
@@ -0,0 +1,95 @@
+# Precompressed pages and fingerprinted static assets for the Diabetes Prediction app
+# Everything is read or rendered once at startup and kept in memory as raw, gzip and
+# (when the optional brotli package is installed) brotli bytes. Responses carry a
+# strong per-encoding ETag and Last-Modified and answer conditional requests with
+# 304. Assets are also published under content-hashed names so browsers can keep
+# them for a year without revalidating.
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import time
+from datetime import datetime, timezone
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Served to browsers for fingerprinted asset URLs
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Cached but revalidated on every use (304 when unchanged)
+REVALIDATE = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+class CompressedContent:
+    def __init__(self, body, mimetype, last_modified=None, min_size=256):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.body = body
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()
+        # HTTP dates have one-second resolution
+        self.last_modified = datetime.fromtimestamp(int(last_modified or time.time()), timezone.utc)
+        self.encodings = {}  # encoding -> bytes, kept only when smaller than the raw body
+        if len(body) >= min_size and mimetype.startswith(COMPRESSIBLE_TYPES):
+            candidates = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                candidates['br'] = brotli.compress(body, quality=11)
+            self.encodings = {name: data for name, data in candidates.items() if len(data) < len(body)}
+
+    def negotiate(self, accept_encodings):
+        # Smallest encoding the client accepts, or None for the raw body
+        best = None
+        for name, data in self.encodings.items():
+            if accept_encodings[name] and (best is None or len(data) < len(self.encodings[best])):
+                best = name
+        return best
+
+    def respond(self, request, cache_control=REVALIDATE):
+        encoding = self.negotiate(request.accept_encodings)
+        response = Response(self.encodings[encoding] if encoding else self.body, mimetype=self.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if self.encodings:
+            response.vary.add('Accept-Encoding')
+        response.set_etag(self.digest[:32] + (f'-{encoding}' if encoding else ''))
+        response.last_modified = self.last_modified
+        response.headers['Cache-Control'] = cache_control
+        return response.make_conditional(request)
+
+
+class StaticAssets:
+    def __init__(self, directory, url_prefix='/static/'):
+        # Every file under directory is served by its plain name and by a fingerprinted
+        # name (css/app.css -> css/app.<hash>.css) that url() hands out to pages
+        self.url_prefix = url_prefix
+        self.files = {}         # served name -> CompressedContent
+        self.fingerprints = {}  # plain name -> fingerprinted name
+        for root, _, filenames in os.walk(directory):
+            for filename in sorted(filenames):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    body = f.read()
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                content = CompressedContent(body, mimetype, os.path.getmtime(path))
+                stem, ext = os.path.splitext(name)
+                fingerprinted = f'{stem}.{content.digest[:10]}{ext}'
+                self.files[name] = self.files[fingerprinted] = content
+                self.fingerprints[name] = fingerprinted
+
+    def url(self, name):
+        return self.url_prefix + self.fingerprints[name]
+
+    def respond(self, request, name):
+        # None for unknown names; fingerprinted names never change, plain names revalidate
+        content = self.files.get(name)
+        if content is None:
+            return None
+        return content.respond(request, REVALIDATE if name in self.fingerprints else IMMUTABLE)
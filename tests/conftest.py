@@ -0,0 +1,32 @@
+# Shared fixtures for the Diabetes Prediction test suite
+# Run from the repository root: python -m pytest -q
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# No background drift thread or model watcher during tests
+os.environ.setdefault('DPS_DRIFT', '0')
+os.environ.setdefault('DPS_MODEL_WATCH', '0')
+os.environ.setdefault('DPS_ADMIN_TOKEN', 'test-token')
+
+
+@pytest.fixture(scope='session')
+def dps():
+    import DPS
+    yield DPS
+    DPS.shutdown()
+
+
+@pytest.fixture
+def client(dps):
+    client = dps.app.test_client()
+    with client.session_transaction() as session:
+        session['logged_in'] = True
+        session['username'] = 'tester'
+    return client
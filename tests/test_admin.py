@@ -0,0 +1,41 @@
+# /admin/reload only loads model files from the model directory
+
+import os
+import time
+
+import pytest
+
+ADMIN = {'X-Admin-Token': 'test-token'}
+
+
+@pytest.mark.parametrize('path', ['/etc/passwd', '../DiabetesPredictionModel.pkl', 'static/../../x.pkl'])
+def test_reload_rejects_paths_outside_model_dir(client, path):
+    response = client.post('/admin/reload', json={'path': path}, headers=ADMIN)
+    assert response.status_code == 400
+    assert 'inside' in response.get_json()['error']
+
+
+def test_reload_rejects_symlink_out_of_model_dir(client, dps, tmp_path):
+    outside = tmp_path / 'model.pkl'
+    outside.write_bytes(b'not a model')
+    link = os.path.join(dps.MODEL_DIR, f'.test-link-{os.getpid()}.pkl')
+    os.symlink(outside, link)
+    try:
+        response = client.post('/admin/reload', json={'path': os.path.basename(link)}, headers=ADMIN)
+    finally:
+        os.remove(link)
+    assert response.status_code == 400
+
+
+def test_reload_accepts_model_in_model_dir(client, dps):
+    response = client.post('/admin/reload', json={'path': os.path.basename(dps.MODEL_PATH)}, headers=ADMIN)
+    assert response.status_code == 202
+    for _ in range(100):
+        if dps.model_registry.last_reload['status'] != 'loading':
+            break
+        time.sleep(0.05)
+    assert dps.model_registry.last_reload['status'] == 'ok'
+
+
+def test_reload_requires_token(client):
+    assert client.post('/admin/reload', json={}).status_code == 403
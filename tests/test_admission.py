@@ -0,0 +1,66 @@
+# Admission control: per-session token buckets, a concurrency cap and a bounded FIFO queue
+
+import threading
+import time
+
+from admission import AdmissionController
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    controller = AdmissionController(rate=2.0, burst=3, clock=clock)
+    for _ in range(3):
+        assert controller.acquire('a') is None
+        controller.release()
+    rejection = controller.acquire('a')
+    assert (rejection.status, rejection.reason, rejection.retry_after) == (429, 'rate_limited', 1)
+    # Other sessions have their own bucket
+    assert controller.acquire('b') is None
+    controller.release()
+    clock.now += 0.5
+    assert controller.acquire('a') is None
+    controller.release()
+    assert controller.stats()['shed']['rate_limited'] == 1
+
+
+def test_full_queue_is_shed_immediately():
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    assert controller.acquire('a') is None
+    rejection = controller.acquire('b')
+    assert (rejection.status, rejection.reason) == (503, 'queue_full')
+    controller.release()
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_queued_request_times_out():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.01)
+    assert controller.acquire('a') is None
+    assert controller.acquire('b').reason == 'queue_timeout'
+    assert controller.stats()['queue_depth'] == 0
+
+
+def test_release_hands_slot_to_oldest_waiter():
+    controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=5)
+    assert controller.acquire('a') is None
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(controller.acquire('b')))
+    waiter.start()
+    for _ in range(500):
+        if controller.stats()['queue_depth']:
+            break
+        time.sleep(0.01)
+    controller.release()
+    waiter.join()
+    assert results == [None]
+    stats = controller.stats()
+    assert (stats['in_flight'], stats['admitted'], stats['queued']) == (1, 2, 1)
+    controller.release()
+    assert controller.stats()['in_flight'] == 0
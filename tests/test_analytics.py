@@ -0,0 +1,61 @@
+# Streaming analytics: windowed, mergeable aggregates that match the raw data
+
+import numpy as np
+
+from analytics import PROBABILITY_BINS, PredictionAnalytics, QuantileSketch
+
+NAMES = ['a', 'b']
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_single_rows_and_batches_give_the_same_totals():
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(50, 10, (1000, 2))
+    matrix[::7, 1] = np.nan
+    probabilities = rng.random(1000)
+    outcomes = (probabilities > 0.5).astype(int)
+    clock = FakeClock()
+    batched, single = PredictionAnalytics(NAMES, clock=clock), PredictionAnalytics(NAMES, clock=clock)
+    batched.observe(matrix, outcomes, probabilities)
+    for row, outcome, probability in zip(matrix, outcomes, probabilities):
+        single.observe(row, [outcome], [probability])
+    for analytics in (batched, single):
+        total = analytics.snapshot()['total']
+        assert total['count'] == 1000
+        assert total['outcomes'] == {'0': int((outcomes == 0).sum()), '1': int(outcomes.sum())}
+        assert sum(total['probability_histogram']) == 1000 and len(total['probability_histogram']) == PROBABILITY_BINS
+        column = matrix[:, 1][~np.isnan(matrix[:, 1])]
+        feature = total['features']['b']
+        assert feature['missing'] == 1000 - len(column)
+        np.testing.assert_allclose([feature['mean'], feature['std']], [column.mean(), column.std(ddof=1)])
+        assert (feature['min'], feature['max']) == (column.min(), column.max())
+
+
+def test_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(1).lognormal(3, 1, (20000, 1))
+    sketch = QuantileSketch(1, relative_accuracy=0.01)
+    sketch.add(values, np.isfinite(values))
+    for q, estimate in zip((0.05, 0.5, 0.95), sketch.quantiles(0, (0.05, 0.5, 0.95))):
+        exact = np.quantile(values, q)
+        assert abs(estimate - exact) <= 0.02 * exact
+
+
+def test_windows_roll_over_and_retire():
+    clock = FakeClock()
+    analytics = PredictionAnalytics(NAMES, window_seconds=60, max_windows=2, clock=clock)
+    for minute in range(4):
+        analytics.observe(np.full((3, 2), float(minute)), [0, 1, 1], [0.1, 0.6, 0.9])
+        clock.now += 60
+    snapshot = analytics.snapshot(windows=5)
+    # Two recent windows, newest first; the older two are folded into the all-time total
+    assert [window['features']['a']['mean'] for window in snapshot['windows']] == [3.0, 2.0]
+    assert snapshot['total']['count'] == 12
+    assert snapshot['total']['features']['a']['mean'] == 1.5
+    assert analytics.merged(since=clock.now - 60).count == 3
@@ -0,0 +1,91 @@
+# The ASGI adapter serves Flask routes over fake receive/send and runs the lifespan protocol
+
+import asyncio
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+PATIENT = {'Pregnancies': '6', 'Glucose': '148', 'BloodPressure': '72', 'SkinThickness': '35',
+           'Insulin': '0', 'BMI': '33.6', 'DiabetesPedigreeFunction': '0.627', 'Age': '50'}
+
+
+@pytest.fixture(scope='module')
+def asgi(dps):
+    import asgi
+    return asgi
+
+
+def http_scope(method, path, headers=(), query_string=b''):
+    return {'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'path': path,
+            'root_path': '', 'query_string': query_string, 'headers': list(headers),
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 12345)}
+
+
+def run(app, scope, messages):
+    # Feed `messages` to the app and collect everything it sends
+    async def drive():
+        incoming = list(messages)
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await app(scope, receive, send)
+        return sent
+
+    return asyncio.run(drive())
+
+
+def response_of(sent):
+    start = sent[0]
+    assert start['type'] == 'http.response.start'
+    assert sent[-1] == {'type': 'http.response.body', 'body': b'', 'more_body': False}
+    headers = {}
+    for name, value in start['headers']:
+        headers.setdefault(name.decode(), []).append(value.decode())
+    return start['status'], headers, b''.join(message['body'] for message in sent[1:])
+
+
+def test_http_request_round_trip(asgi):
+    form = urlencode({'username': 'asgi', 'password': '1234'}).encode()
+    sent = run(asgi.app, http_scope('POST', '/login', [(b'content-type', b'application/x-www-form-urlencoded')]),
+               [{'type': 'http.request', 'body': form}])
+    status, headers, _ = response_of(sent)
+    assert status == 302
+    cookie = headers['set-cookie'][0].split(';', 1)[0].encode()
+
+    # The body arrives in two messages and is reassembled before Flask sees it
+    body = urlencode(PATIENT).encode()
+    scope = http_scope('POST', '/predict', [(b'content-type', b'application/x-www-form-urlencoded'),
+                                            (b'cookie', cookie)])
+    sent = run(asgi.app, scope, [{'type': 'http.request', 'body': body[:20], 'more_body': True},
+                                 {'type': 'http.request', 'body': body[20:]}])
+    status, headers, payload = response_of(sent)
+    assert status == 200
+    assert headers['content-type'] == ['application/json']
+    assert json.loads(payload)['risk'] in ('High', 'Low')
+
+
+def test_disconnect_before_body_sends_nothing(asgi):
+    sent = run(asgi.app, http_scope('POST', '/predict'), [{'type': 'http.disconnect'}])
+    assert sent == []
+
+
+def test_lifespan_startup_and_shutdown(asgi, dps):
+    # A separate adapter, so shutting it down leaves the shared app and DPS pools running
+    shutdowns = []
+    adapter = asgi.AsgiAdapter(dps.app, threads=2, on_shutdown=lambda: shutdowns.append(True))
+    sent = run(adapter, {'type': 'lifespan'}, [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+    assert sent == [{'type': 'lifespan.startup.complete'}, {'type': 'lifespan.shutdown.complete'}]
+    assert shutdowns == [True]
+    with pytest.raises(RuntimeError):
+        adapter.executor.submit(print)
+
+
+def test_unsupported_scope_is_rejected(asgi):
+    with pytest.raises(ValueError):
+        run(asgi.app, {'type': 'websocket'}, [])
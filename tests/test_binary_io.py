@@ -0,0 +1,58 @@
+# /predict_binary scores .npy and Arrow payloads like /predict_batch scores JSON
+
+import io
+
+import numpy as np
+import pytest
+
+import binary_io
+from scoring import feature_names
+
+RECORDS = [
+    {'Pregnancies': 6, 'Glucose': 148, 'BloodPressure': 72, 'SkinThickness': 35, 'Insulin': 0, 'BMI': 33.6,
+     'DiabetesPedigreeFunction': 0.627, 'Age': 50},
+    {'Pregnancies': 1, 'Glucose': 85, 'BloodPressure': 66, 'SkinThickness': 29, 'Insulin': 0, 'BMI': 26.6,
+     'DiabetesPedigreeFunction': 0.351, 'Age': 31},
+    {'Pregnancies': 8, 'Glucose': 183, 'BloodPressure': 64, 'BMI': 23.3, 'DiabetesPedigreeFunction': 0.672},
+]
+
+
+def batch_probabilities(client):
+    results = client.post('/predict_batch', json=RECORDS).get_json()['results']
+    return [float(result['probability'].rstrip('%')) / 100 for result in results]
+
+
+def test_npy_matches_batch(client):
+    matrix = np.array([[record.get(name, 0) for name in feature_names] for record in RECORDS], dtype=np.float32)
+    buffer = io.BytesIO()
+    np.save(buffer, matrix)
+    response = client.post('/predict_binary', data=buffer.getvalue(), content_type='application/x-npy')
+    assert response.status_code == 200
+    results = np.load(io.BytesIO(response.get_data()))
+    assert results.shape == (len(RECORDS), 2)
+    np.testing.assert_allclose(results[:, 1], batch_probabilities(client), atol=5e-5)
+
+
+def test_npy_rejects_wrong_shape():
+    buffer = io.BytesIO()
+    np.save(buffer, np.zeros((2, 3)))
+    with pytest.raises(ValueError):
+        binary_io.read_npy(buffer.getvalue(), len(feature_names))
+
+
+def test_arrow_matches_batch(client):
+    pa = pytest.importorskip('pyarrow')
+    # Absent fields are nulls; columns arrive in a different order and in two chunks
+    columns = {name: pa.chunked_array([[record.get(name) for record in RECORDS[:2]],
+                                       [record.get(name) for record in RECORDS[2:]]], type=pa.float32())
+               for name in reversed(feature_names)}
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post('/predict_binary', data=sink.getvalue().to_pybytes(),
+                           content_type='application/vnd.apache.arrow.stream')
+    assert response.status_code == 200
+    results = pa.ipc.open_stream(response.get_data()).read_all()
+    assert results.column_names == list(binary_io.RESULT_COLUMNS)
+    np.testing.assert_allclose(results.column('probability').to_pylist(), batch_probabilities(client), atol=5e-5)
@@ -0,0 +1,77 @@
+# Drift monitor: PSI/KS against a reference profile, unimputed-zero checks, ring buffer
+
+import numpy as np
+import pytest
+
+from drift import DriftMonitor, build_profile, load_profile, population_stability_index, save_profile
+
+NAMES = ['Glucose', 'Age']
+
+
+@pytest.fixture(scope='module')
+def reference():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.normal(120, 30, 5000), rng.normal(35, 10, 5000)])
+
+
+@pytest.fixture(scope='module')
+def profile(reference):
+    return build_profile(reference, NAMES, source='test')
+
+
+def sample(rng, n=2000, glucose_shift=0.0):
+    return np.column_stack([rng.normal(120 + glucose_shift, 30, n), rng.normal(35, 10, n)])
+
+
+def test_same_distribution_raises_no_alert(profile):
+    monitor = DriftMonitor(NAMES, profile, window_size=2000)
+    monitor.observe(sample(np.random.default_rng(1)))
+    report = monitor.check()
+    assert report['alerts'] == []
+    assert all(stats['status'] == 'ok' for stats in report['features'].values())
+
+
+def test_shift_raises_then_clears(profile):
+    rng = np.random.default_rng(2)
+    monitor = DriftMonitor(NAMES, profile, window_size=2000)
+    monitor.observe(sample(rng, glucose_shift=30))
+    report = monitor.check()
+    assert report['features']['Glucose']['status'] == 'drift'
+    assert report['features']['Age']['status'] == 'ok'
+    monitor.observe(sample(rng))
+    assert monitor.check()['alerts'] == []
+    assert [(event['event'], event['feature']) for event in monitor.events] == \
+        [('raised', 'Glucose'), ('cleared', 'Glucose')]
+
+
+def test_unimputed_zeros_without_profile():
+    monitor = DriftMonitor(NAMES, window_size=1000, min_rows=100, zero_columns=['Glucose'])
+    rows = sample(np.random.default_rng(3), 500)
+    rows[:100, 0] = 0
+    monitor.observe(rows)
+    alerts = monitor.check()['alerts']
+    assert [(alert['feature'], alert['kind']) for alert in alerts] == [('Glucose', 'unimputed_zeros')]
+
+
+def test_ring_buffer_keeps_the_latest_rows():
+    monitor = DriftMonitor(['x'], window_size=7)
+    for start in range(0, 20, 3):
+        monitor.observe(np.arange(start, min(start + 3, 20), dtype=np.float64).reshape(-1, 1))
+    assert sorted(monitor.window()[:, 0]) == list(range(13, 20))
+    assert monitor.seen == 20
+
+
+@pytest.mark.parametrize('window_size', [0, -1])
+def test_window_size_must_be_positive(window_size):
+    with pytest.raises(ValueError):
+        DriftMonitor(['x'], window_size=window_size)
+
+
+def test_profile_round_trip_and_psi(profile, tmp_path):
+    path = str(tmp_path / 'profile.json')
+    save_profile(profile, path)
+    assert load_profile(path) == profile
+    shares = profile['features']['Glucose']['shares']
+    assert population_stability_index(shares, shares) == 0.0
+    with pytest.raises(ValueError):
+        DriftMonitor(['Age', 'Glucose'], profile)
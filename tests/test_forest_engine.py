@@ -0,0 +1,93 @@
+# The compiled forest must reproduce sklearn's RandomForest probabilities bit for bit
+
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import scoring
+from forest_engine import CompiledForest
+from scoring import MODEL_PATH, feature_names
+
+
+@pytest.fixture(scope='module')
+def model():
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def forest(model):
+    return CompiledForest.from_sklearn(model)
+
+
+@pytest.fixture(scope='module')
+def rows(forest):
+    # Random rows over each feature's split range, rows sitting exactly on split thresholds
+    # (float32 rounding matters there) and about 10% NaN cells
+    rng = np.random.default_rng(0)
+    threshold = np.asarray(forest.threshold, dtype=np.float64)
+    internal = ~np.asarray(forest.is_leaf)
+    columns, on_split = [], []
+    for index in range(len(feature_names)):
+        used = threshold[internal & (np.asarray(forest.feature) == index)]
+        columns.append(rng.uniform(used.min() - 1, used.max() + 1, 2000))
+        on_split.append(rng.choice(used, 500))
+    X = np.vstack([np.column_stack(columns), np.column_stack(on_split), np.zeros((1, len(feature_names)))])
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return np.vstack([X, np.full((1, len(feature_names)), np.nan)])
+
+
+def sklearn_proba(model, X):
+    return model.predict_proba(pd.DataFrame(X, columns=feature_names))
+
+
+def test_predict_proba_matches_sklearn_exactly(model, forest, rows):
+    assert np.array_equal(forest.predict_proba(rows), sklearn_proba(model, rows))
+
+
+def test_predict_proba_single_rows_match(model, forest, rows):
+    for row in rows[::250]:
+        assert np.array_equal(forest.predict_proba(row[np.newaxis]), sklearn_proba(model, row[np.newaxis]))
+
+
+@pytest.mark.parametrize('thresholds', ['float32', 'int16'])
+def test_compact_round_trip_keeps_decisions(model, forest, rows, tmp_path, thresholds):
+    # Compact thresholds are exact; only leaf probabilities are rounded to float32
+    compact = forest.compact(thresholds=thresholds)
+    path = str(tmp_path / 'model.dpsf')
+    compact.save_compact(path, {'feature_names': feature_names})
+    loaded, _ = CompiledForest.load_compact(path)
+    assert np.array_equal(loaded.apply(rows), forest.apply(rows))
+    np.testing.assert_allclose(loaded.predict_proba(rows), sklearn_proba(model, rows), atol=1e-6)
+
+
+def test_contributions_add_up_to_probability(forest, rows):
+    proba, bias, contributions = forest.predict_contributions(rows)
+    assert np.array_equal(proba, forest.predict_proba(rows))
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), proba[:, 1], atol=1e-9)
+
+
+def test_adaptive_agrees_on_labels_at_full_confidence(forest, rows):
+    proba, trees_used = forest.predict_proba_adaptive(rows, confidence=0.999999)
+    assert (trees_used <= forest.n_trees).all()
+    full = forest.predict_proba(rows)
+    settled = trees_used == forest.n_trees
+    assert np.array_equal(proba[settled], full[settled])
+    assert np.mean(np.argmax(proba, axis=1) == np.argmax(full, axis=1)) > 0.99
+
+
+def test_pipeline_hands_large_batches_to_sklearn(model, rows, tmp_path, monkeypatch):
+    # A pipeline mapped from the compiled cache unpickles the model for batches above
+    # COMPILED_MAX_ROWS; both engines give the same probabilities either way
+    path = str(tmp_path / 'model.pkl')
+    shutil.copy(MODEL_PATH, path)
+    scoring.ScoringPipeline.load(path, engine='compiled')
+    pipeline = scoring.ScoringPipeline.load(path, engine='compiled')
+    assert pipeline.model is None
+    monkeypatch.setattr(scoring, 'COMPILED_MAX_ROWS', 100)
+    assert np.array_equal(pipeline.predict_proba(rows[:100]), sklearn_proba(model, rows[:100]))
+    assert pipeline.model is None
+    assert np.array_equal(pipeline.predict_proba(rows), sklearn_proba(model, rows))
+    assert pipeline.model is not None
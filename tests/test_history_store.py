@@ -0,0 +1,59 @@
+# Both history backends keep the newest `limit` entries per user, page and clear alike
+
+import pytest
+
+from history_store import MemoryHistoryStore, SqliteHistoryStore, create_history_store
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return create_history_store(request.param, limit=5, path=str(tmp_path / 'history.db'))
+
+
+def ids(entries):
+    return [entry['id'] for entry in entries]
+
+
+def test_keeps_newest_entries_newest_first(store):
+    for n in range(12):
+        store.append('alice', {'n': n})
+    entries = store.page('alice')
+    assert ids(entries) == [12, 11, 10, 9, 8]
+    assert [entry['n'] for entry in entries] == [11, 10, 9, 8, 7]
+
+
+def test_pages_with_before_cursor(store):
+    for n in range(5):
+        store.append('alice', {'n': n})
+    first = store.page('alice', limit=2)
+    assert ids(first) == [5, 4]
+    assert ids(store.page('alice', limit=2, before=first[-1]['id'])) == [3, 2]
+
+
+def test_clear_and_users_are_isolated(store):
+    store.append('alice', {'n': 0})
+    store.append('bob', {'n': 0})
+    store.clear('alice')
+    assert store.page('alice') == []
+    assert ids(store.page('bob')) == [1]
+    # Ids keep increasing after a clear so old cursors stay valid
+    assert store.append('alice', {'n': 1}) == 2
+    store.drop('bob')
+    assert store.page('bob') == []
+
+
+def test_sqlite_history_is_shared_between_stores(tmp_path):
+    # What several worker processes see when they open the same database
+    path = str(tmp_path / 'history.db')
+    first, second = SqliteHistoryStore(path, limit=5), SqliteHistoryStore(path, limit=5)
+    first.append('alice', {'n': 0})
+    second.append('alice', {'n': 1})
+    assert ids(first.page('alice')) == ids(second.page('alice')) == [2, 1]
+
+
+def test_memory_store_forgets_least_recent_users():
+    store = MemoryHistoryStore(limit=5, max_users=2)
+    for user in ('alice', 'bob', 'carol'):
+        store.append(user, {})
+    assert store.page('alice') == []
+    assert ids(store.page('carol')) == [1]
@@ -0,0 +1,64 @@
+# Every ingestion path scores a row with blank or missing fields the same way
+
+import csv
+import io
+import json
+
+import pytest
+
+from scoring import feature_names
+
+# Blank cells in imputed (Glucose, Insulin) and non-imputed (Age, Pregnancies) columns
+ROWS = [
+    {'Pregnancies': '6', 'Glucose': '148', 'BloodPressure': '72', 'SkinThickness': '35', 'Insulin': '0',
+     'BMI': '33.6', 'DiabetesPedigreeFunction': '0.627', 'Age': ''},
+    {'Pregnancies': '', 'Glucose': '', 'BloodPressure': '66', 'SkinThickness': '29', 'Insulin': '',
+     'BMI': '26.6', 'DiabetesPedigreeFunction': '0.351', 'Age': '31'},
+    {'Pregnancies': '8', 'Glucose': '183', 'BloodPressure': '64', 'SkinThickness': '', 'Insulin': '0',
+     'BMI': '23.3', 'DiabetesPedigreeFunction': '', 'Age': '32'},
+]
+
+
+def csv_text(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, feature_names, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def without_blanks(row):
+    return {name: value for name, value in row.items() if value}
+
+
+@pytest.fixture
+def batch_probabilities(client):
+    response = client.post('/predict_batch', json=[without_blanks(row) for row in ROWS])
+    assert response.status_code == 200
+    return [result['probability'] for result in response.get_json()['results']]
+
+
+def test_form_matches_batch(client, batch_probabilities):
+    for row, expected in zip(ROWS, batch_probabilities):
+        response = client.post('/predict', data=without_blanks(row))
+        assert response.get_json()['probability'] == expected
+
+
+def test_stream_csv_and_ndjson_match_batch(client, batch_probabilities):
+    response = client.post('/predict_stream', data=csv_text(ROWS), content_type='text/csv')
+    assert [row['probability'] for row in csv.DictReader(io.StringIO(response.get_data(as_text=True)))] == \
+        batch_probabilities
+    ndjson = ''.join(json.dumps(without_blanks(row)) + '\n' for row in ROWS)
+    response = client.post('/predict_stream', data=ndjson, content_type='application/x-ndjson')
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['probability'] for line in lines] == batch_probabilities
+
+
+def test_score_cli_matches_batch(dps, tmp_path, batch_probabilities):
+    import score_cli
+    source, output = tmp_path / 'patients.csv', tmp_path / 'scores.csv'
+    source.write_text(csv_text(ROWS))
+    score_cli.run(str(source), str(output), workers=1, model_path=dps.MODEL_PATH,
+                  engine=dps.INFERENCE_ENGINE, progress=None)
+    with open(output, newline='') as f:
+        assert [row['probability'] for row in csv.DictReader(f)] == batch_probabilities
@@ -0,0 +1,69 @@
+# /metrics counts requests and errors per endpoint and tracks requests in flight
+
+import pytest
+
+PATIENT = {'Pregnancies': '6', 'Glucose': '148', 'BloodPressure': '72', 'SkinThickness': '35',
+           'Insulin': '0', 'BMI': '33.6', 'DiabetesPedigreeFunction': '0.627', 'Age': '50'}
+
+
+def parse(text):
+    # Prometheus text format -> {'name{labels}': value}
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    return parse(response.get_data(as_text=True))
+
+
+@pytest.fixture(autouse=True)
+def metrics_enabled(dps):
+    if dps.metrics is None:
+        pytest.skip('DPS_METRICS=0')
+
+
+def test_predict_moves_request_and_error_counters(client):
+    ok = 'dps_requests_total{endpoint="predict",method="POST",status="200"}'
+    bad = 'dps_requests_total{endpoint="predict",method="POST",status="400"}'
+    errors = 'dps_request_errors_total{endpoint="predict"}'
+    latency = 'dps_request_duration_seconds_count{endpoint="predict"}'
+    before = scrape(client)
+    assert client.post('/predict', data=PATIENT).status_code == 200
+    assert client.post('/predict', data={**PATIENT, 'Glucose': 'abc'}).status_code == 400
+    after = scrape(client)
+    assert after[ok] - before.get(ok, 0) == 1
+    assert after[bad] - before.get(bad, 0) == 1
+    assert after[errors] - before.get(errors, 0) == 1
+    assert after[latency] - before.get(latency, 0) == 2
+
+
+def test_in_flight_gauge_covers_the_request(client, dps, monkeypatch):
+    seen = []
+    append = dps.history_store.append
+
+    def observing_append(*args):
+        # Called from inside /predict, while the request is still in flight
+        seen.append(parse(dps.metrics.render())['dps_requests_in_flight'])
+        return append(*args)
+
+    monkeypatch.setattr(dps.history_store, 'append', observing_append)
+    # The scrape itself is the only request in flight
+    assert scrape(client)['dps_requests_in_flight'] == 1
+    assert client.post('/predict', data=PATIENT).status_code == 200
+    assert seen == [1]
+    assert scrape(client)['dps_requests_in_flight'] == 1
+
+
+def test_in_flight_gauge_returns_to_zero_after_streaming(client):
+    header = ','.join(PATIENT)
+    body = header + '\n' + ''.join(','.join(PATIENT.values()) + '\n' for _ in range(3))
+    response = client.post('/predict_stream', data=body, content_type='text/csv')
+    assert len(response.get_data(as_text=True).splitlines()) == 4
+    assert scrape(client)['dps_requests_in_flight'] == 1
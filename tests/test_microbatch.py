@@ -0,0 +1,58 @@
+# Concurrent single-row submissions are scored together and each gets its own row back
+
+import threading
+
+import numpy as np
+import pytest
+
+from microbatch import MicroBatcher
+from scoring import MODEL_PATH, ScoringPipeline
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return ScoringPipeline.load(MODEL_PATH, engine='compiled', cache=False)
+
+
+def test_concurrent_rows_merge_into_one_batch(pipeline):
+    batches = []
+
+    def score(matrix):
+        batches.append(len(matrix))
+        return pipeline.predict_proba(matrix)
+
+    rows = pipeline.preprocessor.impute(np.random.default_rng(0).uniform(0, 200, (8, 8)))
+    batcher = MicroBatcher(score, max_batch_size=64, max_wait=0.5)
+    start = threading.Barrier(len(rows))
+    futures = [None] * len(rows)
+
+    def submit(index):
+        start.wait()
+        futures[index] = batcher.submit(rows[index])
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results = [future.result(timeout=5) for future in futures]
+    batcher.shutdown()
+
+    assert batches == [len(rows)]
+    assert batcher.stats()['batches'] == 1
+    for row, probabilities in zip(rows, results):
+        assert np.array_equal(probabilities, pipeline.predict_proba(row[np.newaxis])[0])
+
+
+def test_max_batch_size_splits_batches():
+    batches = []
+
+    def score(matrix):
+        batches.append(len(matrix))
+        return np.column_stack([1 - matrix[:, 0], matrix[:, 0]])
+
+    batcher = MicroBatcher(score, max_batch_size=3, max_wait=0.05)
+    futures = [batcher.submit([n / 10]) for n in range(7)]
+    assert [future.result(timeout=5)[1] for future in futures] == [n / 10 for n in range(7)]
+    batcher.shutdown()
+    assert sum(batches) == 7 and max(batches) <= 3
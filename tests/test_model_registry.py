@@ -0,0 +1,35 @@
+# Model file helpers shared by the export and training tools
+
+import os
+
+import pytest
+
+from model_registry import write_atomically
+
+
+def write_text(text):
+    def write(staging):
+        with open(staging, 'w') as f:
+            f.write(text)
+    return write
+
+
+def test_write_atomically_replaces_verified_file(tmp_path):
+    path = str(tmp_path / 'model.bin')
+    write_atomically(path, write_text('old'))
+    write_atomically(path, write_text('new'), verify=lambda staging: None)
+    assert open(path).read() == 'new'
+    assert os.listdir(tmp_path) == ['model.bin']
+
+
+def test_write_atomically_keeps_target_when_verification_fails(tmp_path):
+    path = str(tmp_path / 'model.bin')
+    write_atomically(path, write_text('old'))
+
+    def reject(staging):
+        raise ValueError('does not reproduce')
+
+    with pytest.raises(ValueError):
+        write_atomically(path, write_text('new'), reject)
+    assert open(path).read() == 'old'
+    assert os.listdir(tmp_path) == ['model.bin']
@@ -0,0 +1,19 @@
+# /predict response shape for the full, adaptive and explained paths
+
+import pytest
+
+PATIENT = {'Pregnancies': '6', 'Glucose': '148', 'BloodPressure': '72', 'SkinThickness': '35',
+           'Insulin': '0', 'BMI': '33.6', 'DiabetesPedigreeFunction': '0.627', 'Age': '50'}
+
+
+def test_adaptive_probability_is_labelled_an_estimate(client, dps):
+    result = client.post('/predict?mode=adaptive', data=PATIENT).get_json()
+    assert result['probability_estimate'] is True
+    assert 1 <= result['trees_used'] <= dps.model_registry.current.pipeline.tree_forest().n_trees
+
+
+@pytest.mark.parametrize('query', ['?mode=full', '?explain=1'])
+def test_full_forest_probability_is_not_an_estimate(client, query):
+    result = client.post('/predict' + query, data=PATIENT).get_json()
+    assert 'probability_estimate' not in result
+    assert 'trees_used' not in result
@@ -0,0 +1,81 @@
+# The prediction cache expires, evicts least recently used entries, drops everything
+# when the model file changes and keeps model versions apart
+
+import os
+
+import numpy as np
+import pytest
+
+from prediction_cache import PredictionCache
+
+ROW = np.array([6.0, 148.0, 72.0, 35.0, 125.0, 33.6, 0.627, 50.0])
+PROBABILITIES = np.array([0.3, 0.7])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(maxsize=10, ttl=5, clock=clock)
+    key = cache.key(ROW)
+    cache.put(key, PROBABILITIES)
+    clock.now = 4.9
+    assert np.array_equal(cache.get(key), PROBABILITIES)
+    clock.now = 5.0
+    assert cache.get(key) is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['size'] == 0
+
+
+def test_evicts_least_recently_used(clock):
+    cache = PredictionCache(maxsize=2, clock=clock)
+    first, second, third = (cache.key(ROW + n) for n in range(3))
+    cache.put(first, PROBABILITIES)
+    cache.put(second, PROBABILITIES)
+    cache.get(first)
+    cache.put(third, PROBABILITIES)
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_model_file_change_invalidates(clock, tmp_path):
+    model = tmp_path / 'model.pkl'
+    model.write_bytes(b'model v1')
+    cache = PredictionCache(maxsize=10, model_path=str(model), check_interval=1.0, clock=clock)
+    key = cache.key(ROW)
+    cache.put(key, PROBABILITIES)
+    model.write_bytes(b'model v2, longer')
+    os.utime(model, ns=(0, 0))
+    # The file is only stat'ed once per check_interval
+    assert cache.get(key) is not None
+    clock.now = 1.0
+    assert cache.get(key) is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_key_is_namespaced_by_model_version(clock):
+    cache = PredictionCache(maxsize=10, clock=clock)
+    cache.put(cache.key(ROW, b'v1'), PROBABILITIES)
+    assert cache.get(cache.key(ROW, b'v2')) is None
+    assert cache.get(cache.key(ROW.copy(), b'v1')) is not None
+    # -0.0 and 0.0 are the same input
+    assert PredictionCache.key(np.zeros(8)) == PredictionCache.key(-np.zeros(8))
+
+
+def test_cached_probabilities_are_read_only(clock):
+    cache = PredictionCache(maxsize=10, clock=clock)
+    key = cache.key(ROW)
+    cache.put(key, PROBABILITIES)
+    with pytest.raises(ValueError):
+        cache.get(key)[0] = 1.0
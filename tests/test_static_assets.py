@@ -0,0 +1,56 @@
+# Static assets and pages revalidate with ETags, negotiate gzip and are immutable
+# under fingerprinted URLs
+
+import gzip
+
+from static_assets import IMMUTABLE, REVALIDATE, StaticAssets
+
+ASSET = 'js/dashboard.js'
+
+
+def test_fingerprinted_url_is_immutable(client, dps):
+    url = dps.static_assets.url(ASSET)
+    assert url != '/static/' + ASSET
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    plain = client.get('/static/' + ASSET)
+    assert plain.headers['Cache-Control'] == REVALIDATE
+    assert plain.get_data() == response.get_data()
+
+
+def test_fingerprint_follows_content(tmp_path):
+    (tmp_path / 'app.css').write_text('body { color: red; }')
+    before = StaticAssets(str(tmp_path)).url('app.css')
+    (tmp_path / 'app.css').write_text('body { color: blue; }')
+    after = StaticAssets(str(tmp_path)).url('app.css')
+    assert before.startswith('/static/app.') and before.endswith('.css')
+    assert before != after
+
+
+def test_etag_round_trip_returns_304(client):
+    first = client.get('/static/' + ASSET)
+    etag = first.headers['ETag']
+    again = client.get('/static/' + ASSET, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == etag
+    changed = client.get('/static/' + ASSET, headers={'If-None-Match': '"stale"'})
+    assert changed.status_code == 200
+
+
+def test_gzip_is_negotiated(client):
+    raw = client.get('/static/' + ASSET)
+    assert 'Content-Encoding' not in raw.headers
+    assert 'Accept-Encoding' in raw.headers['Vary']
+    compressed = client.get('/static/' + ASSET, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.get_data()) == raw.get_data()
+    # Each encoding has its own ETag, so a cached gzip body is never served as raw
+    assert compressed.headers['ETag'] != raw.headers['ETag']
+
+
+def test_login_page_is_precompressed(dps):
+    response = dps.app.test_client().get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'<html' in gzip.decompress(response.get_data()).lower()
@@ -0,0 +1,81 @@
+# /what_if sweeps one or two features over a grid scored in one call, within size limits
+
+import numpy as np
+import pytest
+
+from preprocess import sweep_from_payload
+from scoring import feature_names
+
+RANGES = {'Glucose': (40, 250), 'BMI': (15, 60)}
+PATIENT = {'Pregnancies': '6', 'Glucose': '148', 'BloodPressure': '72', 'SkinThickness': '35',
+           'Insulin': '0', 'BMI': '33.6', 'DiabetesPedigreeFunction': '0.627', 'Age': '50'}
+
+
+def test_sweep_from_payload_builds_axes():
+    columns, axes = sweep_from_payload(['Glucose', {'name': 'BMI', 'min': 20, 'max': 40, 'steps': 5},
+                                        {'name': 'Age', 'values': [30, 50]}], feature_names, RANGES, 11)
+    assert columns == [feature_names.index(name) for name in ('Glucose', 'BMI', 'Age')]
+    assert [len(values) for values in axes] == [11, 5, 2]
+    assert axes[0][0] == 40 and axes[0][-1] == 250
+    assert axes[1].tolist() == [20, 25, 30, 35, 40]
+
+
+@pytest.mark.parametrize('features', [
+    [{'name': 'Glucose', 'steps': 101}, {'name': 'BMI', 'steps': 100}],
+    [{'name': 'Glucose', 'values': list(range(101))}, {'name': 'BMI', 'values': list(range(100))}],
+    [{'name': 'Glucose', 'steps': 10 ** 30}],
+])
+def test_sweep_from_payload_rejects_large_grids(features):
+    with pytest.raises(ValueError, match='too large'):
+        sweep_from_payload(features, feature_names, RANGES, max_points=10000)
+
+
+@pytest.mark.parametrize('features', [
+    [{'name': 'Glucose', 'values': [100, float('nan')]}],
+    [{'name': 'Glucose', 'min': 0, 'max': float('inf')}],
+    [{'name': 'Glucose', 'steps': float('inf')}],
+    ['Unknown'],
+    ['Glucose', 'Glucose'],
+    [],
+])
+def test_sweep_from_payload_rejects_bad_specs(features):
+    with pytest.raises(ValueError):
+        sweep_from_payload(features, feature_names, RANGES, max_points=10000)
+
+
+def test_surface_matches_single_predictions(client, dps):
+    features = [{'name': 'Glucose', 'min': 80, 'max': 200, 'steps': 4}, {'name': 'BMI', 'values': [22, 35, 48]}]
+    response = client.post('/what_if', json={'patient': PATIENT, 'features': features})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['features'] == ['Glucose', 'BMI']
+    surface = np.array(result['probability'])
+    assert surface.shape == (4, 3)
+    pipeline = dps.model_registry.current.pipeline
+    for i, glucose in enumerate(result['axes'][0]):
+        for j, bmi in enumerate(result['axes'][1]):
+            row = pipeline.preprocessor.parse_record({**PATIENT, 'Glucose': glucose, 'BMI': bmi})
+            assert surface[i, j] == round(float(pipeline.predict_proba(row)[0, 1]), 4)
+
+
+def test_grid_too_large_is_a_400(client, dps):
+    steps = int(np.sqrt(dps.MAX_BATCH_SIZE)) + 1
+    response = client.post('/what_if', json={'patient': PATIENT, 'features': [
+        {'name': 'Glucose', 'steps': steps}, {'name': 'BMI', 'steps': steps}]})
+    assert response.status_code == 400
+    assert 'too large' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('body', [
+    '{"patient": {"Glucose": "Infinity"}, "features": ["BMI"]}',
+    '{"patient": {}, "features": [{"name": "BMI", "values": [20, NaN]}]}',
+    '{"patient": {}, "features": [{"name": "BMI", "min": -Infinity, "max": 40}]}',
+])
+def test_non_finite_values_are_a_400(client, body):
+    response = client.post('/what_if', data=body, content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_too_many_features_is_a_400(client):
+    response = client.post('/what_if', json={'patient': PATIENT, 'features': ['Glucose', 'BMI', 'Age']})
+    assert response.status_code == 400
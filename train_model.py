@@ -0,0 +1,313 @@
+# Training pipeline for the Diabetes Prediction model
+# Fits the imputer on the training medians (a 0 counts as missing in the imputed
+# columns, as in the Pima data), searches RandomForest hyperparameters with
+# stratified cross-validation in parallel across cores and exports one versioned
+# artifact: imputer statistics, feature_names, the fitted model and a training
+# record (data hash, parameters, CV and holdout metrics, training time, latency
+# benchmark). DPS.py, score_cli.py and export_model.py load it like the pickled
+# model, and the drift reference profile is written next to it.
+#
+# Usage:
+#   python train_model.py diabetes.csv -o DiabetesPredictionModel.pkl
+#   python train_model.py diabetes.csv -o models/dps.pkl --folds 10 --jobs 4 --cache-dir .train-cache
+#   DPS_MODEL_PATH=models/dps.pkl python DPS.py
+#
+# The CSV needs a header with the feature_names columns and Outcome (extra columns are
+# ignored). Each fold's imputed train/test matrices are built once and shared by every
+# candidate; with --cache-dir they are kept on disk keyed by the data and split settings,
+# so reruns score on identical folds. The training report (JSON) goes to --report or stderr.
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bulk_io import csv_columns
+from drift import build_profile, save_profile
+from model_registry import write_atomically
+from preprocess import Preprocessor
+from scoring import (ScoringPipeline, ARTIFACT_FORMAT, ARTIFACT_VERSION, feature_names, features_to_impute,
+                     file_sha256)
+
+TARGET = 'Outcome'
+
+# Hyperparameters searched by default (every combination)
+PARAM_GRID = {
+    'n_estimators': [100, 200],
+    'max_depth': [None, 6, 10],
+    'min_samples_leaf': [1, 3, 5],
+    'max_features': ['sqrt', 0.5],
+}
+
+# Arrays stored per fold in the fold cache
+FOLD_ARRAYS = ('X_train', 'y_train', 'X_test', 'y_test')
+
+
+def load_training_data(path, target=TARGET):
+    # Raw (N, 8) feature matrix and 0/1 labels; empty feature cells are 0 like on every serving
+    # path (then imputed in imputed columns), malformed or unlabelled rows are skipped and counted
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = csv_columns(header, feature_names + [target])
+        rows = [row for row in reader if row]
+    matrix = np.empty((len(rows), len(columns)), dtype=np.float64)
+    kept = 0
+    for row in rows:
+        if len(row) != len(header):
+            continue
+        try:
+            matrix[kept] = [float(row[i]) if row[i].strip() else (np.nan if name == target else 0.0)
+                            for name, i in columns]
+        except ValueError:
+            continue
+        if matrix[kept, -1] in (0, 1):
+            kept += 1
+    if not kept:
+        raise ValueError(f'No labelled rows in {path}')
+    return matrix[:kept, :-1], matrix[:kept, -1].astype(np.int64), len(rows) - kept
+
+
+def imputer_statistics(X, zeros_missing=True):
+    # Median of each imputed column over the given rows, as SimpleImputer(strategy='median')
+    from sklearn.impute import SimpleImputer
+    columns = X[:, [feature_names.index(name) for name in features_to_impute]].copy()
+    if zeros_missing:
+        columns[columns == 0] = np.nan
+    return SimpleImputer(strategy='median').fit(columns).statistics_.tolist()
+
+
+def fit_preprocessor(X, zeros_missing=True):
+    # (serving preprocessor, statistics) fitted on training rows
+    statistics = imputer_statistics(X, zeros_missing)
+    return Preprocessor.from_statistics(feature_names, features_to_impute, statistics, zeros_missing), statistics
+
+
+def fold_data(X, y, n_folds=5, seed=0, zeros_missing=True, cache_dir=None):
+    # Stratified folds as imputed (X_train, y_train, X_test, y_test), the imputer refitted on
+    # each training part so no statistics leak from the held-out part. Built once and shared
+    # by every candidate. Returns (folds, 'hit' | 'miss' | 'off') for the disk cache.
+    if cache_dir is None:
+        path = None
+    else:
+        key = hashlib.sha256(X.tobytes() + y.tobytes() + f'{n_folds}:{seed}:{zeros_missing}'.encode())
+        path = os.path.join(cache_dir, f'folds-{key.hexdigest()[:16]}.npz')
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                return [tuple(cached[f'{name}{i}'] for name in FOLD_ARRAYS) for i in range(n_folds)], 'hit'
+
+    from sklearn.model_selection import StratifiedKFold
+    folds = []
+    for train, test in StratifiedKFold(n_folds, shuffle=True, random_state=seed).split(X, y):
+        preprocessor, _ = fit_preprocessor(X[train], zeros_missing)
+        folds.append((preprocessor.impute(X[train]), y[train], preprocessor.impute(X[test]), y[test]))
+    if path is None:
+        return folds, 'off'
+    os.makedirs(cache_dir, exist_ok=True)
+    arrays = {f'{name}{i}': array for i, fold in enumerate(folds) for name, array in zip(FOLD_ARRAYS, fold)}
+
+    def write(staging):
+        with open(staging, 'wb') as f:
+            np.savez(f, **arrays)
+
+    write_atomically(path, write)
+    return folds, 'miss'
+
+
+def fit_and_score(params, fold, seed):
+    # One candidate on one fold (runs in a worker process); single-threaded forest so the
+    # parallelism is across tasks, not nested inside them
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    X_train, y_train, X_test, y_test = fold
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params).fit(X_train, y_train)
+    return roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]), accuracy_score(y_test, model.predict(X_test))
+
+
+def search(folds, grid=PARAM_GRID, seed=0, n_jobs=-1):
+    # Cross-validate every grid candidate, one parallel task per (candidate, fold).
+    # Returns the candidates ranked by mean ROC AUC (grid order on ties).
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import ParameterGrid
+    candidates = list(ParameterGrid(grid))
+    scores = Parallel(n_jobs=n_jobs)(delayed(fit_and_score)(params, fold, seed)
+                                     for params in candidates for fold in folds)
+    scores = np.array(scores).reshape(len(candidates), len(folds), 2)
+    results = [{
+        'params': params,
+        'roc_auc_mean': float(scores[index, :, 0].mean()),
+        'roc_auc_std': float(scores[index, :, 0].std()),
+        'accuracy_mean': float(scores[index, :, 1].mean()),
+    } for index, params in enumerate(candidates)]
+    return sorted(results, key=lambda result: -result['roc_auc_mean'])
+
+
+def holdout_metrics(y, probabilities, predictions):
+    from sklearn.metrics import (accuracy_score, brier_score_loss, confusion_matrix, f1_score, log_loss,
+                                 precision_score, recall_score, roc_auc_score)
+    return {
+        'rows': int(len(y)),
+        'roc_auc': float(roc_auc_score(y, probabilities)),
+        'accuracy': float(accuracy_score(y, predictions)),
+        'precision': float(precision_score(y, predictions, zero_division=0)),
+        'recall': float(recall_score(y, predictions, zero_division=0)),
+        'f1': float(f1_score(y, predictions, zero_division=0)),
+        'log_loss': float(log_loss(y, probabilities, labels=[0, 1])),
+        'brier': float(brier_score_loss(y, probabilities)),
+        'confusion_matrix': confusion_matrix(y, predictions, labels=[0, 1]).tolist(),
+    }
+
+
+def latency_benchmark(artifact, X, single_rows=200):
+    # Single-row latency percentiles and batch throughput of both serving engines on imputed rows
+    results = {}
+    for engine in ('compiled', 'sklearn'):
+        pipeline = ScoringPipeline.from_artifact(artifact, engine)
+        pipeline.warm_up()
+        timings = []
+        for row in X[np.arange(single_rows) % len(X)]:
+            started = time.perf_counter()
+            pipeline.predict(row.reshape(1, -1))
+            timings.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        pipeline.predict(X)
+        batch_seconds = time.perf_counter() - started
+        results[engine] = {
+            'single_row_ms_p50': float(np.percentile(timings, 50) * 1000),
+            'single_row_ms_p99': float(np.percentile(timings, 99) * 1000),
+            'batch_rows': int(len(X)),
+            'batch_rows_per_second': len(X) / batch_seconds,
+        }
+    return results
+
+
+def train(data_path, output_path, grid=PARAM_GRID, n_folds=5, test_size=0.2, seed=0, n_jobs=-1,
+          zeros_missing=True, cache_dir=None, profile_path=None):
+    # Search, refit, evaluate, benchmark and write the artifact (and drift profile); returns the report
+    import joblib
+    import pandas as pd
+    import sklearn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
+    started = time.perf_counter()
+    trained_at = datetime.now()
+    X, y, skipped = load_training_data(data_path)
+    data_sha256 = file_sha256(data_path)
+    train_rows, test_rows = train_test_split(np.arange(len(X)), test_size=test_size, stratify=y, random_state=seed)
+
+    search_started = time.perf_counter()
+    folds, fold_cache = fold_data(X[train_rows], y[train_rows], n_folds, seed, zeros_missing, cache_dir)
+    candidates = search(folds, grid, seed, n_jobs)
+    search_seconds = time.perf_counter() - search_started
+    best = candidates[0]
+
+    # Final imputer and forest refitted on the whole training part; the forest is fitted on a
+    # DataFrame like the original model, so the sklearn engine's named input matches it
+    refit_started = time.perf_counter()
+    preprocessor, statistics = fit_preprocessor(X[train_rows], zeros_missing)
+    train_matrix = preprocessor.impute(X[train_rows])
+    model = RandomForestClassifier(random_state=seed, n_jobs=n_jobs, **best['params'])
+    model.fit(pd.DataFrame(train_matrix, columns=feature_names), y[train_rows])
+    # Serving scores one row at a time; a thread pool per call would only add latency
+    model.set_params(n_jobs=None)
+    refit_seconds = time.perf_counter() - refit_started
+
+    test_matrix = preprocessor.impute(X[test_rows])
+    test_probabilities = model.predict_proba(pd.DataFrame(test_matrix, columns=feature_names))
+    metadata = {
+        'model_version': f'{trained_at:%Y%m%d-%H%M%S}-{data_sha256[:8]}',
+        'trained_at': trained_at.isoformat(),
+        'sklearn_version': sklearn.__version__,
+        'data': {'file': os.path.basename(data_path), 'sha256': data_sha256, 'rows': int(len(X)),
+                 'skipped_rows': skipped, 'train_rows': int(len(train_rows)), 'test_rows': int(len(test_rows)),
+                 'positive_rate': float(y.mean())},
+        'params': best['params'],
+        'search': {'candidates': len(candidates), 'folds': n_folds, 'seed': seed,
+                   'jobs': joblib.effective_n_jobs(n_jobs), 'fold_cache': fold_cache,
+                   'roc_auc_mean': best['roc_auc_mean'], 'roc_auc_std': best['roc_auc_std'],
+                   'accuracy_mean': best['accuracy_mean']},
+        'holdout': holdout_metrics(y[test_rows], test_probabilities[:, 1],
+                                   model.classes_.take(np.argmax(test_probabilities, axis=1))),
+    }
+    artifact = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_VERSION,
+        'feature_names': feature_names,
+        'imputer': {'strategy': 'median', 'features': features_to_impute, 'statistics': statistics,
+                    'zeros_missing': zeros_missing},
+        'model': model,
+        'metadata': metadata,
+    }
+    metadata['latency'] = latency_benchmark(artifact, test_matrix)
+    metadata['training_seconds'] = {'search': search_seconds, 'refit': refit_seconds,
+                                    'total': time.perf_counter() - started}
+
+    def verify(staging):
+        reloaded = ScoringPipeline.load(staging, engine='sklearn', mmap=False)
+        if not np.array_equal(reloaded.predict_proba(test_matrix), test_probabilities):
+            raise ValueError('Written artifact does not reproduce the evaluated predictions')
+
+    write_atomically(output_path, lambda staging: joblib.dump(artifact, staging), verify)
+
+    if profile_path:
+        # Drift reference: every labelled row as the serving preprocessor imputes it
+        save_profile(build_profile(np.vstack([train_matrix, test_matrix]), feature_names,
+                                   source=os.path.basename(data_path)), profile_path)
+    return {
+        'output': output_path,
+        'bytes': os.path.getsize(output_path),
+        'profile': profile_path,
+        'metadata': metadata,
+        'candidates': candidates,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the diabetes prediction model and export a versioned artifact.')
+    parser.add_argument('data', help='Pima-format CSV with the feature columns and Outcome')
+    parser.add_argument('-o', '--output', required=True, help='Model artifact to write')
+    parser.add_argument('--folds', type=int, default=5, help='Cross-validation folds')
+    parser.add_argument('--test-size', type=float, default=0.2, help='Share of rows held out for the final metrics')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for splits and forests')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel fits (-1: all cores)')
+    parser.add_argument('--grid', help='JSON file of {parameter: [values]} to search instead of the default grid')
+    parser.add_argument('--keep-zeros', action='store_true',
+                        help='Treat 0 as a real value in the imputed columns instead of missing')
+    parser.add_argument('--cache-dir', help='Keep the imputed fold splits here for reruns on the same data')
+    parser.add_argument('--profile', help='Drift profile to write (default: <output stem>.profile.json)')
+    parser.add_argument('--no-profile', action='store_true', help='Do not write a drift profile')
+    parser.add_argument('--report', help='Write the training report JSON here (default: stderr)')
+    args = parser.parse_args(argv)
+
+    grid = PARAM_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    profile_path = None
+    if not args.no_profile:
+        profile_path = args.profile or os.path.splitext(args.output)[0] + '.profile.json'
+
+    report = train(args.data, args.output, grid=grid, n_folds=args.folds, test_size=args.test_size, seed=args.seed,
+                   n_jobs=args.jobs, zeros_missing=not args.keep_zeros, cache_dir=args.cache_dir,
+                   profile_path=profile_path)
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text, file=sys.stderr)
+    metadata = report['metadata']
+    print(f"Wrote {args.output} ({metadata['model_version']}): holdout ROC AUC "
+          f"{metadata['holdout']['roc_auc']:.3f}, {metadata['params']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())